@@ -0,0 +1,162 @@
+"""
+Asyncio database access on the Qt event loop
+
+The rest of the app talks to MySQL with blocking mysql.connector calls, so
+anything slow runs on a worker thread (write_queue.py) and the results are
+carried back with a signal. With the optional aiomysql and qasync packages
+installed, main.py runs Qt under an asyncio event loop instead, and window
+code can await queries directly; queries awaited together run concurrently
+on separate pooled connections, without threads:
+
+    pip install aiomysql qasync
+
+    rows, user = await asyncio.gather(
+        async_db.fetchall("SELECT ... FROM passwords WHERE user_id = %s", (user_id,)),
+        async_db.fetchone("SELECT ... FROM users WHERE id = %s", (user_id,)),
+    )
+
+Without them (or with VAULT_ASYNC_DB=0) available() is False and callers
+keep to the threaded path. PyMySQL has no server-side prepared statements,
+so unlike query_log.PreparedStatement these are sent as text each time;
+large reads are streamed through an unbuffered cursor (stream). Statements go through the query log like those
+of db_config.get_connection; errors are PyMySQL's, which
+db_config.error_code and is_connection_error understand.
+"""
+
+import asyncio
+import contextlib
+import importlib.util
+import os
+import time
+
+import telemetry
+
+ENABLED = os.environ.get("VAULT_ASYNC_DB", "1") != "0"
+
+# Connections kept by the pool; also the most queries in flight at once
+POOL_SIZE = 4
+
+_loop = None
+_pool = None
+_pool_lock = None
+
+
+def install_event_loop(app):
+    """Run app's event loop as the asyncio loop; returns it, or None when async access is unavailable"""
+    global _loop
+    if not ENABLED or not all(importlib.util.find_spec(name) for name in ("aiomysql", "qasync")):
+        return None
+    # Imported here: main.py calls this before the login window shows
+    import qasync
+
+    _loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def available():
+    """True once install_event_loop has put an asyncio loop under Qt"""
+    return _loop is not None
+
+
+async def _get_pool():
+    import aiomysql
+    from db_config import DB_CONNECT_TIMEOUT, DB_HOST, DB_NAME, DB_PASSWORD, DB_USER
+
+    global _pool, _pool_lock
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            with telemetry.span("db.connect", {"db.name": DB_NAME, "db.async": True}):
+                _pool = await aiomysql.create_pool(
+                    host=DB_HOST,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    db=DB_NAME,
+                    connect_timeout=DB_CONNECT_TIMEOUT,
+                    minsize=1,
+                    maxsize=POOL_SIZE,
+                    autocommit=False,
+                )
+    return _pool
+
+
+class AsyncConnection:
+    """A pooled connection whose statements are timed like LoggedCursor's"""
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def _run(self, sql, params, fetch):
+        import query_log
+
+        with telemetry.span("db.execute", {"db.statement": sql, "db.async": True}):
+            start = time.perf_counter()
+            try:
+                async with self._conn.cursor() as cursor:
+                    await cursor.execute(sql, params)
+                    return await fetch(cursor)
+            finally:
+                query_log.record_statement(sql, params, (time.perf_counter() - start) * 1000)
+
+    async def fetchall(self, sql, params=()):
+        return await self._run(sql, params, lambda cursor: cursor.fetchall())
+
+    async def fetchone(self, sql, params=()):
+        return await self._run(sql, params, lambda cursor: cursor.fetchone())
+
+    async def stream(self, sql, params=(), batch=None):
+        """Yield the rows of sql from an unbuffered cursor, batch at a time"""
+        import aiomysql
+        import query_log
+
+        with telemetry.span("db.execute", {"db.statement": sql, "db.async": True, "db.stream": True}):
+            start = time.perf_counter()
+            try:
+                async with self._conn.cursor(aiomysql.SSCursor) as cursor:
+                    await cursor.execute(sql, params)
+                    while True:
+                        rows = await cursor.fetchmany(batch or query_log.STREAM_BATCH)
+                        if not rows:
+                            break
+                        for row in rows:
+                            yield row
+            finally:
+                query_log.record_statement(sql, params, (time.perf_counter() - start) * 1000)
+
+    async def rollback(self):
+        await self._conn.rollback()
+
+
+@contextlib.asynccontextmanager
+async def connection():
+    """A connection from the pool for several statements in one transaction"""
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
+        try:
+            yield AsyncConnection(conn)
+        finally:
+            # Back to the pool without an open snapshot
+            if not conn.closed:
+                await conn.rollback()
+
+
+async def fetchall(sql, params=()):
+    async with connection() as conn:
+        return await conn.fetchall(sql, params)
+
+
+async def fetchone(sql, params=()):
+    async with connection() as conn:
+        return await conn.fetchone(sql, params)
+
+
+def close():
+    """Drop the pooled connections (e.g. when the application quits)"""
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool = None
@@ -0,0 +1,250 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import telemetry
+from db_config import get_connection
+
+# Per-username bucket: a burst of 5 attempts, then one every 30 seconds
+USER_BURST = 5
+USER_REFILL_PER_SEC = 1 / 30
+# Global bucket across all usernames, against guessing many accounts at once
+GLOBAL_BURST = 30
+GLOBAL_REFILL_PER_SEC = 1.0
+
+# Number of recent latencies kept for percentile reporting
+LATENCY_WINDOW = 256
+
+
+class TokenBucket:
+    """Classic token bucket; each login attempt takes one token"""
+
+    __slots__ = ("capacity", "refill_rate", "tokens", "updated")
+
+    def __init__(self, capacity, refill_rate, now):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def take(self, now):
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self, now):
+        """Seconds until the next token is available"""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.refill_rate)
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class LoginRateLimiter:
+    """In-process per-username and global attempt limits"""
+
+    def __init__(self, user_burst=USER_BURST, user_refill=USER_REFILL_PER_SEC,
+                 global_burst=GLOBAL_BURST, global_refill=GLOBAL_REFILL_PER_SEC, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._user_burst = user_burst
+        self._user_refill = user_refill
+        self._global = TokenBucket(global_burst, global_refill, clock())
+        self._users = {}
+
+    def acquire(self, username):
+        """
+        Take one attempt for username.
+
+        Returns (allowed, retry_after_seconds).
+        """
+        key = username.lower()
+        with self._lock:
+            now = self._clock()
+            bucket = self._users.get(key)
+            if bucket is None:
+                bucket = self._users[key] = TokenBucket(self._user_burst, self._user_refill, now)
+                self._prune(now)
+            if not bucket.take(now):
+                return False, bucket.retry_after(now)
+            if not self._global.take(now):
+                # Give the user's token back; the global limit refused this one
+                bucket.tokens += 1
+                return False, self._global.retry_after(now)
+            return True, 0.0
+
+    def reset(self, username):
+        """Forget the attempt history of a user after a successful login"""
+        with self._lock:
+            self._users.pop(username.lower(), None)
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no information
+        if len(self._users) > 1024:
+            for key in [k for k, b in self._users.items() if b.is_full(now)]:
+                del self._users[key]
+
+
+class AuthResult:
+    """Outcome of a login attempt"""
+
+    OK = "ok"
+    INVALID = "invalid"
+    THROTTLED = "throttled"
+
+    __slots__ = ("status", "user_id", "password_hash", "retry_after")
+
+    def __init__(self, status, user_id=None, password_hash=None, retry_after=0.0):
+        self.status = status
+        self.user_id = user_id
+        self.password_hash = password_hash
+        self.retry_after = retry_after
+
+    @property
+    def ok(self):
+        return self.status == AuthResult.OK
+
+
+class AuthStats:
+    """Attempt counters and recent verification latencies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, status, latency):
+        with self._lock:
+            self.attempts += 1
+            if status == AuthResult.OK:
+                self.successes += 1
+            elif status == AuthResult.INVALID:
+                self.failures += 1
+            elif status == AuthResult.THROTTLED:
+                self.throttled += 1
+            else:
+                self.errors += 1
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            counters = {
+                "attempts": self.attempts,
+                "successes": self.successes,
+                "failures": self.failures,
+                "throttled": self.throttled,
+                "errors": self.errors,
+            }
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+        counters["latency_p50_ms"] = percentile(50) * 1000
+        counters["latency_p95_ms"] = percentile(95) * 1000
+        return counters
+
+
+class AuthService:
+    """
+    Verifies master passwords off the GUI thread.
+
+    Unknown usernames are checked against a dummy bcrypt hash so they take as
+    long as real ones and do not reveal which accounts exist.
+    """
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter or LoginRateLimiter()
+        self.stats = AuthStats()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="vault-auth")
+        self._dummy_hash = None
+        self._dummy_lock = threading.Lock()
+
+    def _get_dummy_hash(self):
+        # Same cost factor as registration uses, made once on first need
+        with self._dummy_lock:
+            if self._dummy_hash is None:
+                with telemetry.span("bcrypt.hashpw", {"auth.purpose": "dummy"}):
+                    self._dummy_hash = bcrypt.hashpw(b"password-vault-dummy", bcrypt.gensalt())
+            return self._dummy_hash
+
+    def warm_up(self):
+        """Prepare the dummy hash in the background before the first login"""
+        return self._executor.submit(self._get_dummy_hash)
+
+    @staticmethod
+    def _fetch_user(username):
+        conn = get_connection()
+        try:
+            row = conn.execute("SELECT id, master_password_hash FROM users WHERE username = %s", (username,)).fetchone()
+        finally:
+            conn.close()
+        return {"id": row[0], "master_password_hash": row[1]} if row else None
+
+    def authenticate(self, username, password):
+        """Blocking login check; returns an AuthResult"""
+        start = time.perf_counter()
+        status = "error"
+        try:
+            allowed, retry_after = self.limiter.acquire(username)
+            if not allowed:
+                status = AuthResult.THROTTLED
+                return AuthResult(status, retry_after=retry_after)
+
+            user = self._fetch_user(username)
+            stored_hash = user["master_password_hash"].encode() if user else self._get_dummy_hash()
+            # Always run exactly one bcrypt check, whether or not the user exists
+            with telemetry.span("bcrypt.checkpw", {"auth.purpose": "login"}):
+                matched = bcrypt.checkpw(password.encode(), stored_hash)
+
+            if user and matched:
+                self.limiter.reset(username)
+                status = AuthResult.OK
+                return AuthResult(status, user["id"], user["master_password_hash"])
+            status = AuthResult.INVALID
+            return AuthResult(status)
+        finally:
+            latency = time.perf_counter() - start
+            self.stats.record(status, latency)
+            telemetry.count(f"auth.{status}")
+            telemetry.observe("auth.latency_ms", latency * 1000)
+
+    def authenticate_async(self, username, password):
+        """Run authenticate on the worker pool; returns a Future"""
+        return self._executor.submit(self.authenticate, username, password)
+
+    @staticmethod
+    def verify(password, password_hash, purpose="unlock"):
+        """Blocking check of a password against a known bcrypt hash"""
+        with telemetry.span("bcrypt.checkpw", {"auth.purpose": purpose}):
+            return bcrypt.checkpw(password.encode(), password_hash)
+
+    def submit(self, func, *args):
+        """Run func on the worker pool, for other checks that must not block the GUI; returns a Future"""
+        return self._executor.submit(func, *args)
+
+
+_service = None
+
+
+def get_auth_service():
+    global _service
+    if _service is None:
+        _service = AuthService()
+    return _service
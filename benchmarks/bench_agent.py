@@ -0,0 +1,127 @@
+"""
+Vault agent latency benchmark
+
+Starts a VaultAgent in a background thread on a temporary socket, loaded with
+synthetic encrypted rows (no database needed), and measures:
+
+    - round trip of single get requests, one at a time
+    - round trip per request when 100 gets are pipelined in one write
+    - round trip per entry of one batched {"op": "get", "ids": [...]} request
+    - the agent's own handling time per single request (p50/p99) against
+      its latency budget
+
+Usage:
+    python benchmarks/bench_agent.py [--rows 10000] [--update-baseline]
+
+Timings are µs per request, compared with agent_baseline.json; exits with
+status 1 on a regression or when p99 handling time exceeds the budget.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from common import BENCH_DIR, check_baseline
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "agent_baseline.json")
+
+REQUESTS = 2000
+PIPELINE = 100
+
+
+def start_agent(rows, path):
+    from cryptography.fernet import Fernet
+    from encryption import batch_encrypt
+    from vault_agent import VaultAgent
+
+    fernet = Fernet(Fernet.generate_key())
+    tokens = batch_encrypt([f"password-{i}-Secret#" for i in range(rows)], fernet)
+    agent = VaultAgent(1, fernet)
+    agent.set_rows([(i, f"site {i}", token) for i, token in enumerate(tokens)])
+
+    thread = threading.Thread(target=asyncio.run, args=(agent.serve(path),), daemon=True)
+    thread.start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+    return agent
+
+
+def receive_lines(sock, count):
+    data = b""
+    while data.count(b"\n") < count:
+        data += sock.recv(1 << 20)
+    return data
+
+
+def bench_single(sock, rows):
+    samples = []
+    for i in range(REQUESTS):
+        line = json.dumps({"op": "get", "id": i % rows}).encode() + b"\n"
+        start = time.perf_counter()
+        sock.sendall(line)
+        receive_lines(sock, 1)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def bench_pipelined(sock, rows):
+    batch = b"".join(json.dumps({"op": "get", "id": i % rows}).encode() + b"\n" for i in range(PIPELINE))
+    rounds = REQUESTS // PIPELINE
+    start = time.perf_counter()
+    for _ in range(rounds):
+        sock.sendall(batch)
+        receive_lines(sock, PIPELINE)
+    return (time.perf_counter() - start) * 1e6 / (rounds * PIPELINE)
+
+
+def bench_batched_ids(sock, rows):
+    line = json.dumps({"op": "get", "ids": [i % rows for i in range(PIPELINE)]}).encode() + b"\n"
+    rounds = REQUESTS // PIPELINE
+    start = time.perf_counter()
+    for _ in range(rounds):
+        sock.sendall(line)
+        receive_lines(sock, 1)
+    return (time.perf_counter() - start) * 1e6 / (rounds * PIPELINE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="vault-bench-"), "agent.sock")
+    agent = start_agent(args.rows, path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        results = {
+            "agent_single_us": bench_single(sock, args.rows),
+            "agent_pipelined_us": bench_pipelined(sock, args.rows),
+        }
+        # Taken before the batched run, whose lines each carry many lookups
+        stats = agent.stats()
+        results["agent_batched_ids_us"] = bench_batched_ids(sock, args.rows)
+
+    for name, value in results.items():
+        print(f"{name:>24}: {value:8.1f} µs")
+    print(f"{'handling p50':>24}: {stats['latency_p50_us']:8.1f} µs")
+    print(f"{'handling p99':>24}: {stats['latency_p99_us']:8.1f} µs (budget {agent.budget_us:.0f} µs, "
+          f"{stats['over_budget']} of {stats['requests']} over)")
+
+    ok = check_baseline({k: round(v, 2) for k, v in results.items()}, BASELINE_FILE, args.update_baseline)
+    if stats["latency_p99_us"] > agent.budget_us:
+        print(f"❌ p99 handling time is over the {agent.budget_us:.0f} µs budget")
+        ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
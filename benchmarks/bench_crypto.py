@@ -0,0 +1,48 @@
+"""
+Batch encryption benchmark
+
+Measures batch_encrypt/batch_decrypt throughput for a range of worker counts
+so the thread pool scaling across cores can be checked.
+
+Usage: python benchmarks/bench_crypto.py [entries]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet
+from encryption import batch_encrypt, batch_decrypt
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    # Use a throwaway key so the benchmark never touches secret.key
+    fernet = Fernet(Fernet.generate_key())
+    passwords = [f"benchmark-password-{i:06d}" for i in range(entries)]
+    tokens = batch_encrypt(passwords, fernet, workers=1)
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, cpu_count})
+    worker_counts = [w for w in worker_counts if w <= cpu_count] or [1]
+
+    print(f"{entries} entries, {cpu_count} CPUs")
+    print(f"{'workers':>8} {'encrypt/s':>12} {'decrypt/s':>12} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        enc = time_call(batch_encrypt, passwords, fernet, workers=workers)
+        dec = time_call(batch_decrypt, tokens, fernet, workers=workers)
+        baseline = baseline or dec
+        print(f"{workers:>8} {entries / enc:>12.0f} {entries / dec:>12.0f} {baseline / dec:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Offscreen GUI interaction benchmark
+
+Drives Dashboard, RegisterWindow and UpdatePasswordWindow under
+QT_QPA_PLATFORM=offscreen, scripting clicks and typing with QTest, and
+records per scenario:
+
+    - frame times (time spent handling repaint requests)
+    - event-loop stalls (any single event taking longer than STALL_MS)
+    - action latency (time for each scripted click/keystroke to be handled)
+    - live widget count after the scenario
+    - for dashboard refreshes, the share of cards built instead of recycled
+    - dialog open latency, first open and repeat opens, for the register,
+      password reset and update dialogs (exec_ is replaced by show + close so
+      the modal loop does not block)
+
+Dashboard scenarios need the benchmark database (see bench_vault.py); pass
+--no-db to run only the others.
+
+Usage:
+    python benchmarks/bench_gui.py [--entries 200] [--no-db] [--update-baseline]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from common import BENCH_DIR, check_baseline, silence_message_boxes, use_scratch_key
+
+from PyQt5.QtCore import QEvent, Qt
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication, QDialog, QPushButton
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "gui_baseline.json")
+
+# A single event taking longer than this counts as a stall
+STALL_MS = 50
+
+# Repeat opens timed per dialog after the first one
+DIALOG_REPEATS = 5
+
+FRAME_EVENTS = (QEvent.UpdateRequest, QEvent.Paint)
+
+
+class InstrumentedApplication(QApplication):
+    """QApplication that times every top-level event dispatch"""
+
+    def __init__(self, argv):
+        super().__init__(argv)
+        self._depth = 0
+        self.reset()
+
+    def reset(self):
+        self.frame_times = []
+        self.stalls = []
+
+    def notify(self, receiver, event):
+        if self._depth:
+            return super().notify(receiver, event)
+        event_type = event.type()
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return super().notify(receiver, event)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self._depth -= 1
+            if event_type in FRAME_EVENTS:
+                self.frame_times.append(elapsed)
+            if elapsed > STALL_MS:
+                self.stalls.append(elapsed)
+
+
+class Scenario:
+    """Collects the measurements for one scripted scenario"""
+
+    def __init__(self, app, name):
+        self.app = app
+        self.name = name
+        self.actions = []
+
+    def __enter__(self):
+        self.app.reset()
+        return self
+
+    def act(self, func, *args):
+        """Run one scripted interaction and flush the resulting repaints"""
+        start = time.perf_counter()
+        result = func(*args)
+        self.app.processEvents()
+        self.actions.append((time.perf_counter() - start) * 1000)
+        return result
+
+    def __exit__(self, exc_type, exc, tb):
+        self.app.processEvents()
+        if exc_type is not None:
+            return False
+        frames = sorted(self.app.frame_times) or [0.0]
+        self.results = {
+            f"{self.name}.frame_p50_ms": statistics.median(frames),
+            f"{self.name}.frame_max_ms": frames[-1],
+            f"{self.name}.stalls": len(self.app.stalls),
+            f"{self.name}.action_p95_ms": sorted(self.actions)[int(0.95 * (len(self.actions) - 1))]
+            if self.actions else 0.0,
+            f"{self.name}.widgets": len(QApplication.allWidgets()),
+        }
+        return False
+
+
+def open_without_blocking(dialog):
+    """Stands in for QDialog.exec_: show, paint and close the dialog"""
+    dialog.show()
+    QApplication.processEvents()
+    dialog.reject()
+    return QDialog.Rejected
+
+
+def time_dialog_opens(name, open_dialog, results):
+    """Time the first and the repeat opens of a dialog"""
+    exec_ = QDialog.exec_
+    QDialog.exec_ = open_without_blocking
+    try:
+        times = []
+        for _ in range(DIALOG_REPEATS + 1):
+            start = time.perf_counter()
+            open_dialog()
+            times.append((time.perf_counter() - start) * 1000)
+    finally:
+        QDialog.exec_ = exec_
+    results[f"dialog_open.{name}_first_ms"] = times[0]
+    results[f"dialog_open.{name}_repeat_ms"] = statistics.median(times[1:])
+
+
+def card_widgets(dashboard):
+    layout = dashboard.passwords_layout
+    return [layout.itemAt(i).widget() for i in range(layout.count())
+            if layout.itemAt(i).widget() is not None and hasattr(layout.itemAt(i).widget(), "entry")]
+
+
+def dashboard_scenarios(app, entries, results):
+    from bench_vault import ensure_database, ensure_user, seed_vault
+    from dashboard import Dashboard
+    from session_manager import Session
+
+    ensure_database()
+    user_id = ensure_user()
+    seed_vault(user_id, entries)
+
+    with Scenario(app, "dashboard_open") as s:
+        dashboard = s.act(lambda: Dashboard(user_id, Session(user_id)))
+        s.act(dashboard.show)
+    results.update(s.results)
+
+    cards = card_widgets(dashboard)[:20]
+
+    with Scenario(app, "dashboard_select") as s:
+        for card in cards:
+            s.act(QTest.mouseClick, card, Qt.LeftButton)
+    results.update(s.results)
+
+    with Scenario(app, "dashboard_reveal") as s:
+        for card in cards:
+            s.act(QTest.mouseClick, card.findChildren(QPushButton)[0], Qt.LeftButton)
+    results.update(s.results)
+
+    with Scenario(app, "dashboard_switch_tabs") as s:
+        for _ in range(10):
+            s.act(QTest.mouseClick, dashboard.btn_new, Qt.LeftButton)
+            s.act(QTest.mouseClick, dashboard.btn_list, Qt.LeftButton)
+    results.update(s.results)
+
+    with Scenario(app, "dashboard_type_new") as s:
+        s.act(QTest.mouseClick, dashboard.btn_new, Qt.LeftButton)
+        for ch in "Benchmark account":
+            s.act(QTest.keyClick, dashboard.description_input, ch)
+        for ch in "benchmark-secret":
+            s.act(QTest.keyClick, dashboard.password_input, ch)
+        s.act(dashboard.clear_inputs)
+    results.update(s.results)
+
+    with Scenario(app, "dashboard_refresh") as s:
+        for _ in range(10):
+            s.act(dashboard.refresh_view)
+    results.update(s.results)
+    # Share of cards built rather than recycled since the dashboard opened
+    results["dashboard_refresh.card_miss_rate"] = 1 - dashboard.card_pool.hit_rate
+
+    dashboard.select_card(cards[0])
+    time_dialog_opens("update", dashboard.open_update_window, results)
+
+    dashboard.session.end()
+    dashboard.close()
+
+
+def register_scenario(app, results):
+    from register_window import RegisterWindow
+
+    with Scenario(app, "register_typing") as s:
+        window = RegisterWindow()
+        s.act(window.show)
+        # Every keystroke re-runs the strength validator and feedback update
+        for ch in "Coffee&Books@2024!":
+            s.act(QTest.keyClick, window.password_input, ch)
+        for ch in "Coffee&Books@2024!":
+            s.act(QTest.keyClick, window.confirm_input, ch)
+        s.act(window.close)
+    results.update(s.results)
+
+
+def dialog_scenario(app, results):
+    from login_register import LoginRegisterWindow
+
+    window = LoginRegisterWindow()
+    window.show()
+    app.processEvents()
+    time_dialog_opens("register", window.open_register_window, results)
+    time_dialog_opens("forgot", window.open_forgot_window, results)
+    window.close()
+
+
+def update_scenario(app, results):
+    from encryption import get_fernet
+    from update_password_window import UpdatePasswordWindow
+
+    fernet = get_fernet()
+    token = fernet.encrypt(b"old-benchmark-secret").decode()
+
+    with Scenario(app, "update_window") as s:
+        window = UpdatePasswordWindow(1, 1, "Benchmark account", token, lambda: None, fernet)
+        s.act(window.show)
+        for _ in range(5):
+            s.act(QTest.mouseClick, window.old_pw_toggle, Qt.LeftButton)
+        for ch in "new-benchmark-secret":
+            s.act(QTest.keyClick, window.new_pw_input, ch)
+        for ch in "new-benchmark-secret":
+            s.act(QTest.keyClick, window.confirm_input, ch)
+        s.act(window.reject)
+    results.update(s.results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200, help="vault size for dashboard scenarios")
+    parser.add_argument("--no-db", action="store_true", help="skip scenarios that need the database")
+    parser.add_argument("--update-baseline", action="store_true", help="store results as the new baseline")
+    args = parser.parse_args()
+
+    use_scratch_key()
+    app = InstrumentedApplication(sys.argv)
+    silence_message_boxes()
+
+    results = {}
+    register_scenario(app, results)
+    update_scenario(app, results)
+    dialog_scenario(app, results)
+    if not args.no_db:
+        dashboard_scenarios(app, args.entries, results)
+
+    for metric, value in sorted(results.items()):
+        print(f"  {metric:<36} {value:10.2f}")
+
+    ok = check_baseline(results, BASELINE_FILE, update=args.update_baseline)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Vault entry memory benchmark
+
+Builds the dashboard's view model (vault_entry.EntryStore) for a large vault
+of synthetic rows, no database or window needed, and measures with
+tracemalloc:
+
+    - bytes per entry the view model adds on top of the row fields
+      (VaultEntry object, list slot and index by id)
+    - the same for the per-row dictionaries the loader used to build
+      (a cursor dict plus an id/description/password dict), for comparison
+    - bytes per decrypted password (SecretBuffer)
+    - time to build the view model
+
+Usage:
+    python benchmarks/bench_memory.py [--rows 100000] [--update-baseline]
+
+Values are compared with memory_baseline.json; exits with status 1 on a
+regression.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from common import BENCH_DIR, check_baseline
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "memory_baseline.json")
+
+
+def allocated(build):
+    """Bytes still allocated by what build() returns, and the result"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
+
+
+def dict_rows(rows):
+    cursor_rows = [{"id": i, "description": d, "encrypted_password": t} for i, d, t in rows]
+    return cursor_rows, [{"id": r["id"], "description": r["description"], "secret": None} for r in cursor_rows]
+
+
+def main():
+    from cryptography.fernet import Fernet
+    from encryption import batch_encrypt, batch_decrypt_secrets
+    from secret_buffer import wipe_all
+    from vault_entry import EntryStore
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    fernet = Fernet(Fernet.generate_key())
+    tokens = batch_encrypt([f"password-{i:06d}-Secret#" for i in range(args.rows)], fernet)
+    rows = [(i, f"Account {i:06d}", token) for i, token in enumerate(tokens)]
+
+    start = time.perf_counter()
+    EntryStore(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    entry_bytes, store = allocated(lambda: EntryStore(rows))
+    dict_bytes, _ = allocated(lambda: dict_rows(rows))
+    secret_bytes, secrets = allocated(lambda: batch_decrypt_secrets(store.tokens(), fernet))
+    wipe_all(secrets)
+
+    results = {
+        "entry_overhead_bytes": entry_bytes / args.rows,
+        "dict_row_overhead_bytes": dict_bytes / args.rows,
+        "secret_bytes": secret_bytes / args.rows,
+        "entry_build_ms": build_ms,
+    }
+    print(f"{args.rows} rows")
+    for name, value in results.items():
+        print(f"  {name:<26} {value:10.1f}")
+
+    ok = check_baseline({k: round(v, 2) for k, v in results.items()}, BASELINE_FILE, args.update_baseline)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Startup benchmark
+
+Profiles the login window startup path with `python -X importtime`, checks
+that no heavyweight module is imported before the login window shows, and
+compares timings with the stored baseline in startup_baseline.json. The
+command-line interface (vault_cli.py) is profiled the same way and must not
+import PyQt5 at all.
+
+Usage:
+    python benchmarks/bench_startup.py                    # compare with baseline
+    python benchmarks/bench_startup.py --update-baseline  # store new baseline
+
+Exits with status 1 on a regression.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, "startup_baseline.json")
+
+RUNS = 5
+
+# A run may be this much slower than the baseline before it counts as a regression
+TOLERANCE = 1.5
+
+# Must not be imported until the user actually needs them
+DEFERRED_MODULES = [
+    "bcrypt", "mysql.connector", "cryptography", "auth_service", "db_config",
+    "dashboard", "register_window", "forgot_password_window", "update_password_window",
+]
+
+# Must not be imported by vault_cli before a command runs
+CLI_DEFERRED_MODULES = DEFERRED_MODULES + ["PyQt5"]
+
+SHOW_SCRIPT = """
+import time
+start = time.perf_counter()
+import sys
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from login_register import LoginRegisterWindow
+window = LoginRegisterWindow()
+window.show()
+app.processEvents()
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def run_python(args):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    return subprocess.run([sys.executable] + args, cwd=REPO_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def profile_imports(module="login_register"):
+    profiles = [parse_importtime(run_python(["-X", "importtime", "-c", f"import {module}"]).stderr)
+                for _ in range(RUNS)]
+    modules = profiles[-1]
+    total_ms = statistics.median(p[module][1] for p in profiles) / 1000
+    top = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    return modules, total_ms, [(name, self_us / 1000) for name, (self_us, _) in top]
+
+
+def time_to_show():
+    return statistics.median(float(run_python(["-c", SHOW_SCRIPT]).stdout.strip().splitlines()[-1])
+                             for _ in range(RUNS))
+
+
+def main():
+    modules, import_ms, top = profile_imports()
+    show_ms = time_to_show()
+    leaked = [name for name in DEFERRED_MODULES if name in modules]
+    cli_modules, cli_ms, _ = profile_imports("vault_cli")
+    cli_leaked = [name for name in CLI_DEFERRED_MODULES if name in cli_modules]
+
+    print(f"login_register import: {import_ms:.1f} ms")
+    print(f"time to show login window: {show_ms:.1f} ms")
+    print(f"vault_cli import: {cli_ms:.1f} ms")
+    print("slowest modules (self time):")
+    for name, ms in top:
+        print(f"  {ms:8.2f} ms  {name}")
+
+    failed = False
+    if leaked:
+        print(f"❌ Imported before the login window shows: {', '.join(leaked)}")
+        failed = True
+    if cli_leaked:
+        print(f"❌ Imported by vault_cli at startup: {', '.join(cli_leaked)}")
+        failed = True
+
+    result = {"login_import_ms": round(import_ms, 1), "time_to_show_ms": round(show_ms, 1),
+              "cli_import_ms": round(cli_ms, 1),
+              "slowest_modules": {name: round(ms, 2) for name, ms in top}}
+
+    if "--update-baseline" in sys.argv:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_FILE}")
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+        for key in ("login_import_ms", "time_to_show_ms", "cli_import_ms"):
+            if key not in baseline:
+                continue
+            limit = baseline[key] * TOLERANCE
+            if result[key] > limit:
+                print(f"❌ {key} regressed: {result[key]:.1f} ms > {limit:.1f} ms")
+                failed = True
+        if not failed:
+            print("✅ Startup within baseline")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Vault operations benchmark
+
+Seeds a local benchmark database (VAULT_DB_NAME, default password_vault_bench)
+with vaults of several sizes and measures, with Qt running offscreen:
+
+    - Dashboard.load_passwords
+    - add / update / delete as the GUI performs them (queued, shown at once)
+    - a burst of 20 edits from queueing until the write queue has committed them
+    - deleting 100 selected entries at once until the server has removed them
+    - switching the list between two tags of 5% of the entries each
+    - a verified login until the dashboard shows the vault, cold and with the
+      prefetch the login window starts when the username is entered
+    - login verification
+    - password validator throughput
+    - encryption throughput
+    - the share of prepared-statement executions that had to prepare first
+      (connections and their prepared statements are reused, see query_log.py)
+
+Usage:
+    python benchmarks/bench_vault.py [--sizes 100,10000,100000] [--update-baseline]
+
+All timings are stored lower-is-better (ms per operation or µs per item) and
+compared with vault_baseline.json; exits with status 1 on a regression.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from common import BENCH_DIR, check_baseline, median_ms, silence_message_boxes, use_scratch_key
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "vault_baseline.json")
+
+BENCH_USERNAME = "bench_user"
+BENCH_PASSWORD = "Bench#Password2024"
+SEED_BATCH = 1000
+BURST = 20
+BULK = 100
+
+
+def ensure_database():
+    """Create the benchmark database and schema if they are missing"""
+    import mysql.connector
+    import db_config
+    from schema import create_schema
+
+    conn = mysql.connector.connect(host=db_config.DB_HOST, user=db_config.DB_USER,
+                                   password=db_config.DB_PASSWORD)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{db_config.DB_NAME}`")
+    cursor.close()
+    conn.close()
+    create_schema()
+
+
+def ensure_user():
+    import bcrypt
+    from db_config import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT id FROM users WHERE username = %s", (BENCH_USERNAME,))
+    user = cursor.fetchone()
+    if user is None:
+        hashed = bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt()).decode()
+        cursor.execute(
+            "INSERT INTO users (email, username, master_password_hash) VALUES (%s, %s, %s)",
+            ("bench@example.com", BENCH_USERNAME, hashed)
+        )
+        conn.commit()
+        user_id = cursor.lastrowid
+    else:
+        user_id = user["id"]
+    cursor.close()
+    conn.close()
+    return user_id
+
+
+def seed_vault(user_id, size):
+    """Replace the benchmark user's vault with size encrypted entries"""
+    from db_config import get_connection
+    from encryption import batch_encrypt
+    from vault_sort import natural_key
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM passwords WHERE user_id = %s", (user_id,))
+    for start in range(0, size, SEED_BATCH):
+        count = min(SEED_BATCH, size - start)
+        tokens = batch_encrypt(f"seed-password-{start + i:06d}" for i in range(count))
+        # Descriptions in reverse id order, so sorting by name moves every row
+        descriptions = [f"Account {size - start - i:06d}" for i in range(count)]
+        cursor.executemany(
+            "INSERT INTO passwords (user_id, description, encrypted_password, sort_key) VALUES (%s, %s, %s, %s)",
+            [(user_id, d, token, natural_key(d)) for d, token in zip(descriptions, tokens)]
+        )
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def append_entries(user_id, count):
+    """Insert count more encrypted entries for the benchmark user"""
+    from db_config import get_connection
+    from encryption import batch_encrypt
+    from vault_sort import natural_key
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    tokens = batch_encrypt(f"bulk-password-{i:06d}" for i in range(count))
+    cursor.executemany(
+        "INSERT INTO passwords (user_id, description, encrypted_password, sort_key) VALUES (%s, %s, %s, %s)",
+        [(user_id, f"Bulk {i:06d}", token, natural_key(f"Bulk {i:06d}")) for i, token in enumerate(tokens)]
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def tag_seeded(user_id):
+    """Tag every twentieth entry "alpha" and the ones ten after them "beta" """
+    from db_config import get_connection
+    from vault_tags import tag_entries
+
+    conn = get_connection()
+    try:
+        ids = [row[0] for row in conn.execute("SELECT id FROM passwords WHERE user_id = %s ORDER BY id",
+                                              (user_id,)).fetchall()]
+        tag_entries(conn, user_id, ids[0::20], "alpha")
+        tag_entries(conn, user_id, ids[10::20], "beta")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def first_password_id(user_id):
+    from db_config import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, encrypted_password FROM passwords WHERE user_id = %s ORDER BY id LIMIT 1",
+                   (user_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row
+
+
+def bench_size(user_id, size, results):
+    from dashboard import Dashboard
+    from session_manager import Session
+    from update_password_window import UpdatePasswordWindow
+
+    seed_vault(user_id, size)
+    dashboard = Dashboard(user_id, Session(user_id))
+    repeat = 5 if size <= 10000 else 1
+
+    results[f"load_passwords_ms[{size}]"] = median_ms(dashboard.load_passwords, repeat)
+
+    def add():
+        dashboard.description_input.setText("Benchmark entry")
+        dashboard.password_input.setText("benchmark-secret")
+        dashboard.add_password()
+    results[f"add_roundtrip_ms[{size}]"] = median_ms(add, repeat)
+
+    password_id, _ = first_password_id(user_id)
+
+    def update():
+        window = UpdatePasswordWindow(user_id, password_id, "Account", dashboard.cache.token_for(password_id),
+                                      dashboard.refresh_view, dashboard.session.fernet, dashboard.writes)
+        window.new_pw_input.setText("updated-secret")
+        window.confirm_input.setText("updated-secret")
+        window.update_password()
+    results[f"update_roundtrip_ms[{size}]"] = median_ms(update, repeat)
+
+    def delete():
+        # Delete the newest entry so the vault stays at size
+        dashboard.set_selection({len(dashboard.entries) - 1})
+        dashboard.handle_delete()
+    results[f"delete_roundtrip_ms[{size}]"] = median_ms(delete, repeat)
+
+    samples = []
+    for _ in range(repeat):
+        # Put BULK entries back on the server, then select and delete them together
+        append_entries(user_id, BULK)
+        dashboard.load_passwords()
+        start = time.perf_counter()
+        dashboard.set_selection(set(range(len(dashboard.entries) - BULK, len(dashboard.entries))))
+        dashboard.handle_delete()
+        dashboard.writes.sync_now()
+        samples.append((time.perf_counter() - start) * 1000)
+    results[f"bulk_delete_{BULK}_ms[{size}]"] = sorted(samples)[repeat // 2]
+
+    # Everything above has reached the server before the burst is timed
+    dashboard.writes.sync_now()
+
+    def burst():
+        tokens = [dashboard.session.fernet.encrypt(f"burst-{i}".encode()).decode() for i in range(BURST)]
+        for entry, token in zip(dashboard.entries, tokens):
+            dashboard.writes.update(entry.id, token)
+        dashboard.writes.sync_now()
+    results[f"burst_{BURST}_writes_ms[{size}]"] = median_ms(burst, repeat)
+
+    tag_seeded(user_id)
+    dashboard.load_passwords()
+    tags = ["alpha", "beta"]
+
+    def switch_tag():
+        tags.reverse()
+        dashboard.tag_filter = {tags[0]}
+        dashboard.show_filtered()
+    results[f"tag_switch_ms[{size}]"] = median_ms(switch_tag, repeat)
+
+    # The server's order of each sort is read once; switching then only rearranges
+    sorts = ["name", "modified"]
+    for sort in sorts:
+        dashboard.cache.sort = sort
+        dashboard.writes.sync_now()
+
+    def switch_sort():
+        sorts.reverse()
+        dashboard.sort_box.setCurrentIndex(dashboard.sort_box.findData(sorts[0]))
+    results[f"sort_switch_ms[{size}]"] = median_ms(switch_sort, repeat)
+
+    card = dashboard.card_pool.widgets[0]
+
+    def reveal():
+        # Counted and put in the quick-access strip in memory; written by a later sync
+        card.toggle_btn.click()
+        card.toggle_btn.click()
+    results[f"reveal_ms[{size}]"] = median_ms(reveal, repeat)
+
+    dashboard.session.end()
+    dashboard.deleteLater()
+    bench_login_to_list(user_id, size, results)
+
+
+def bench_login_to_list(user_id, size, results):
+    from login_register import LoginRegisterWindow
+    from prefetch import get_prefetch
+
+    repeat = 5 if size <= 10000 else 1
+
+    def open_dashboard(warm):
+        window = LoginRegisterWindow()
+        if warm:
+            # The user has typed the username and is still on the password
+            get_prefetch().warm().result()
+        start = time.perf_counter()
+        window.open_main_window(user_id)
+        elapsed = time.perf_counter() - start
+        window.main_win.session.end()
+        window.main_win.deleteLater()
+        window.deleteLater()
+        return elapsed
+
+    for name, warm in (("login_to_list_ms", False), ("login_to_list_warm_ms", True)):
+        results[f"{name}[{size}]"] = sorted(open_dashboard(warm) for _ in range(repeat))[repeat // 2] * 1000
+
+
+def bench_login(results):
+    from auth_service import AuthService, LoginRateLimiter
+
+    # Generous limits: the benchmark measures verification, not throttling
+    service = AuthService(LoginRateLimiter(user_burst=1000, global_burst=1000))
+    service._get_dummy_hash()
+    results["login_ok_ms"] = median_ms(lambda: service.authenticate(BENCH_USERNAME, BENCH_PASSWORD))
+    results["login_unknown_user_ms"] = median_ms(lambda: service.authenticate("no_such_user", BENCH_PASSWORD))
+
+
+def bench_validator(results, count=20000):
+    from password_validator import PasswordValidator
+
+    passwords = [f"Candidate#{i:05d}pw" for i in range(count)]
+    start = time.perf_counter()
+    for pw in passwords:
+        PasswordValidator.validate_password(pw)
+    results["validator_us_per_call"] = (time.perf_counter() - start) / count * 1e6
+
+
+def bench_encryption(results, count=20000):
+    from encryption import batch_encrypt, batch_decrypt, get_fernet
+
+    fernet = get_fernet()
+    passwords = [f"benchmark-password-{i:06d}" for i in range(count)]
+    start = time.perf_counter()
+    tokens = batch_encrypt(passwords, fernet)
+    results["encrypt_us_per_item"] = (time.perf_counter() - start) / count * 1e6
+    start = time.perf_counter()
+    batch_decrypt(tokens, fernet)
+    results["decrypt_us_per_item"] = (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,10000,100000",
+                        help="comma separated vault sizes to seed (default: %(default)s)")
+    parser.add_argument("--no-db", action="store_true", help="only run benchmarks that need no database")
+    parser.add_argument("--update-baseline", action="store_true", help="store results as the new baseline")
+    args = parser.parse_args()
+
+    use_scratch_key()
+    results = {}
+    bench_validator(results)
+    bench_encryption(results)
+
+    if not args.no_db:
+        from PyQt5.QtWidgets import QApplication
+
+        app = QApplication(sys.argv)
+        silence_message_boxes()
+        ensure_database()
+        user_id = ensure_user()
+        bench_login(results)
+        for size in (int(s) for s in args.sizes.split(",")):
+            print(f"Benchmarking vault of {size} entries...")
+            bench_size(user_id, size, results)
+
+        from query_log import stats
+        results["prepared_miss_rate"] = 1 - stats.prepared_hit_rate
+
+    for metric, value in sorted(results.items()):
+        print(f"  {metric:<34} {value:12.3f}")
+
+    ok = check_baseline(results, BASELINE_FILE, update=args.update_baseline)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
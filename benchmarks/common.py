@@ -0,0 +1,94 @@
+"""
+Shared helpers for the benchmark scripts
+
+Puts the repository on sys.path, runs Qt offscreen, keeps modal message boxes
+from blocking scripted runs and compares results with stored baselines.
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, REPO_DIR)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# Benchmarks seed and wipe data, so never point them at the real vault
+os.environ.setdefault("VAULT_DB_NAME", "password_vault_bench")
+
+# A run may be this much slower than the baseline before it counts as a regression
+DEFAULT_TOLERANCE = 1.5
+
+
+def use_scratch_key():
+    """Run from a temporary directory so a throwaway secret.key is used"""
+    os.chdir(tempfile.mkdtemp(prefix="vault-bench-"))
+
+
+def median_ms(func, repeat=5):
+    """Median wall time of func() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def silence_message_boxes():
+    """
+    Replace the static QMessageBox helpers so scripted runs never block on a
+    modal dialog. Questions are answered Yes; all messages are recorded.
+    """
+    from PyQt5.QtWidgets import QMessageBox
+
+    messages = []
+
+    def record(kind, answer=None):
+        def show(parent, title, text, *args, **kwargs):
+            messages.append((kind, title, text))
+            return answer
+        return staticmethod(show)
+
+    QMessageBox.information = record("information", QMessageBox.Ok)
+    QMessageBox.warning = record("warning", QMessageBox.Ok)
+    QMessageBox.critical = record("critical", QMessageBox.Ok)
+    QMessageBox.question = record("question", QMessageBox.Yes)
+    return messages
+
+
+def check_baseline(results, baseline_file, update=False, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare results (metric -> value, lower is better) with the stored
+    baseline, or store them when update is set. Returns True when no metric
+    regressed beyond tolerance.
+    """
+    if update:
+        with open(baseline_file, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {baseline_file}")
+        return True
+
+    if not os.path.exists(baseline_file):
+        print("No baseline stored yet; run with --update-baseline to create one")
+        return True
+
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+
+    ok = True
+    for metric, value in sorted(results.items()):
+        if metric not in baseline:
+            continue
+        limit = baseline[metric] * tolerance
+        if value > limit:
+            print(f"❌ {metric} regressed: {value:.3f} > {limit:.3f} (baseline {baseline[metric]:.3f})")
+            ok = False
+    if ok:
+        print("✅ All metrics within baseline")
+    return ok
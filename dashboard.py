@@ -1,24 +1,79 @@
+import asyncio
 import sys
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QTableWidget, QTableWidgetItem, QStackedLayout, QMessageBox,
-    QHeaderView, QFrame, QScrollArea, QSizePolicy
+    QHeaderView, QFrame, QScrollArea, QSizePolicy, QListWidget, QListWidgetItem,
+    QAbstractItemView, QInputDialog, QComboBox
 )
-from PyQt5.QtCore import Qt
-from encryption import get_fernet
-from db_config import get_connection
-from update_password_window import UpdatePasswordWindow
+from PyQt5.QtCore import Qt, QTimer
+from encryption import batch_decrypt_secrets
+from secret_buffer import wipe_all
+from offline_cache import VaultCache
+from write_queue import WriteQueue
+from vault_entry import EntryStore, TagIndex
+from vault_sort import DEFAULT_SORT
+from vault_usage import FAVORITES
+from vault_tags import check_name
+from widget_pool import WidgetPool
+from session_manager import Session
+from theme import apply_theme, repolish
+import async_db
+import telemetry
+
+# A revealed password is masked again after this long
+REVEAL_TIMEOUT_MS = 30000
+
+MASK = "••••••••"
+
+# Sort orders offered above the list (vault_sort.SORTS)
+SORT_LABELS = [("Date added", "created"), ("Name", "name"), ("Last modified", "modified"), ("Most used", "used")]
+
+# Entries in the quick-access strip, and characters of a description shown on one
+QUICK_SIZE = 8
+QUICK_LABEL_LENGTH = 24
 
 
 class Dashboard(QWidget):
-    def __init__(self, user_id):
+    def __init__(self, user_id, session=None, cache=None, prefetched=None):
         super().__init__()
+        apply_theme()
         self.user_id = user_id
+        self.session = session or Session(user_id)
+        self.session.locked.connect(self.on_session_locked)
+        self.session.unlocked.connect(self.on_session_unlocked)
+        self.session.unlock_failed.connect(self.on_unlock_failed)
+        # Entries shown, each with its decrypted password; the secrets are
+        # wiped on lock/logout and refilled in place on unlock
+        self.entries = EntryStore()
+        # The entries' tags, the tags chosen in the sidebar and the entries
+        # shown for them (all of them when none is chosen)
+        self.tag_index = TagIndex()
+        self.tag_filter = set()
+        self.visible = []
+        # Positions of the selected cards, the card Shift extends the
+        # selection from, and the entry when exactly one is selected
+        self.selected_rows = set()
+        self.anchor_row = None
+        self.selected_entry = None
+        self.update_win = None
+        # Local snapshot shown at startup and while the server is unreachable;
+        # writes are queued in it and uploaded in the background. The login
+        # may already be fetching it (write_queue.fetch_vault)
+        self.cache = cache or VaultCache(user_id)
+        self.writes = WriteQueue(self.cache, self.session, parent=self)
+        self.writes.synced.connect(self.on_synced)
+        self.writes.failed.connect(self.on_sync_failed)
+        self.offline = False
+        self.unlocked_page = 0
+        self.reveal_timer = QTimer(self)
+        self.reveal_timer.setSingleShot(True)
+        self.reveal_timer.timeout.connect(lambda: self.hide_all_other_passwords(None))
         self.setWindowTitle("Password Vault - Dashboard")
         self.setFixedSize(900, 720)
         self.setWindowFlags(Qt.WindowCloseButtonHint | Qt.WindowMinimizeButtonHint)
         self.init_ui()
-        self.apply_styles()
+        self.load_initial(prefetched)
 
     def init_ui(self):
         # Main layout
@@ -43,7 +98,12 @@ class Dashboard(QWidget):
         # Store logout button reference for enabling/disabling
         self.logout_btn = logout_btn
         
+        self.lock_btn = QPushButton("🔒 Lock")
+        self.lock_btn.setObjectName("logoutButton")
+        self.lock_btn.clicked.connect(self.session.lock)
+        
         top_row_layout.addStretch()
+        top_row_layout.addWidget(self.lock_btn)
         top_row_layout.addWidget(logout_btn)
         
         # App title
@@ -86,6 +146,7 @@ class Dashboard(QWidget):
         self.pages = QStackedLayout()
         self.pages.addWidget(self.build_list_page())
         self.pages.addWidget(self.build_new_password_page())
+        self.pages.addWidget(self.build_lock_page())
         self.content_frame.setLayout(self.pages)
         
         # Add to main layout
@@ -105,6 +166,9 @@ class Dashboard(QWidget):
         )
         
         if reply == QMessageBox.Yes:
+            self.wipe_secrets()
+            self.session.end()
+
             # Import here to avoid circular imports
             from login_register import LoginRegisterWindow
             
@@ -115,10 +179,113 @@ class Dashboard(QWidget):
             # Close dashboard
             self.close()
 
+    def build_lock_page(self):
+        frame = QFrame()
+        frame.setObjectName("pageFrame")
+        outer_layout = QVBoxLayout()
+        outer_layout.setContentsMargins(40, 30, 40, 30)
+        outer_layout.setSpacing(30)
+
+        page_title = QLabel("🔒 Vault Locked")
+        page_title.setObjectName("pageTitle")
+        page_title.setAlignment(Qt.AlignCenter)
+        outer_layout.addWidget(page_title)
+
+        form_container = QFrame()
+        form_container.setObjectName("formContainer")
+        form_layout = QVBoxLayout()
+        form_layout.setContentsMargins(60, 40, 60, 40)
+        form_layout.setSpacing(25)
+
+        pw_label = QLabel("Master Password")
+        pw_label.setObjectName("inputLabel")
+
+        pw_container = QFrame()
+        pw_container.setObjectName("inputContainer")
+        pw_inner_layout = QVBoxLayout()
+        pw_inner_layout.setContentsMargins(20, 10, 20, 10)
+
+        self.unlock_input = QLineEdit()
+        self.unlock_input.setObjectName("modernInput")
+        self.unlock_input.setEchoMode(QLineEdit.Password)
+        self.unlock_input.setPlaceholderText("Enter your master password to unlock")
+        self.unlock_input.returnPressed.connect(self.handle_unlock)
+
+        pw_inner_layout.addWidget(self.unlock_input)
+        pw_container.setLayout(pw_inner_layout)
+
+        self.unlock_btn = QPushButton("Unlock")
+        self.unlock_btn.setObjectName("primaryButton")
+        self.unlock_btn.clicked.connect(self.handle_unlock)
+
+        form_layout.addWidget(pw_label)
+        form_layout.addWidget(pw_container)
+        form_layout.addWidget(self.unlock_btn, alignment=Qt.AlignRight)
+        form_container.setLayout(form_layout)
+
+        outer_layout.addWidget(form_container, alignment=Qt.AlignCenter)
+        outer_layout.addStretch()
+        frame.setLayout(outer_layout)
+        return frame
+
+    def on_session_locked(self):
+        """Wipe decrypted data and cover the vault; widgets are kept as they are"""
+        self.wipe_secrets()
+        if getattr(self, "update_win", None) is not None and self.update_win.isVisible():
+            self.update_win.reject()
+
+        if self.pages.currentIndex() != 2:
+            self.unlocked_page = self.pages.currentIndex()
+        self.btn_list.setEnabled(False)
+        self.btn_new.setEnabled(False)
+        self.lock_btn.setEnabled(False)
+        self.pages.setCurrentIndex(2)
+        self.unlock_input.setFocus()
+
+    def handle_unlock(self):
+        # Stripped like the login does, so the same password works in both
+        password = self.unlock_input.text().strip()
+        self.unlock_input.clear()
+        if not password:
+            QMessageBox.critical(self, "Unlock Failed", "Invalid master password.")
+            return
+        if self.session.is_unlocking:
+            return
+        # Checked on the auth worker so bcrypt never blocks the GUI thread
+        self.unlock_btn.setEnabled(False)
+        self.unlock_btn.setText("Unlocking...")
+        self.session.unlock(password)
+
+    def on_unlock_failed(self, error):
+        self.unlock_btn.setEnabled(True)
+        self.unlock_btn.setText("Unlock")
+        if error is not None:
+            QMessageBox.critical(self, "Error", f"Could not unlock:\n{str(error)}")
+        else:
+            QMessageBox.critical(self, "Unlock Failed", "Invalid master password.")
+        self.unlock_input.setFocus()
+
+    def on_session_unlocked(self):
+        self.unlock_btn.setEnabled(True)
+        self.unlock_btn.setText("Unlock")
+        # Refill the existing buffers in place; no query and no card rebuild
+        try:
+            with telemetry.span("dashboard.unlock_refill", {"vault.rows": len(self.entries)}):
+                batch_decrypt_secrets(self.entries.tokens(), self.session.fernet, into=self.entries.secrets())
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to unlock passwords:\n{str(e)}")
+
+        self.btn_list.setEnabled(True)
+        self.btn_new.setEnabled(True)
+        self.lock_btn.setEnabled(True)
+        self.pages.setCurrentIndex(self.unlocked_page)
+        # Writes queued while locked go out now
+        self.writes.sync()
+
     def switch_to_new_page(self):
         self.btn_list.setObjectName("tabButton")
         self.btn_new.setObjectName("tabButtonActive")
-        self.apply_styles()  # Refresh styles
+        repolish(self.btn_list, self.btn_new)
         self.pages.setCurrentIndex(1)
 
     def on_switch_to_list_page(self):
@@ -144,7 +311,7 @@ class Dashboard(QWidget):
 
         self.btn_list.setObjectName("tabButtonActive")
         self.btn_new.setObjectName("tabButton")
-        self.apply_styles()  # Refresh styles
+        repolish(self.btn_list, self.btn_new)
         self.pages.setCurrentIndex(0)
 
     def build_list_page(self):
@@ -162,12 +329,47 @@ class Dashboard(QWidget):
         
         self.stats_label = QLabel("0 passwords stored")
         self.stats_label.setObjectName("statsLabel")
+
+        self.sort_box = QComboBox()
+        self.sort_box.setObjectName("sortBox")
+        for label, sort in SORT_LABELS:
+            self.sort_box.addItem(label, sort)
+        self.sort_box.setCurrentIndex(self.sort_box.findData(self.cache.sort))
+        self.sort_box.currentIndexChanged.connect(self.on_sort_changed)
         
         header_layout.addWidget(page_title)
         header_layout.addStretch()
         header_layout.addWidget(self.stats_label)
+        header_layout.addWidget(self.sort_box)
         layout.addLayout(header_layout)
 
+        # Favorites, then the entries used last (vault_usage.py); clicking
+        # one selects its card and scrolls to it
+        self.quick_frame = QFrame()
+        self.quick_frame.setObjectName("quickStrip")
+        quick_layout = QHBoxLayout()
+        quick_layout.setContentsMargins(0, 0, 0, 0)
+        quick_layout.setSpacing(8)
+        quick_label = QLabel("Quick access")
+        quick_label.setObjectName("quickLabel")
+        chips_layout = QHBoxLayout()
+        chips_layout.setSpacing(8)
+        chips_layout.addStretch()
+        quick_layout.addWidget(quick_label)
+        quick_layout.addLayout(chips_layout)
+        self.quick_frame.setLayout(quick_layout)
+        self.quick_frame.hide()
+        self.quick_pool = WidgetPool(self.create_quick_button, self.bind_quick_button, chips_layout, name="quick")
+        layout.addWidget(self.quick_frame)
+
+        # Tags to filter by; choosing several shows the entries having all of them
+        self.tag_list = QListWidget()
+        self.tag_list.setObjectName("tagSidebar")
+        self.tag_list.setFixedWidth(170)
+        self.tag_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.tag_list.itemSelectionChanged.connect(self.on_tag_filter_changed)
+        self.update_sidebar()
+
         # Passwords container with scroll
         scroll_area = QScrollArea()
         scroll_area.setObjectName("scrollArea")
@@ -179,15 +381,31 @@ class Dashboard(QWidget):
         self.passwords_layout = QVBoxLayout()
         self.passwords_layout.setSpacing(15)
         self.passwords_container.setLayout(self.passwords_layout)
+
+        # Cards are recycled across refreshes; the empty state and the
+        # stretch pushing the cards to the top stay below them
+        self.empty_label = QLabel("No passwords saved yet.\nClick 'Add New Password' to get started!")
+        self.empty_label.setObjectName("emptyState")
+        self.empty_label.setAlignment(Qt.AlignCenter)
+        self.empty_label.hide()
+        self.passwords_layout.addWidget(self.empty_label)
+        self.passwords_layout.addStretch()
+        self.card_pool = WidgetPool(self.create_password_card, self.bind_card, self.passwords_layout, name="cards")
         
         # Make container clickable to deselect cards
         self.passwords_container.mousePressEvent = lambda event: self.deselect_all_cards()
         
         scroll_area.setWidget(self.passwords_container)
+        self.scroll_area = scroll_area
         
         # Make scroll area clickable to deselect cards
         scroll_area.mousePressEvent = lambda event: self.deselect_all_cards()
-        layout.addWidget(scroll_area)
+
+        body_layout = QHBoxLayout()
+        body_layout.setSpacing(15)
+        body_layout.addWidget(self.tag_list)
+        body_layout.addWidget(scroll_area)
+        layout.addLayout(body_layout)
 
         # Action buttons - Always visible
         self.action_frame = QFrame()
@@ -205,7 +423,25 @@ class Dashboard(QWidget):
         self.update_btn.setObjectName("secondaryButton")
         self.update_btn.setEnabled(False)
         self.update_btn.clicked.connect(self.open_update_window)
+
+        self.tag_btn = QPushButton("Tag Selected")
+        self.tag_btn.setObjectName("secondaryButton")
+        self.tag_btn.setEnabled(False)
+        self.tag_btn.clicked.connect(self.handle_tag)
+
+        self.untag_btn = QPushButton("Untag Selected")
+        self.untag_btn.setObjectName("secondaryButton")
+        self.untag_btn.setEnabled(False)
+        self.untag_btn.clicked.connect(self.handle_untag)
+
+        self.favorite_btn = QPushButton("Favorite")
+        self.favorite_btn.setObjectName("secondaryButton")
+        self.favorite_btn.setEnabled(False)
+        self.favorite_btn.clicked.connect(self.handle_favorite)
         
+        action_layout.addWidget(self.favorite_btn)
+        action_layout.addWidget(self.tag_btn)
+        action_layout.addWidget(self.untag_btn)
         action_layout.addStretch()
         action_layout.addWidget(self.update_btn)
         action_layout.addWidget(self.delete_btn)
@@ -218,10 +454,10 @@ class Dashboard(QWidget):
         # Make page frame clickable to deselect cards
         frame.mousePressEvent = lambda event: self.deselect_all_cards()
         
-        self.load_passwords()
         return frame
 
-    def create_password_card(self, password_data, row_idx):
+    def create_password_card(self):
+        """An unbound card; bind_card() fills it in"""
         card = QFrame()
         card.setObjectName("passwordCard")
         card.setProperty("selected", False)
@@ -233,10 +469,10 @@ class Dashboard(QWidget):
         # Header with description and ID
         header_layout = QHBoxLayout()
         
-        description_label = QLabel(password_data["description"])
+        description_label = QLabel()
         description_label.setObjectName("cardDescription")
         
-        id_label = QLabel(f"#{row_idx + 1}")
+        id_label = QLabel()
         id_label.setObjectName("cardId")
         
         header_layout.addWidget(description_label)
@@ -246,13 +482,12 @@ class Dashboard(QWidget):
         # Password display
         password_layout = QHBoxLayout()
         
-        password_label = QLabel("••••••••")
+        password_label = QLabel(MASK)
         password_label.setObjectName("cardPassword")
         
         toggle_btn = QPushButton("Show")
         toggle_btn.setObjectName("toggleButton")
-        decrypted_pw = password_data["decrypted_password"]
-        toggle_btn.clicked.connect(lambda checked, lbl=password_label, btn=toggle_btn, pw=decrypted_pw: self.toggle_card_password(lbl, btn, pw))
+        toggle_btn.clicked.connect(lambda checked: self.toggle_card_password(password_label, toggle_btn, card.entry))
         
         password_layout.addWidget(password_label)
         password_layout.addStretch()
@@ -262,16 +497,76 @@ class Dashboard(QWidget):
         card_layout.addLayout(password_layout)
         card.setLayout(card_layout)
         
-        # Store data for selection
-        card.password_id = password_data["id"]
-        card.description = password_data["description"]
-        card.row_idx = row_idx
+        card.description_label = description_label
+        card.id_label = id_label
+        card.password_label = password_label
+        card.toggle_btn = toggle_btn
+        card.entry = None
+        card.row = None
         
-        # Make card clickable
-        card.mousePressEvent = lambda event: self.select_card(card)
+        # Make card clickable; Ctrl and Shift add to the selection
+        card.mousePressEvent = lambda event: self.select_card(card, event.modifiers())
         
         return card
 
+    def bind_card(self, card, entry, row_idx):
+        """Point a new or recycled card at an entry"""
+        # The card refers to its entry rather than copying its fields
+        card.entry = entry
+        card.row = row_idx
+        card.description_label.setText(entry.description)
+        card.id_label.setText(f"#{row_idx + 1}")
+        if card.password_label.text() != MASK:
+            card.password_label.setText(MASK)
+            card.toggle_btn.setText("Show")
+        if card.property("selected"):
+            card.setProperty("selected", False)
+            repolish(card)
+
+    def create_quick_button(self):
+        button = QPushButton()
+        button.setObjectName("quickButton")
+        button.entry = None
+        button.clicked.connect(lambda checked: self.open_quick(button.entry))
+        return button
+
+    def bind_quick_button(self, button, item, index):
+        entry, favorite = item
+        button.entry = entry
+        text = entry.description
+        if len(text) > QUICK_LABEL_LENGTH:
+            text = text[:QUICK_LABEL_LENGTH - 1] + "…"
+        button.setText(f"★ {text}" if favorite else text)
+        button.setToolTip(entry.description)
+
+    def update_quick_strip(self):
+        """Favorites, then the entries used last; from memory, nothing is queried"""
+        items = [(entry, True) for entry in self.tag_index.filter(self.entries, {FAVORITES})[:QUICK_SIZE]]
+        shown = {entry.id for entry, _ in items}
+        for row_id in self.writes.usage.recent():
+            if len(items) >= QUICK_SIZE:
+                break
+            entry = self.entries.get(row_id)
+            if entry is not None and row_id not in shown:
+                items.append((entry, False))
+                shown.add(row_id)
+        self.quick_pool.show(items)
+        self.quick_frame.setVisible(bool(items))
+
+    def open_quick(self, entry):
+        """Select an entry from the quick-access strip and scroll its card into view"""
+        if entry not in self.visible:
+            # Hidden by the tag filter; show everything
+            self.tag_filter = set()
+            self.update_sidebar()
+            self.show_filtered()
+            if entry not in self.visible:
+                return
+        row = self.visible.index(entry)
+        self.set_selection({row})
+        self.anchor_row = row
+        self.scroll_area.ensureWidgetVisible(self.card_pool.widgets[row])
+
     def eventFilter(self, obj, event):
         """Handle clicks outside password cards to deselect"""
         if event.type() == event.MouseButtonPress:
@@ -282,164 +577,446 @@ class Dashboard(QWidget):
 
     def deselect_all_cards(self):
         """Deselect all password cards and disable action buttons"""
-        # Deselect all cards
-        for i in range(self.passwords_layout.count()):
-            item = self.passwords_layout.itemAt(i)
-            if item and item.widget():
-                card = item.widget()
-                if hasattr(card, 'password_id'):
-                    card.setProperty("selected", False)
-        
-        # Clear selected data
-        if hasattr(self, 'selected_password_id'):
-            delattr(self, 'selected_password_id')
-        if hasattr(self, 'selected_description'):
-            delattr(self, 'selected_description')
-        if hasattr(self, 'selected_row'):
-            delattr(self, 'selected_row')
-        
-        # Disable action buttons
-        self.delete_btn.setEnabled(False)
-        self.update_btn.setEnabled(False)
-        
-        # Refresh styles
-        self.apply_styles()
-
-    def select_card(self, selected_card):
-        # Deselect all cards
-        for i in range(self.passwords_layout.count()):
-            item = self.passwords_layout.itemAt(i)
-            if item and item.widget():
-                card = item.widget()
-                if hasattr(card, 'password_id'):
-                    card.setProperty("selected", False)
-                    card.setStyleSheet("")  # Reset style
-        
-        # Select this card
-        selected_card.setProperty("selected", True)
-        self.apply_styles()  # Refresh styles
-        
-        # Store selected data
-        self.selected_password_id = selected_card.password_id
-        self.selected_description = selected_card.description
-        self.selected_row = selected_card.row_idx
-        
-        # Enable action buttons
-        self.delete_btn.setEnabled(True)
-        self.update_btn.setEnabled(True)
-
-    def toggle_card_password(self, label, button, real_password):
-        if label.text() == "••••••••":
-            # Show this password
-            label.setText(real_password)
+        self.set_selection(set())
+
+    def select_card(self, card, modifiers=Qt.NoModifier):
+        """Select a card; Ctrl toggles it in the selection, Shift selects the range from the last click"""
+        row = card.row
+        if modifiers & Qt.ShiftModifier and self.anchor_row is not None:
+            first, last = sorted((self.anchor_row, row))
+            rows = set(range(first, last + 1))
+            if modifiers & Qt.ControlModifier:
+                rows |= self.selected_rows
+        else:
+            rows = self.selected_rows ^ {row} if modifiers & Qt.ControlModifier else {row}
+            self.anchor_row = row
+        self.set_selection(rows)
+
+    def set_selection(self, rows):
+        """Select the cards at these positions; only cards whose state changes are restyled"""
+        cards = self.card_pool.widgets
+        for row in self.selected_rows ^ rows:
+            cards[row].setProperty("selected", row in rows)
+            repolish(cards[row])
+        self.selected_rows = rows
+        if not rows:
+            self.anchor_row = None
+        self.selected_entry = self.visible[next(iter(rows))] if len(rows) == 1 else None
+
+        # Edit works on one entry, delete and tagging on any number
+        self.delete_btn.setEnabled(bool(rows))
+        self.update_btn.setEnabled(len(rows) == 1)
+        self.tag_btn.setEnabled(bool(rows))
+        self.untag_btn.setEnabled(bool(rows))
+        self.favorite_btn.setEnabled(bool(rows))
+        self.favorite_btn.setText("Unfavorite" if rows and self.all_favorites(self.selected_entries()) else "Favorite")
+
+    def selected_entries(self):
+        return [self.visible[row] for row in sorted(self.selected_rows)]
+
+    def toggle_card_password(self, label, button, entry):
+        if label.text() == MASK:
+            # Show this password; the temporary str is wiped once Qt has it
+            entry.secret.show_in(label.setText)
             button.setText("Hide")
             
             # Hide all other passwords
             self.hide_all_other_passwords(label)
+            self.reveal_timer.start(REVEAL_TIMEOUT_MS)
+            # Counted in memory and written with a later sync
+            self.writes.use(entry.id)
+            self.update_quick_strip()
         else:
             # Hide this password
-            label.setText("••••••••")
+            label.setText(MASK)
             button.setText("Show")
+            self.reveal_timer.stop()
 
     def hide_all_other_passwords(self, current_label):
         """Hide all password labels except the current one"""
-        for i in range(self.passwords_layout.count()):
-            item = self.passwords_layout.itemAt(i)
-            if item and item.widget():
-                card = item.widget()
-                if hasattr(card, 'password_id'):
-                    # Navigate through the card layout to find password components
-                    card_layout = card.layout()
-                    if card_layout and card_layout.count() >= 2:
-                        password_layout_item = card_layout.itemAt(1)
-                        if password_layout_item and password_layout_item.layout():
-                            password_layout = password_layout_item.layout()
-                            if password_layout.count() >= 3:
-                                password_label = password_layout.itemAt(0).widget()
-                                toggle_button = password_layout.itemAt(2).widget()
-                                
-                                # Only hide if it's not the current label and it's showing a password
-                                if (password_label and toggle_button and 
-                                    password_label != current_label and 
-                                    password_label.text() != "••••••••"):
-                                    password_label.setText("••••••••")
-                                    toggle_button.setText("Show")
+        for card in self.card_pool:
+            # Only hide if it's not the current label and it's showing a password
+            if card.password_label != current_label and card.password_label.text() != MASK:
+                card.password_label.setText(MASK)
+                card.toggle_btn.setText("Show")
+
+    def wipe_secrets(self):
+        """Mask every card and zero all decrypted passwords held by the dashboard"""
+        self.reveal_timer.stop()
+        self.hide_all_other_passwords(None)
+        wipe_all(self.entries.secrets())
+
+    def closeEvent(self, event):
+        self.wipe_secrets()
+        self.session.end()
+        super().closeEvent(event)
 
     def handle_delete(self):
-        if not hasattr(self, 'selected_password_id'):
+        entries = self.selected_entries()
+        if not entries:
             return
 
-        reply = QMessageBox.question(
-            self, "Confirm Delete",
-            f"Are you sure you want to delete the password for:\n\n'{self.selected_description}'?",
-            QMessageBox.Yes | QMessageBox.No
-        )
+        if len(entries) == 1:
+            question = f"Are you sure you want to delete the password for:\n\n'{entries[0].description}'?"
+        else:
+            question = f"Are you sure you want to delete {len(entries)} passwords?"
+        reply = QMessageBox.question(self, "Confirm Delete", question, QMessageBox.Yes | QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            try:
-                conn = get_connection()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM passwords WHERE id = %s AND user_id = %s", 
-                             (self.selected_password_id, self.user_id))
-                conn.commit()
-                QMessageBox.information(self, "Deleted", "Password deleted successfully.")
+            # Uploaded as one set-based DELETE in one transaction
+            self.writes.delete_many([entry.id for entry in entries])
+            self.remove_entries(entries)
+            if len(entries) == 1:
+                deleted = "Password deleted"
+            else:
+                deleted = f"{len(entries)} passwords deleted"
+            if self.offline:
+                message = f"{deleted}. The server is unreachable, so the change will be saved on the next sync."
+            else:
+                message = f"{deleted} successfully."
+            QMessageBox.information(self, "Deleted", message)
+
+    def remove_entries(self, entries):
+        """Take entries off the list; the others keep their cards and decrypted passwords"""
+        self.set_selection(set())
+        wipe_all([entry.secret for entry in entries if entry.secret is not None])
+        removed = {entry.id for entry in entries}
+        self.entries.remove(removed)
+        # Positions have shifted
+        self.tag_index = TagIndex(self.entries, self.tag_index.tags)
+        first = next((i for i, entry in enumerate(self.visible) if entry.id in removed), len(self.visible))
+        self.visible = [entry for entry in self.visible if entry.id not in removed]
+        # Cards above the first removed entry still show the right one
+        self.card_pool.show(self.visible, start=first)
+        self.empty_label.setVisible(not self.visible)
+        if self.update_sidebar():
+            self.show_filtered()
+        self.update_quick_strip()
+        self.update_stats_label()
+
+    def all_favorites(self, entries):
+        return all(FAVORITES in self.tag_index.tags.get(entry.id, ()) for entry in entries)
+
+    def handle_favorite(self):
+        """Make the selected entries favorites, or take them off when they all are"""
+        entries = self.selected_entries()
+        if not entries:
+            return
+        remove = self.all_favorites(entries)
+        # Favorites are a tag, queued and uploaded like any other
+        self.writes.tag([entry.id for entry in entries], FAVORITES, remove=remove)
+        self.refresh_tags()
+        self.favorite_btn.setText("Favorite" if remove else "Unfavorite")
+
+    def handle_tag(self):
+        entries = self.selected_entries()
+        if not entries:
+            return
+        count = f"{len(entries)} password{'s' if len(entries) != 1 else ''}"
+        name, ok = QInputDialog.getItem(self, "Tag Passwords", f"Tag for {count} (pick one or type a new one):",
+                                        self.tag_index.names(), 0, True)
+        if not ok or not name.strip():
+            return
+        try:
+            name = check_name(name)
+        except ValueError as e:
+            QMessageBox.warning(self, "Input Error", f"{str(e).capitalize()}.")
+            return
+        # Uploaded as one set-based statement, like a bulk delete
+        self.writes.tag([entry.id for entry in entries], name)
+        self.refresh_tags()
+
+    def handle_untag(self):
+        entries = self.selected_entries()
+        names = sorted(set().union(*(self.tag_index.tags.get(entry.id, ()) for entry in entries)), key=str.casefold)
+        if not names:
+            QMessageBox.information(self, "Untag Passwords", "The selected passwords have no tags.")
+            return
+        # The tag being viewed is the likely one to take off
+        current = next((i for i, name in enumerate(names) if name in self.tag_filter), 0)
+        name, ok = QInputDialog.getItem(self, "Untag Passwords", "Remove tag:", names, current, False)
+        if ok:
+            self.writes.tag([entry.id for entry in entries], name, remove=True)
+            self.refresh_tags()
+
+    def refresh_tags(self):
+        """Re-index the tags (queued changes included) without rebuilding the entries"""
+        self.tag_index = TagIndex(self.entries, self.cache.current_tags())
+        self.update_quick_strip()
+        # With a filter the view may change; without one every entry stays shown
+        if self.update_sidebar() or self.tag_filter:
+            self.show_filtered()
+
+    def update_sidebar(self):
+        """List every tag with its size; returns True when a chosen tag went away and the filter changed"""
+        names = self.tag_index.names()
+        dropped = self.tag_filter - set(names)
+        self.tag_filter -= dropped
+        self.tag_list.blockSignals(True)
+        self.tag_list.clear()
+        all_item = QListWidgetItem(f"All passwords ({len(self.entries)})")
+        self.tag_list.addItem(all_item)
+        for name in names:
+            item = QListWidgetItem(f"{name} ({self.tag_index.count(name)})")
+            item.setData(Qt.UserRole, name)
+            self.tag_list.addItem(item)
+            item.setSelected(name in self.tag_filter)
+        all_item.setSelected(not self.tag_filter)
+        self.tag_list.blockSignals(False)
+        return bool(dropped)
+
+    def on_tag_filter_changed(self):
+        names = {item.data(Qt.UserRole) for item in self.tag_list.selectedItems()}
+        names.discard(None)
+        self.tag_filter = names
+        # "All passwords" is highlighted exactly when no tag is chosen
+        self.tag_list.blockSignals(True)
+        self.tag_list.item(0).setSelected(not names)
+        self.tag_list.blockSignals(False)
+        self.show_filtered()
+
+    def on_sort_changed(self, index):
+        """Rearrange the shown entries; the server's order follows from a sync if it is not cached"""
+        sort = self.sort_box.itemData(index)
+        with telemetry.span("dashboard.sort", {"vault.sort": sort}):
+            self.cache.sort = sort
+            self.sort_entries()
+        if sort != DEFAULT_SORT and sort not in self.cache.orders:
+            self.writes.sync()
+
+    def sort_entries(self):
+        """Put the entries in the cache's order without decrypting them again"""
+        rows = self.cache.sorted_rows()
+        if self.entries.reorder(rows):
+            self.show_reordered()
+        else:
+            self.show_rows(rows)
+
+    def show_reordered(self):
+        # Tag bitmaps are over positions, which just moved
+        self.tag_index = TagIndex(self.entries, self.cache.current_tags())
+        self.update_quick_strip()
+        self.show_filtered()
+        self.update_stats_label()
+
+    def show_filtered(self):
+        """Show the entries having every chosen tag; nothing is decrypted or queried"""
+        with telemetry.span("dashboard.filter", {"vault.tags": len(self.tag_filter)}) as span:
+            self.set_selection(set())
+            self.visible = self.tag_index.filter(self.entries, self.tag_filter)
+            span.set_attribute("vault.rows", len(self.visible))
+            self.card_pool.show(self.visible)
+            self.empty_label.setVisible(not self.visible)
+
+    def load_initial(self, prefetched=None):
+        """Show the cached vault at once and refresh it from the server in the background"""
+        if prefetched is not None:
+            self.show_prefetched(prefetched)
+            return
+        if not self.cache.load(self.session.fernet):
+            if async_db.available():
+                asyncio.ensure_future(self.load_async())
+            else:
                 self.load_passwords()
-                # Disable action buttons after delete
-                self.delete_btn.setEnabled(False)
-                self.update_btn.setEnabled(False)
+            return
+        self.show_rows(self.cache.sorted_rows())
+        self.writes.sync()
+        self.update_stats_label()
+
+    def show_prefetched(self, prefetched):
+        """Show the vault the login fetched (write_queue.fetch_vault) while the window was being built"""
+        with telemetry.span("dashboard.wait_prefetch") as span:
+            try:
+                flushed = prefetched.result()
             except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to delete:\n{str(e)}")
-            finally:
-                cursor.close()
-                conn.close()
+                span.record_error(e)
+                self.clear_cards()
+                QMessageBox.critical(self, "Error", f"Failed to load passwords:\n{str(e)}")
+                return
+        self.show_rows(self.cache.sorted_rows())
+        if flushed is None:
+            # Shown from the cache file; refresh it from the server
+            self.writes.sync()
+            self.update_stats_label()
+        else:
+            self.report_flush(flushed)
 
-    def load_passwords(self):
-        # Clear existing cards
-        for i in reversed(range(self.passwords_layout.count())):
-            item = self.passwords_layout.itemAt(i)
-            if item:
-                widget = item.widget()
-                if widget:
-                    widget.setParent(None)
+    async def load_async(self):
+        """First load without a cache file: the vault and the user's record are fetched concurrently"""
+        with telemetry.span("dashboard.load_async") as span:
+            # unlock() fetches the hash itself if that part fails
+            synced, _ = await asyncio.gather(self.writes.sync_async(), self.session.load_password_hash_async(),
+                                             return_exceptions=True)
+            if isinstance(synced, Exception):
+                span.record_error(synced)
+                self.clear_cards()
+                QMessageBox.critical(self, "Error", f"Failed to load passwords:\n{str(synced)}")
+                return
+            if self.session.is_locked:
+                # Shown once unlocked
+                return
+            rows = self.cache.sorted_rows()
+            span.set_attribute("vault.rows", len(rows))
+            self.show_rows(rows)
 
-        try:
-            conn = get_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM passwords WHERE user_id = %s", (self.user_id,))
-            rows = cursor.fetchall()
-            fernet = get_fernet()
-
-            # Update stats
-            count = len(rows)
-            self.stats_label.setText(f"{count} password{'s' if count != 1 else ''} stored")
-
-            if count == 0:
-                # Show empty state
-                empty_label = QLabel("No passwords saved yet.\nClick 'Add New Password' to get started!")
-                empty_label.setObjectName("emptyState")
-                empty_label.setAlignment(Qt.AlignCenter)
-                self.passwords_layout.addWidget(empty_label)
+    def refresh_view(self):
+        """
+        Show the vault as it is with the queued writes, without asking the
+        server. Called after each add or edit, so only the entries that changed
+        are decrypted and only the cards whose entry changed are rebound.
+        """
+        with telemetry.span("dashboard.refresh_view") as span:
+            self.set_selection(set())
+            fresh, dropped = self.entries.merge(self.cache.sorted_rows())
+            span.set_attribute("vault.changed", len(fresh))
+            wipe_all([entry.secret for entry in dropped if entry.secret is not None])
+            try:
+                secrets = batch_decrypt_secrets([entry.token for entry in fresh], self.session.fernet)
+            except Exception as e:
+                self.clear_cards()
+                QMessageBox.critical(self, "Error", f"Failed to load passwords:\n{str(e)}")
+                return
+            for entry, secret in zip(fresh, secrets):
+                entry.secret = secret
+
+            self.tag_index = TagIndex(self.entries, self.cache.current_tags())
+            old = self.visible
+            self.visible = self.tag_index.filter(self.entries, self.tag_filter)
+            if len(old) == len(self.visible):
+                # An edit: rebind just the cards showing a replaced entry
+                cards = self.card_pool.widgets
+                for row, (before, entry) in enumerate(zip(old, self.visible)):
+                    if before is not entry:
+                        self.bind_card(cards[row], entry, row)
             else:
-                # Add password cards
-                for row_idx, row in enumerate(rows):
-                    decrypted_pw = fernet.decrypt(row["encrypted_password"].encode()).decode()
-                    password_data = {
-                        "id": row["id"],
-                        "description": row["description"],
-                        "decrypted_password": decrypted_pw
-                    }
-                    
-                    card = self.create_password_card(password_data, row_idx)
-                    self.passwords_layout.addWidget(card)
-
-            # Add stretch to push cards to top
-            self.passwords_layout.addStretch()
+                # Cards above the first new entry still show the right one
+                first = next((i for i, (before, entry) in enumerate(zip(old, self.visible)) if before is not entry),
+                             min(len(old), len(self.visible)))
+                self.card_pool.show(self.visible, start=first)
+            self.empty_label.setVisible(not self.visible)
+            self.update_sidebar()
+            self.update_quick_strip()
+            self.update_stats_label()
+
+    def on_synced(self, flushed):
+        was_offline = self.offline
+        self.offline = False
+        self.report_flush(flushed, was_offline)
+        # Nothing to redraw if the server agrees with what is shown; a locked
+        # vault picks the rows up on the next load
+        rows = self.cache.sorted_rows()
+        if self.session.is_locked:
+            self.update_stats_label()
+            return
+        if self.entries.matches(rows):
+            self.update_stats_label()
+        elif self.entries.matches(rows, ignore_ids=True):
+            # Only uploaded entries got their server ids; cards and selection
+            # refer to the entries, so they follow
+            self.entries.renumber(rows)
+            self.update_stats_label()
+        elif self.entries.reorder(rows):
+            # The server's order of the current sort arrived
+            self.show_reordered()
+            return
+        else:
+            self.show_rows(rows)
+            return
+        # Tags changed here or on another device only need re-indexing
+        if self.cache.current_tags() != self.tag_index.tags:
+            self.refresh_tags()
+        else:
+            # The first sync fills in the entries used last
+            self.update_quick_strip()
+
+    def on_sync_failed(self, error):
+        self.offline = True
+        self.update_stats_label()
+
+    def report_flush(self, flushed, was_offline=False):
+        """Tell the user about queued writes that did not go through as made"""
+        if flushed.failed:
+            lines = "\n".join(f"• {description}: {error}" for description, error in flushed.failed)
+            QMessageBox.critical(self, "Changes Not Saved",
+                                 f"The server rejected {len(flushed.failed)} change(s), which were discarded:\n\n{lines}")
+        if flushed.conflicts:
+            lines = "\n".join(f"• {description}" for description in flushed.conflicts)
+            QMessageBox.warning(self, "Conflicting Changes",
+                                "Some entries were changed or deleted on another device before your edits "
+                                f"reached the server. Your versions were kept as separate entries:\n\n{lines}")
+        if was_offline and flushed.applied:
+            applied = flushed.applied
+            QMessageBox.information(self, "Synced",
+                                    f"{applied} change{'s' if applied != 1 else ''} made offline "
+                                    f"{'were' if applied != 1 else 'was'} saved.")
+
+    def update_stats_label(self):
+        count = len(self.entries)
+        text = f"{count} password{'s' if count != 1 else ''} stored"
+        pending = self.writes.pending
+        if self.offline:
+            text += f" · offline, {pending} change{'s' if pending != 1 else ''} pending" if pending else " · offline"
+        elif pending:
+            text += " · saving…"
+        elif self.writes.busy:
+            text += " · syncing…"
+        self.stats_label.setText(text)
+
+    def clear_cards(self):
+        """Hide every card (they stay pooled) and wipe the decrypted passwords"""
+        self.wipe_secrets()
+        self.set_selection(set())
+        self.visible = []
+        self.card_pool.show([])
+        self.empty_label.hide()
+        self.quick_pool.show([])
+        self.quick_frame.hide()
 
+    def load_passwords(self):
+        """Sync with the server now and redraw; the cache stands in while it is unreachable"""
+        with telemetry.span("dashboard.load_passwords") as span:
+            if not self.offline:
+                # While offline the write queue's retries reconnect; don't wait
+                # on the server for every redraw
+                try:
+                    flushed = self.writes.sync_now()
+                except Exception as e:
+                    span.record_error(e)
+                    if self.cache.saved_at is None and not self.cache.load(self.session.fernet):
+                        self.clear_cards()
+                        QMessageBox.critical(self, "Error", f"Failed to load passwords:\n{str(e)}")
+                        return
+                    self.offline = True
+                else:
+                    self.report_flush(flushed)
+            rows = self.cache.sorted_rows()
+            span.set_attribute("vault.rows", len(rows))
+            self.show_rows(rows)
+
+    def show_rows(self, rows):
+        """Show (id, description, ciphertext) rows, rebinding the pooled cards"""
+        self.wipe_secrets()
+        self.set_selection(set())
+        self.entries = EntryStore(rows)
+
+        try:
+            # Decrypt the whole vault in one batch instead of row by row
+            secrets = batch_decrypt_secrets(self.entries.tokens(), self.session.fernet)
         except Exception as e:
+            self.clear_cards()
             QMessageBox.critical(self, "Error", f"Failed to load passwords:\n{str(e)}")
-        finally:
-            cursor.close()
-            conn.close()
+            return
+        for entry, secret in zip(self.entries, secrets):
+            entry.secret = secret
+
+        # Update stats
+        self.update_stats_label()
+
+        self.tag_index = TagIndex(self.entries, self.cache.current_tags())
+        self.update_sidebar()
+        self.update_quick_strip()
+        # Existing cards are rebound; only missing ones are built
+        self.show_filtered()
 
     def build_new_password_page(self):
         frame = QFrame()
@@ -564,411 +1141,52 @@ class Dashboard(QWidget):
             QMessageBox.warning(self, "Input Error", "Both fields are required.")
             return
 
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            fernet = get_fernet()
-            encrypted = fernet.encrypt(pw.encode()).decode()
-
-            cursor.execute(
-                "INSERT INTO passwords (user_id, description, encrypted_password) VALUES (%s, %s, %s)",
-                (self.user_id, desc, encrypted)
-            )
-            conn.commit()
+        encrypted = self.session.fernet.encrypt(pw.encode()).decode()
+        # Shown straight away; the write queue uploads it in the background
+        self.writes.add(desc, encrypted)
+        if self.offline:
+            message = "Password added. The server is unreachable, so it will be saved on the next sync."
+        else:
+            message = "Password added successfully."
 
-            self.description_input.clear()
-            self.password_input.clear()
-            self.btn_cancel.setEnabled(False)
-            # Re-enable logout button after successful save
-            self.logout_btn.setEnabled(True)
-            
-            # Switch to list page and update nav
-            self.btn_list.setObjectName("tabButtonActive")
-            self.btn_new.setObjectName("tabButton")
-            self.apply_styles()
-            self.pages.setCurrentIndex(0)
-            self.load_passwords()
-            QMessageBox.information(self, "Success", "Password added successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save:\n{str(e)}")
-        finally:
-            cursor.close()
-            conn.close()
+        self.description_input.clear()
+        self.password_input.clear()
+        self.btn_cancel.setEnabled(False)
+        # Re-enable logout button after successful save
+        self.logout_btn.setEnabled(True)
+        
+        # Switch to list page and update nav
+        self.btn_list.setObjectName("tabButtonActive")
+        self.btn_new.setObjectName("tabButton")
+        repolish(self.btn_list, self.btn_new)
+        self.pages.setCurrentIndex(0)
+        self.refresh_view()
+        QMessageBox.information(self, "Success", message)
 
     def open_update_window(self):
-        if not hasattr(self, 'selected_password_id'):
+        if self.selected_entry is None:
             return
 
-        try:
-            conn = get_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT encrypted_password FROM passwords WHERE id = %s AND user_id = %s", 
-                         (self.selected_password_id, self.user_id))
-            result = cursor.fetchone()
-            if result:
-                encrypted_password = result['encrypted_password']
-                self.update_win = UpdatePasswordWindow(
-                    user_id=self.user_id,
-                    password_id=self.selected_password_id,
-                    description=self.selected_description,
-                    encrypted_password=encrypted_password,
-                    refresh_callback=self.load_passwords
-                )
-                self.update_win.exec_()
-            else:
-                QMessageBox.warning(self, "Not Found", "Password record not found.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to fetch password:\n{str(e)}")
-        finally:
-            cursor.close()
-            conn.close()
-
-    def apply_styles(self):
-        self.setStyleSheet("""
-            /* Main Window */
-            QWidget {
-                background-color: #ffffff;
-                color: #2c3e50;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            
-            /* Header Section */
-            #headerFrame {
-                background-color: #00cec9;
-                border: none;
-            }
-            
-            #titleLabel {
-                font-size: 28px;
-                font-weight: bold;
-                color: #000000;
-                margin-bottom: 2px;
-            }
-            
-            #subtitleLabel {
-                font-size: 14px;
-                color: #00cec9;
-                font-weight: 500;
-            }
-            
-            /* Logout Button */
-            #logoutButton {
-                background-color: rgba(255, 255, 255, 0.2);
-                border: 1px solid rgba(255, 255, 255, 0.3);
-                border-radius: 6px;
-                padding: 6px 12px;
-                font-size: 12px;
-                font-weight: 500;
-                color: #ffffff;
-                min-width: 70px;
-            }
-            
-            #logoutButton:hover {
-                background-color: rgba(255, 255, 255, 0.3);
-                border-color: rgba(255, 255, 255, 0.5);
-            }
-            
-            #logoutButton:disabled {
-                background-color: rgba(255, 255, 255, 0.1);
-                border-color: rgba(255, 255, 255, 0.2);
-                color: rgba(255, 255, 255, 0.5);
-            }
-            
-            /* Navigation Section - Bottom Border Accent */
-            #navFrame {
-                background-color: #f8f9fa;
-                border-bottom: 1px solid #e9ecef;
-            }
-            
-            #tabButton {
-                background-color: #f8f9fa;
-                border: none;
-                border-bottom: 4px solid #dee2e6;
-                padding: 16px 20px;
-                font-size: 15px;
-                font-weight: 600;
-                color: #6c757d;
-                text-align: center;
-            }
-            
-            #tabButton:hover {
-                background-color: #e9ecef;
-                color: #000000;
-                border-bottom: 4px solid #adb5bd;
-            }
-            
-            #tabButtonActive {
-                background-color: #ffffff;
-                border: none;
-                border-bottom: 4px solid #000000;
-                padding: 16px 20px;
-                font-size: 15px;
-                font-weight: 600;
-                color: #000000;
-                text-align: center;
-            }
-            
-            /* Page Frames */
-            #pageFrame {
-                background-color: #ffffff;
-            }
-            
-            #pageTitle {
-                font-size: 24px;
-                font-weight: 600;
-                color: #000000;
-                margin-bottom: 5px;
-            }
-            
-            #statsLabel {
-                font-size: 14px;
-                color: #000000;
-                font-weight: 500;
-            }
-            
-            /* Scroll Area */
-            #scrollArea {
-                border: none;
-                background-color: transparent;
-            }
-            
-            #scrollArea QScrollBar:vertical {
-                background-color: #f8f9fa;
-                width: 8px;
-                border-radius: 4px;
-            }
-            
-            #scrollArea QScrollBar::handle:vertical {
-                background-color: #00cec9;
-                border-radius: 4px;
-                min-height: 30px;
-            }
-            
-            #scrollArea QScrollBar::handle:vertical:hover {
-                background-color: #1dd1cc;
-            }
-            
-            /* Password Cards */
-            #passwordCard {
-                background-color: #ffffff;
-                border: 2px solid #e9ecef;
-                border-radius: 12px;
-                margin-bottom: 5px;
-            }
-            
-            #passwordCard:hover {
-                border-color: #00cec9;
-            }
-            
-            #passwordCard[selected="true"] {
-                border-color: #00cec9;
-                background-color: #f0fdfc;
-            }
-            
-            #cardDescription {
-                font-size: 16px;
-                font-weight: 600;
-                color: #000000;
-            }
-            
-            #cardId {
-                font-size: 12px;
-                font-weight: 500;
-                color: #000000;
-                background-color: #f8f9fa;
-                padding: 4px 8px;
-                border-radius: 12px;
-            }
-            
-            #cardPassword {
-                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
-                font-size: 16px;
-                font-weight: bold;
-                color: #000000;
-                background-color: #ffffff;
-                padding: 12px 16px;
-                border-radius: 8px;
-                border: 1px solid #e9ecef;
-                letter-spacing: 1px;
-            }
-            
-            /* Empty State */
-            #emptyState {
-                font-size: 16px;
-                color: #6c757d;
-                margin: 60px 0;
-                line-height: 1.6;
-            }
-            
-            /* Form Container */
-            #formContainer {
-                background-color: #e9ecef;
-                border-radius: 16px;
-                border: 1px solid #dee2e6;
-                max-width: 500px;
-            }
-            
-            /* Input Containers */
-            #inputContainer {
-                background-color: #ffffff;
-                border-radius: 12px;
-                border: 2px solid #dee2e6;
-            }
-            
-            #inputContainer:hover {
-                border-color: #00cec9;
-            }
-            
-            #inputLabel {
-                font-size: 12px;
-                font-weight: 600;
-                color: #2c3e50;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-                margin-bottom: 5px;
-                background-color: transparent;
-            }
-            
-            /* Modern Input Fields */
-            #modernInput {
-                background-color: transparent;
-                border: none;
-                font-size: 16px;
-                color: #2c3e50;
-                padding: 8px 5px;
-                outline: none;
-                min-height: 21px;
-            }
-            
-            #modernInput::placeholder {
-                color: #adb5bd;
-            }
-            
-            /* Toggle Button */
-            #toggleButton {
-                background-color: #e9ecef;
-                border: none;
-                border-radius: 6px;
-                padding: 6px 12px;
-                font-size: 12px;
-                font-weight: 500;
-                color: #000000;
-                min-width: 50px;
-            }
-            
-            #toggleButton:hover {
-                background-color: #00cec9;
-                color: #ffffff;
-            }
-            
-            /* Primary Button */
-            #primaryButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00cec9, stop: 1 #00b894);
-                border: none;
-                border-radius: 8px;
-                padding: 12px 24px;
-                font-size: 16px;
-                font-weight: 600;
-                color: #ffffff;
-                min-width: 120px;
-            }
-            
-            #primaryButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #1dd1cc, stop: 1 #00d2a4);
-            }
-            
-            /* Secondary Button */
-            #secondaryButton {
-                background-color: transparent;
-                border: 2px solid #00cec9;
-                border-radius: 8px;
-                padding: 10px 20px;
-                font-size: 14px;
-                font-weight: 500;
-                color: #00cec9;
-                min-width: 100px;
-            }
-            
-            #secondaryButton:hover {
-                background-color: #00cec9;
-                color: #ffffff;
-            }
-            
-            #secondaryButton:disabled {
-                border-color: #dee2e6;
-                color: #6c757d;
-                background-color: transparent;
-            }
-            
-            /* Danger Button */
-            #dangerButton {
-                background-color: #495057;
-                border: none;
-                border-radius: 8px;
-                padding: 10px 20px;
-                font-size: 14px;
-                font-weight: 500;
-                color: #ffffff;
-                min-width: 100px;
-            }
-            
-            #dangerButton:hover {
-                background-color: #343a40;
-            }
-            
-            #dangerButton:disabled {
-                background-color: #6c757d;
-            }
-            
-            /* Text Button */
-            #textButton {
-                background-color: transparent;
-                border: none;
-                padding: 8px 16px;
-                font-size: 14px;
-                color: #6c757d;
-                text-decoration: none;
-            }
-            
-            #textButton:hover {
-                color: #00cec9;
-                text-decoration: none;
-            }
-            
-            #textButton:disabled {
-                color: #adb5bd;
-                text-decoration: none;
-            }
-            
-            /* Action Frame */
-            #actionFrame {
-                border-top: 1px solid #e9ecef;
-                padding-top: 15px;
-            }
-            
-            /* Message Boxes */
-            QMessageBox {
-                background-color: #ffffff;
-                color: #2c3e50;
-            }
-            
-            QMessageBox QPushButton {
-                background-color: #00cec9;
-                border: none;
-                border-radius: 4px;
-                padding: 8px 16px;
-                color: #ffffff;
-                font-weight: 500;
-                min-width: 80px;
-            }
-            
-            QMessageBox QPushButton:hover {
-                background-color: #1dd1cc;
-            }
-        """)
+        # Only needed once the user edits an entry
+        from update_password_window import UpdatePasswordWindow
 
+        # Edits the copy shown, queued writes included; if the server has a
+        # newer one, the upload keeps both rather than overwriting it
+        entry = self.selected_entry
+        if self.update_win is None:
+            self.update_win = UpdatePasswordWindow(
+                user_id=self.user_id,
+                password_id=entry.id,
+                description=entry.description,
+                encrypted_password=entry.token,
+                refresh_callback=self.refresh_view,
+                fernet=self.session.fernet,
+                write_queue=self.writes
+            )
+        else:
+            # Built on the first edit and reused after that
+            self.update_win.load(entry.id, entry.description, entry.token, self.session.fernet)
+        self.update_win.exec_()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -1,9 +1,100 @@
+import os
+import threading
+import time
 import mysql.connector
+import query_log
+import telemetry
+
+# Connection settings; the environment can point the app at another server or
+# database (the benchmarks use their own database this way)
+DB_HOST = os.environ.get("VAULT_DB_HOST", "localhost")
+DB_USER = os.environ.get("VAULT_DB_USER", "root")
+DB_PASSWORD = os.environ.get("VAULT_DB_PASSWORD", "")
+DB_NAME = os.environ.get("VAULT_DB_NAME", "password_vault")
+# Seconds to wait for the server before the dashboard falls back to its offline cache
+DB_CONNECT_TIMEOUT = int(os.environ.get("VAULT_DB_CONNECT_TIMEOUT", "5"))
+
+# Client errors meaning the server is unreachable or the connection dropped,
+# as opposed to the server rejecting a statement
+CONNECTION_ERRNOS = {2002, 2003, 2005, 2006, 2013, 2055}
+
+# Idle connections, opened ahead of need (prewarm_connection) or given back
+# by close(), are handed out by the next get_connection() calls if they have
+# been idle for less than this; reusing one also reuses its prepared statements
+SPARE_MAX_AGE = 60
+# Idle connections kept at most
+SPARE_LIMIT = 2
+
+_spares = []
+_spare_lock = threading.Lock()
+
+def get_raw_connection():
+    """Connection without the query log, for the log's own housekeeping"""
+    with telemetry.span("db.connect", {"db.name": DB_NAME}):
+        return mysql.connector.connect(
+            host=DB_HOST,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME,
+            connection_timeout=DB_CONNECT_TIMEOUT
+        )
+
+def prewarm_connection(count=1, setup=None):
+    """
+    Open connections in advance (e.g. while the user is still typing) for the
+    next get_connection() calls; setup(conn), if given, runs on each new one
+    before it is kept
+    """
+    with _spare_lock:
+        missing = count - len(_spares)
+    for _ in range(missing):
+        conn = query_log.wrap_connection(get_raw_connection())
+        if setup is not None:
+            setup(conn)
+        with _spare_lock:
+            _spares.append((conn, time.monotonic()))
+
+def release_connection(conn):
+    """Keep a connection its user is done with for reuse; False when it should be closed instead"""
+    with _spare_lock:
+        if len(_spares) >= SPARE_LIMIT:
+            return False
+    try:
+        if conn.unread_result:
+            return False
+        if conn.in_transaction:
+            # Reused without whatever the last user left uncommitted
+            conn.rollback()
+    except Exception:
+        return False
+    with _spare_lock:
+        _spares.append((conn, time.monotonic()))
+    telemetry.count("db.released")
+    return True
+
+def _take_spare():
+    while True:
+        with _spare_lock:
+            if not _spares:
+                return None
+            conn, idle_since = _spares.pop()
+        if time.monotonic() - idle_since < SPARE_MAX_AGE and conn.is_connected():
+            telemetry.count("db.spare_used")
+            return conn
+        conn.discard()
 
 def get_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="password_vault"
-    )
+    # Every statement goes through the query log (timing, slow log, tracing)
+    return _take_spare() or query_log.wrap_connection(get_raw_connection())
+
+def error_code(error):
+    """MySQL error number of a mysql.connector or PyMySQL (async_db) error, or None"""
+    code = getattr(error, "errno", None)
+    if code is None and error.args and isinstance(error.args[0], int):
+        # PyMySQL errors carry (errno, message) as their arguments
+        code = error.args[0]
+    return code
+
+def is_connection_error(error):
+    """True when error says nothing about the statement, only that the server could not be reached"""
+    return isinstance(error, mysql.connector.InterfaceError) or error_code(error) in CONNECTION_ERRNOS
@@ -1,6 +1,22 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.hmac import HMAC
+from concurrent.futures import ThreadPoolExecutor
+from secret_buffer import SecretBuffer, wipe_bytes
+import telemetry
+import base64
+import binascii
 import os
 
+# Items handed to a worker at a time by the batch helpers. Fernet tokens for
+# passwords are tiny, so a chunk keeps per-task overhead below the crypto work.
+BATCH_CHUNK_SIZE = 256
+
+# One pool per worker count, created on first use and reused afterwards
+_executors = {}
+
 def generate_key():
     key = Fernet.generate_key()
     with open("secret.key", "wb") as key_file:
@@ -9,6 +25,7 @@ def generate_key():
 def load_key():
     return open("secret.key", "rb").read()
 
+@telemetry.traced("crypto.get_fernet")
 def get_fernet():
     # Check if key file exists and has content
     if not os.path.exists("secret.key") or os.path.getsize("secret.key") == 0:
@@ -19,6 +36,173 @@ def get_fernet():
     key = load_key()
     return Fernet(key)
 
+def fernet_keys(fernet):
+    """
+    The (signing, encryption) halves of fernet's key, or None.
+
+    Fernet keeps them in private attributes and has no public way to read
+    them, so this is the only place that reaches in; everything needing the
+    raw key (in-place decryption, copying and wiping it, the offline cache's
+    MAC) goes through here and copes with None, which is what a cryptography
+    release storing the key differently gets.
+    """
+    keys = getattr(fernet, "_signing_key", None), getattr(fernet, "_encryption_key", None)
+    if all(isinstance(key, bytes) and len(key) == 16 for key in keys):
+        return keys
+    return None
+
+def copy_fernet(fernet):
+    """A cipher with its own copy of fernet's key, so either can be wiped without breaking the other"""
+    keys = fernet_keys(fernet)
+    if keys is None:
+        # wipe_fernet cannot zero a key it cannot reach, so sharing is safe
+        return fernet
+    raw = keys[0] + keys[1]
+    key = base64.urlsafe_b64encode(raw)
+    copy = Fernet(key)
+    wipe_bytes(raw)
+    wipe_bytes(key)
+    return copy
+
+def wipe_fernet(fernet):
+    """Zero the key a Fernet keeps privately; the instance must not be used afterwards"""
+    for key in fernet_keys(fernet) or ():
+        wipe_bytes(key)
+
+def _get_executor(workers):
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vault-crypto")
+        _executors[workers] = executor
+    return executor
+
+def _map_chunked(func, items, chunk_size, workers, span_name):
+    """Apply func to every item on the crypto pool, keeping input order"""
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with telemetry.span(span_name, {"crypto.items": len(items), "crypto.workers": workers}):
+        # Small batches are cheaper to run inline than to hand to the pool
+        if workers <= 1 or len(items) <= chunk_size:
+            return [func(item) for item in items]
+
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+        results = []
+        # Executor.map yields chunk results in submission order
+        for chunk_result in _get_executor(workers).map(lambda chunk: [func(item) for item in chunk], chunks):
+            results.extend(chunk_result)
+        return results
+
+def batch_encrypt(passwords, fernet=None, chunk_size=BATCH_CHUNK_SIZE, workers=None):
+    """
+    Encrypt many plaintext passwords at once.
+
+    Work is split into chunks and spread over a thread pool (the cryptography
+    backend releases the GIL). Returns token strings in the same order as input.
+    """
+    fernet = fernet or get_fernet()
+    return _map_chunked(lambda pw: fernet.encrypt(pw.encode()).decode(), passwords, chunk_size, workers,
+                        "crypto.batch_encrypt")
+
+def batch_decrypt(tokens, fernet=None, chunk_size=BATCH_CHUNK_SIZE, workers=None):
+    """
+    Decrypt many Fernet tokens (str or bytes) at once.
+
+    Returns plaintext strings in the same order as input.
+    """
+    fernet = fernet or get_fernet()
+
+    def decrypt_one(token):
+        if isinstance(token, str):
+            token = token.encode()
+        return fernet.decrypt(token).decode()
+
+    return _map_chunked(decrypt_one, tokens, chunk_size, workers, "crypto.batch_decrypt")
+
+def decrypt_secret(token, fernet=None, into=None):
+    """
+    Decrypt a Fernet token straight into a SecretBuffer.
+
+    Unlike Fernet.decrypt this never creates an immutable bytes/str copy of the
+    plaintext, so the result can be wiped once it is no longer displayed.
+    Pass into= to refill an existing (wiped) buffer instead of allocating one.
+    Without access to the key (fernet_keys) it falls back to Fernet.decrypt
+    and wipes the plaintext copy that leaves.
+    """
+    fernet = fernet or get_fernet()
+    # Counted rather than traced: a vault load decrypts every row
+    telemetry.count("crypto.decrypt")
+    if isinstance(token, str):
+        token = token.encode()
+    keys = fernet_keys(fernet)
+    if keys is None:
+        return _decrypt_copy(token, fernet, into)
+    signing_key, encryption_key = keys
+    try:
+        data = base64.urlsafe_b64decode(bytes(token))
+    except (TypeError, binascii.Error):
+        raise InvalidToken
+
+    # version (1) | timestamp (8) | iv (16) | ciphertext (n * 16) | hmac (32)
+    if len(data) < 73 or data[0] != 0x80 or (len(data) - 57) % 16:
+        raise InvalidToken
+
+    h = HMAC(signing_key, hashes.SHA256())
+    h.update(data[:-32])
+    try:
+        h.verify(data[-32:])
+    except InvalidSignature:
+        raise InvalidToken
+
+    ciphertext = data[25:-32]
+    if into is None:
+        secret = SecretBuffer(len(ciphertext) + 15)
+    elif len(into.buffer) < len(ciphertext) + 15:
+        raise ValueError("buffer too small for token")
+    else:
+        secret = into
+    decryptor = Cipher(algorithms.AES(encryption_key), modes.CBC(data[9:25])).decryptor()
+    length = decryptor.update_into(ciphertext, secret.buffer)
+    decryptor.finalize()
+
+    # Strip PKCS7 padding by shortening the visible length, never by copying
+    pad = secret.buffer[length - 1]
+    if not 1 <= pad <= 16 or any(b != pad for b in secret.buffer[length - pad:length]):
+        secret.wipe()
+        raise InvalidToken
+    secret.set_length(length - pad)
+    return secret
+
+def _decrypt_copy(token, fernet, into):
+    plaintext = fernet.decrypt(bytes(token))
+    try:
+        if into is None:
+            secret = SecretBuffer(len(plaintext))
+        elif len(into.buffer) < len(plaintext):
+            raise ValueError("buffer too small for token")
+        else:
+            secret = into
+        secret.buffer[:len(plaintext)] = plaintext
+        secret.set_length(len(plaintext))
+    finally:
+        wipe_bytes(plaintext)
+    return secret
+
+def batch_decrypt_secrets(tokens, fernet=None, chunk_size=BATCH_CHUNK_SIZE, workers=None, into=None):
+    """
+    Like batch_decrypt, but returns a SecretBuffer per token.
+
+    With into= (a list of buffers matching tokens) the buffers are refilled in
+    place, so anything holding a reference to them sees the new contents.
+    """
+    fernet = fernet or get_fernet()
+    if into is None:
+        return _map_chunked(lambda token: decrypt_secret(token, fernet), tokens, chunk_size, workers,
+                            "crypto.batch_decrypt")
+    return _map_chunked(lambda pair: decrypt_secret(pair[0], fernet, pair[1]), zip(tokens, into), chunk_size, workers,
+                        "crypto.batch_decrypt")
+
 # Add this test block
 if __name__ == "__main__":
     print("Testing encryption system...")
@@ -40,3 +224,18 @@ if __name__ == "__main__":
         print("✅ Encryption test passed!")
     else:
         print("❌ Encryption test failed!")
+
+    # Test batch encryption/decryption keeps order
+    batch = [f"{test_message} #{i}" for i in range(2000)]
+    if batch_decrypt(batch_encrypt(batch, fernet), fernet) == batch:
+        print("✅ Batch encryption test passed!")
+    else:
+        print("❌ Batch encryption test failed!")
+
+    # Test decryption into a wipeable buffer
+    with decrypt_secret(encrypted, fernet) as secret:
+        passed = secret.text() == test_message
+    if passed and secret.wiped:
+        print("✅ Secret buffer test passed!")
+    else:
+        print("❌ Secret buffer test failed!")
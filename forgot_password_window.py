@@ -6,6 +6,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 from db_config import get_connection
 from password_validator import PasswordValidator
+from theme import apply_theme
+import telemetry
 
 import re
 
@@ -13,14 +15,16 @@ import re
 class ForgotPasswordWindow(QDialog):
     def __init__(self):
         super().__init__()
+        apply_theme()
         self.setWindowTitle("Forgot Password - Password Vault")
         self.setFixedSize(450, 500)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowMaximizeButtonHint)
         self.setModal(True)
         self.center_window()
         self.setup_ui()
-        self.apply_styles()
         self.user_email = None
+        # The new password fields, built when first needed
+        self.reset_widgets = None
 
     @staticmethod
     def is_valid_email(email):
@@ -159,6 +163,20 @@ class ForgotPasswordWindow(QDialog):
             self.show_reset_fields()
 
     def show_reset_fields(self):
+        if self.reset_widgets is None:
+            self.build_reset_fields()
+        else:
+            # Hidden again by reset()
+            for widget in self.reset_widgets:
+                widget.show()
+            self.validation_text.verticalScrollBar().setValue(0)
+
+        # Increase window height to accommodate new fields
+        self.setFixedSize(450, 950)
+        # Re-center the window after resizing
+        self.center_window()
+
+    def build_reset_fields(self):
         # New Password field
         password_label = QLabel("New Password")
         password_label.setObjectName("inputLabel")
@@ -241,19 +259,12 @@ class ForgotPasswordWindow(QDialog):
         self.cancel_btn.clicked.connect(self.close)
         
         # Add new fields to layout
-        self.content_layout.addWidget(password_label)
-        self.content_layout.addWidget(password_container)
-        self.content_layout.addWidget(self.strength_label)
-        self.content_layout.addWidget(self.validation_text)
-        self.content_layout.addWidget(confirm_label)
-        self.content_layout.addWidget(confirm_container)
-        self.content_layout.addWidget(self.confirm_btn)
-        self.content_layout.addWidget(self.cancel_btn)
-        
-        # Increase window height to accommodate new fields
-        self.setFixedSize(450, 950)
-        # Re-center the window after resizing
-        self.center_window()
+        self.reset_widgets = [
+            password_label, password_container, self.strength_label, self.validation_text,
+            confirm_label, confirm_container, self.confirm_btn, self.cancel_btn
+        ]
+        for widget in self.reset_widgets:
+            self.content_layout.addWidget(widget)
 
     def on_password_changed(self):
         password = self.new_password_input.text()
@@ -290,6 +301,34 @@ class ForgotPasswordWindow(QDialog):
             self.validation_text.setStyleSheet("color: #e17055; background-color: #fdf2f2;")
             self.confirm_btn.setEnabled(False)
 
+    def reset(self):
+        """Back to the email step with empty fields, so the dialog can be shown again"""
+        self.user_email = None
+        self.email_input.clear()
+        self.email_input.setDisabled(False)
+        self.submit_btn.setDisabled(False)
+        self.email_checkmark.hide()
+        if self.reset_widgets is not None:
+            self.new_password_input.clear()
+            self.confirm_input.clear()
+            self.new_password_input.setEchoMode(QLineEdit.Password)
+            self.pw_toggle.setText("show")
+            self.confirm_input.setEchoMode(QLineEdit.Password)
+            self.confirm_toggle.setText("show")
+            self.strength_label.setStyleSheet("")
+            self.validation_text.setStyleSheet("")
+            self.on_password_changed()
+            for widget in self.reset_widgets:
+                widget.hide()
+            self.setFixedSize(450, 500)
+            self.center_window()
+        self.email_input.setFocus()
+
+    def done(self, result):
+        # Closed either way: don't keep the typed master password around
+        self.reset()
+        super().done(result)
+
     def toggle_password(self):
         if self.new_password_input.echoMode() == QLineEdit.Password:
             self.new_password_input.setEchoMode(QLineEdit.Normal)
@@ -328,7 +367,8 @@ class ForgotPasswordWindow(QDialog):
             )
             return
 
-        hashed = bcrypt.hashpw(pw.encode(), bcrypt.gensalt())
+        with telemetry.span("bcrypt.hashpw", {"auth.purpose": "reset"}):
+            hashed = bcrypt.hashpw(pw.encode(), bcrypt.gensalt())
 
         try:
             conn = get_connection()
@@ -345,217 +385,3 @@ class ForgotPasswordWindow(QDialog):
         finally:
             cursor.close()
             conn.close()
-
-    def apply_styles(self):
-        self.setStyleSheet("""
-            /* Main Window */
-            QWidget {
-                background-color: #ffffff;
-                color: #2c3e50;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            
-            /* Header Section */
-            #headerFrame {
-                background-color: #00cec9;
-                border: none;
-            }
-            
-            #titleLabel {
-                font-size: 28px;
-                font-weight: bold;
-                color: #000000;
-                margin-bottom: 2px;
-            }
-            
-            #subtitleLabel {
-                font-size: 14px;
-                color: #00cec9;
-                font-weight: 500;
-            }
-            
-            /* Content Section */
-            #contentFrame {
-                background-color: #ffffff;
-                border-top-left-radius: 0px;
-                border-top-right-radius: 0px;
-            }
-            
-            #formTitle {
-                font-size: 22px;
-                font-weight: 600;
-                color: #000000;
-                margin-bottom: 10px;
-            }
-            
-            /* Input Containers */
-            #inputContainer {
-                background-color: #f8f9fa;
-                border-radius: 12px;
-                border: 2px solid #e9ecef;
-            }
-            
-            #inputContainer:hover {
-                border-color: #00cec9;
-            }
-            
-            #inputContainer:disabled {
-                background-color: #e9ecef;
-                border-color: #dee2e6;
-            }
-            
-            #inputLabel {
-                font-size: 12px;
-                font-weight: 600;
-                color: #000000;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-            }
-            
-            /* Modern Input Fields */
-            #modernInput {
-                background-color: transparent;
-                border: none;
-                font-size: 16px;
-                color: #2c3e50;
-                padding: 8px 5px;
-                outline: none;
-                min-height: 21px;
-            }
-            
-            #modernInput:focus {
-                color: #2c3e50;
-            }
-            
-            #modernInput:disabled {
-                color: #6c757d;
-            }
-            
-            #modernInput::placeholder {
-                color: #adb5bd;
-            }
-            
-            /* Checkmark Label */
-            #checkmarkLabel {
-                font-size: 16px;
-                color: #00b894;
-                font-weight: bold;
-                background-color: transparent;
-            }
-            
-            /* Strength Label */
-            #strengthLabel {
-                margin: 5px 0;
-                padding: 5px;
-                border-radius: 4px;
-                background-color: #f8f9fa;
-            }
-            
-            /* Validation Text */
-            #validationText {
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 10px;
-                font-size: 12px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                line-height: 1.4;
-                background-color: #f8f9fa;
-                color: #495057;
-            }
-            
-            /* Toggle Button */
-            #toggleButton {
-                background-color: #e9ecef;
-                border: none;
-                border-radius: 6px;
-                padding: 8px 12px;
-                font-size: 14px;
-                color: #000000;
-                min-width: 40px;
-            }
-            
-            #toggleButton:hover {
-                color: #00cec9;
-            }
-            
-            /* Primary Button */
-            #primaryButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00cec9, stop: 1 #00b894);
-                border: none;
-                border-radius: 8px;
-                padding: 12px 15px;
-                font-size: 16px;
-                font-weight: 600;
-                color: #ffffff;
-                margin-top: 10px;
-                min-height: 21px;
-            }
-            
-            #primaryButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #1dd1cc, stop: 1 #00d2a4);
-            }
-            
-            #primaryButton:pressed {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00a085, stop: 1 #009688);
-            }
-            
-            #primaryButton:disabled {
-                background-color: #dee2e6;
-                color: #6c757d;
-            }
-            
-            /* Secondary Button */
-            #secondaryButton {
-                background-color: transparent;
-                border: 2px solid #00cec9;
-                border-radius: 8px;
-                padding: 10px 15px;
-                font-size: 16px;
-                font-weight: 500;
-                color: #00cec9;
-                min-height: 21px;
-            }
-            
-            #secondaryButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00cec9, stop: 1 #00b894);
-                color: #ffffff;
-            }
-            
-            /* Text Button */
-            #textButton {
-                background-color: transparent;
-                border: none;
-                padding: 10px;
-                font-size: 14px;
-                color: #000000;
-                text-decoration: underline;
-            }
-            
-            #textButton:hover {
-                color: #00cec9;
-            }
-            
-            /* Message Boxes */
-            QMessageBox {
-                background-color: #ffffff;
-                color: #2c3e50;
-            }
-            
-            QMessageBox QPushButton {
-                background-color: #00cec9;
-                border: none;
-                border-radius: 4px;
-                padding: 8px 16px;
-                color: #ffffff;
-                font-weight: 500;
-                min-width: 80px;
-            }
-            
-            QMessageBox QPushButton:hover {
-                background-color: #1dd1cc;
-            }
-        """)
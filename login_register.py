@@ -1,25 +1,41 @@
 import sys
-import bcrypt
+import math
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton,
     QVBoxLayout, QHBoxLayout, QMessageBox, QFrame, QToolButton, QDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont
-from db_config import get_connection
-from register_window import RegisterWindow
-from forgot_password_window import ForgotPasswordWindow
+from theme import apply_theme
+
+# Heavy modules (bcrypt, mysql.connector, the other windows) are imported on
+# first use so the login window can show as soon as PyQt5 is loaded.
+
+# Delay before warming up authentication, so the first paint happens first
+WARM_UP_DELAY_MS = 100
 
 
 class LoginRegisterWindow(QWidget):
+    # Carries the finished verification Future from the auth worker thread
+    auth_finished = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
+        apply_theme()
         self.setWindowTitle("Password Vault")
         self.setFixedSize(450, 630)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowMaximizeButtonHint)
         self.center_window()
         self.setup_ui()
-        self.apply_styles()
+        # Dialogs are built on first use and kept for the next
+        self.reg_win = None
+        self.forgot_win = None
+        self.auth_finished.connect(self.on_auth_finished)
+        QTimer.singleShot(WARM_UP_DELAY_MS, self.warm_up)
+
+    def warm_up(self):
+        from auth_service import get_auth_service
+        get_auth_service().warm_up()
 
     def center_window(self):
         screen = QApplication.primaryScreen().geometry()
@@ -78,6 +94,7 @@ class LoginRegisterWindow(QWidget):
         self.username_input = QLineEdit()
         self.username_input.setObjectName("modernInput")
         self.username_input.setPlaceholderText("Enter your username")
+        self.username_input.editingFinished.connect(self.prefetch)
         
         username_layout.addWidget(self.username_input)
         username_container.setLayout(username_layout)
@@ -140,186 +157,6 @@ class LoginRegisterWindow(QWidget):
         main_layout.addWidget(content_frame)
         self.setLayout(main_layout)
 
-    def apply_styles(self):
-        self.setStyleSheet("""
-            /* Main Window */
-            QWidget {
-                background-color: #ffffff;
-                color: #2c3e50;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            
-            /* Header Section */
-            /*#headerFrame {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1,
-                    stop: 0 #f8f9fa, stop: 1 #e9ecef);
-                border: none;
-                border-bottom: 3px solid #00cec9;
-            }*/
-                           
-            #headerFrame {
-                background-color: #00cec9;
-                border: none;
-            }
-            
-            #titleLabel {
-                font-size: 28px;
-                font-weight: bold;
-                color: #000000;  /* Change from #2c3e50 to #000000 */
-                margin-bottom: 2px;  /* was 5px */
-            }
-            
-            #subtitleLabel {
-                font-size: 14px;
-                color: #00cec9;  /* Change from #00b894 to #00cec9 (same as button) */
-                font-weight: 500;
-            }
-            
-            /* Content Section */
-            #contentFrame {
-                background-color: #ffffff;
-                border-top-left-radius: 0px;
-                border-top-right-radius: 0px;
-            }
-            
-            #formTitle {
-                font-size: 22px;
-                font-weight: 600;
-                color: #000000;  /* Change from #2c3e50 to #000000 */
-                margin-bottom: 10px;
-            }
-            
-            /* Input Containers */
-            #inputContainer {
-                background-color: #f8f9fa;
-                border-radius: 12px;
-                border: 2px solid #e9ecef;
-            }
-            
-            #inputContainer:hover {
-                border-color: #00cec9;
-            }
-            
-            #inputLabel {
-                font-size: 12px;
-                font-weight: 600;
-                color: #000000;  /* Change from #6c757d to #000000 */
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-            }
-            
-            /* Modern Input Fields */
-            #modernInput {
-                background-color: transparent;
-                border: none;
-                font-size: 16px;
-                color: #2c3e50;
-                padding: 8px 5px;
-                outline: none;
-                min-height: 21px;
-            }
-            
-            #modernInput:focus {
-                color: #2c3e50;
-            }
-            
-            #modernInput::placeholder {
-                color: #adb5bd;
-            }
-            
-            /* Toggle Button */
-            #toggleButton {
-                background-color: #e9ecef;
-                border: none;
-                border-radius: 6px;
-                padding: 8px 12px;
-                font-size: 14px;
-                color: #000000;
-                min-width: 40px;
-            }
-            
-            #toggleButton:hover {
-                background-color: #00cec9;
-                /*color: #ffffff;*/
-            }
-            
-            /* Primary Button */
-            #primaryButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00cec9, stop: 1 #00b894);
-                border: none;
-                border-radius: 8px;
-                padding: 12px 15px;
-                font-size: 16px;
-                font-weight: 600;
-                color: #ffffff;
-                margin-top: 10px;
-                min-height: 21px;
-            }
-            
-            #primaryButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #1dd1cc, stop: 1 #00d2a4);
-            }
-            
-            #primaryButton:pressed {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00a085, stop: 1 #009688);
-            }
-            
-            /* Secondary Button */
-            #secondaryButton {
-                background-color: transparent;
-                border: 2px solid #00cec9;
-                border-radius: 8px;
-                padding: 10px 15px;
-                font-size: 16px;
-                font-weight: 500;
-                color: #00cec9;
-                min-height: 21px;
-            }
-            
-            #secondaryButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00cec9, stop: 1 #00b894);  /* Same as Sign In button */
-                color: #ffffff;
-            }
-            
-            /* Text Button */
-            #textButton {
-                background-color: transparent;
-                border: none;
-                padding: 10px;
-                font-size: 14px;
-                color: #000000;
-                text-decoration: underline;
-            }
-            
-            #textButton:hover {
-                color: #00cec9;
-            }
-            
-            /* Message Boxes */
-            QMessageBox {
-                background-color: #ffffff;
-                color: #2c3e50;
-            }
-            
-            QMessageBox QPushButton {
-                background-color: #00cec9;
-                border: none;
-                border-radius: 4px;
-                padding: 8px 16px;
-                color: #ffffff;
-                font-weight: 500;
-                min-width: 80px;
-            }
-            
-            QMessageBox QPushButton:hover {
-                background-color: #1dd1cc;
-            }
-        """)
-
     def toggle_password_visibility(self):
         if self.password_input.echoMode() == QLineEdit.Password:
             self.password_input.setEchoMode(QLineEdit.Normal)
@@ -336,34 +173,70 @@ class LoginRegisterWindow(QWidget):
             QMessageBox.warning(self, "Input Error", "Please enter both fields.")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+        from auth_service import get_auth_service
 
-        cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-        user = cursor.fetchone()
+        # Verify on the auth worker so bcrypt never blocks the GUI thread
+        self.login_btn.setEnabled(False)
+        self.login_btn.setText("Signing In...")
+        future = get_auth_service().authenticate_async(username, password)
+        future.add_done_callback(self.auth_finished.emit)
+        # In case the username was filled in without editing it (autofill)
+        self.prefetch()
 
-        cursor.close()
-        conn.close()
+    def on_auth_finished(self, future):
+        from auth_service import AuthResult
 
-        if user and bcrypt.checkpw(password.encode(), user["master_password_hash"].encode()):
+        self.login_btn.setEnabled(True)
+        self.login_btn.setText("Sign In")
+
+        try:
+            result = future.result()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not sign in:\n{str(e)}")
+            return
+
+        if result.ok:
             # QMessageBox.information(self, "Success", "Login successful ✅")
-            self.open_main_window(user["id"])
+            self.open_main_window(result.user_id, result.password_hash)
+        elif result.status == AuthResult.THROTTLED:
+            QMessageBox.warning(
+                self, "Too Many Attempts",
+                f"Too many sign-in attempts. Please try again in {math.ceil(result.retry_after)} seconds."
+            )
         else:
             QMessageBox.critical(self, "Login Failed", "Invalid username or password.")
 
     def open_register_window(self):
-        # Create modal register window
-        self.reg_win = RegisterWindow()
+        # Create the modal register window once; it empties itself on close
+        if self.reg_win is None:
+            from register_window import RegisterWindow
+            self.reg_win = RegisterWindow()
         self.reg_win.exec_()  # Modal - blocks login window
 
     def open_forgot_window(self):
-        # Create modal forgot password window
-        self.forgot_win = ForgotPasswordWindow()
+        # Create the modal forgot password window once; it resets itself on close
+        if self.forgot_win is None:
+            from forgot_password_window import ForgotPasswordWindow
+            self.forgot_win = ForgotPasswordWindow()
         self.forgot_win.exec_()  # Modal - blocks login window
 
-    def open_main_window(self, user_id):
+    def prefetch(self):
+        """Prepare the dashboard's connection and cipher once a username is entered"""
+        if self.username_input.text().strip():
+            from prefetch import get_prefetch
+            get_prefetch().warm()
+
+    def open_main_window(self, user_id, password_hash=None):
+        from prefetch import get_prefetch
         from dashboard import Dashboard
-        self.main_win = Dashboard(user_id)
+        from offline_cache import VaultCache
+        from session_manager import Session
+        from write_queue import fetch_vault
+        session = Session(user_id, password_hash, fernet=get_prefetch().take_cipher())
+        # The vault downloads and decrypts while the window is built
+        cache = VaultCache(user_id)
+        prefetched = fetch_vault(cache, session.fernet)
+        self.main_win = Dashboard(user_id, session, cache=cache, prefetched=prefetched)
         self.main_win.show()
         self.close()
 
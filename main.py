@@ -6,8 +6,27 @@ Main entry point for the GUI Password Manager
 
 import sys
 import os
+import signal
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 
+def install_query_stats_dump():
+    """Dump per-statement query statistics on SIGUSR1 (POSIX only)"""
+    if not hasattr(signal, "SIGUSR1"):
+        return None
+
+    def dump(signum, frame):
+        from query_log import dump_stats
+        dump_stats(os.environ.get("VAULT_QUERY_STATS", "query_stats.txt"))
+
+    signal.signal(signal.SIGUSR1, dump)
+    # Python signal handlers only run when the interpreter gets control, so
+    # wake it up periodically while the Qt event loop is idle
+    timer = QTimer()
+    timer.timeout.connect(lambda: None)
+    timer.start(500)
+    return timer
+
 def main():
     """Main application entry point"""
     # Create QApplication instance
@@ -16,6 +35,11 @@ def main():
     # Set application properties
     app.setApplicationName("Password Vault")
     app.setApplicationVersion("1.0")
+    stats_timer = install_query_stats_dump()
+
+    # One stylesheet for every window, parsed once
+    from theme import apply_theme
+    apply_theme()
     
     # Import and create the login window
     from login_register import LoginRegisterWindow
@@ -23,9 +47,19 @@ def main():
     # Create and show the main login window
     login_window = LoginRegisterWindow()
     login_window.show()
+
+    # Watch for event-loop freezes from here on
+    from stall_detector import start_stall_detector
+    stall_detector = start_stall_detector()
     
-    # Start the application event loop
-    sys.exit(app.exec_())
+    # Start the application event loop, under asyncio when async_db can use it
+    import async_db
+    loop = async_db.install_event_loop(app)
+    if loop is None:
+        sys.exit(app.exec_())
+    app.aboutToQuit.connect(async_db.close)
+    with loop:
+        sys.exit(loop.run_forever())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,588 @@
+"""
+Encrypted offline snapshot of a user's vault
+
+The dashboard keeps a local copy of the user's rows (id, description and the
+password ciphertext exactly as stored in MySQL) so it can show the vault at
+once on startup and keep working when the database server is unreachable.
+It remembers the sync version of its rows, so refreshing it only fetches what
+changed on the server since (see vault_sync.py).
+Writes are queued in the same file and uploaded in one transaction by the
+write queue (write_queue.py), online or not.
+
+Tags are kept per row next to them and tagging is queued like any other
+write (see vault_tags.py). Descriptions and tag names are encrypted in the
+file with the vault key and the whole file
+is authenticated with an HMAC, so a tampered or foreign file is ignored. It is
+read through mmap: tokens are sliced straight out of the mapping and no
+intermediate copy of the file is made.
+
+File layout (little-endian):
+
+    header    magic "VAULTC04" | user id u32 | sync version u64 | row count u32 | pending count u32 |
+              saved at f64 | tagged row count u32
+    row       id i64 | description token length u32 | password token length u32 | tokens
+    pending   op u8 | id i64 | description token length u32 | password token length u32 |
+              base token length u32 | tokens
+    tags      id i64 | tag names token length u32 | token
+    trailer   HMAC-SHA256 of everything above
+
+A pending write with no new description, password or base stores a
+zero-length token; a queued tag change keeps the tag name as its
+description. The base of an update is the password ciphertext it replaces.
+A row's tag names are stored newline-separated in one token. "VAULTC03"
+files (no tags) and "VAULTC02" files (no base either) are still read.
+"""
+
+import hashlib
+import hmac
+import mmap
+import os
+import struct
+import threading
+import time
+
+import mysql.connector
+
+import telemetry
+from db_config import is_connection_error
+from vault_sort import DEFAULT_SORT, arrange, natural_key
+from vault_tags import tag_entries, untag_entries
+
+# Directory of the cache files; like secret.key, the working directory by default
+CACHE_DIR = os.environ.get("VAULT_CACHE_DIR", ".")
+
+MAGIC = b"VAULTC04"
+_HEADER = struct.Struct("<8sIQIIdI")
+# Header of files from before tags
+_OLD_HEADER = struct.Struct("<8sIQIId")
+_ROW = struct.Struct("<qII")
+# Pending record layout and number of tokens after the description, by file version
+_PENDING = {
+    b"VAULTC02": (struct.Struct("<BqII"), 1),
+    b"VAULTC03": (struct.Struct("<BqIII"), 2),
+    MAGIC: (struct.Struct("<BqIII"), 2),
+}
+_TAGS = struct.Struct("<qI")
+_MAC_SIZE = hashlib.sha256().digest_size
+
+OP_ADD = 1
+OP_UPDATE = 2
+OP_DELETE = 3
+OP_TAG = 4
+OP_UNTAG = 5
+
+# Appended to the description of an edit that lost a race with another device
+CONFLICT_SUFFIX = " (conflicting copy)"
+
+# Ids per set-based DELETE when queued deletes are uploaded together
+DELETE_CHUNK = 500
+
+
+class FlushResult:
+    """
+    Outcome of uploading the queued writes.
+
+    conflicts lists the descriptions of edits that were saved as a separate
+    entry because the row was changed or deleted elsewhere; failed lists
+    (description, error) of writes the server rejected, which are dropped.
+    """
+
+    __slots__ = ("applied", "conflicts", "failed")
+
+    def __init__(self):
+        self.applied = 0
+        self.conflicts = []
+        self.failed = []
+
+    def __bool__(self):
+        return bool(self.applied or self.conflicts or self.failed)
+
+
+class VaultCache:
+    """
+    Local snapshot of one user's vault plus the writes waiting for the server.
+
+    rows holds the last server state as (id, description, token) tuples and
+    tags the tag names of those rows by id; current_rows() and current_tags()
+    apply the pending writes on top. Pending writes are [op, id, description,
+    token, base] lists; rows added locally get negative ids until they are
+    uploaded.
+    """
+
+    def __init__(self, user_id, directory=CACHE_DIR):
+        self.user_id = user_id
+        self.path = os.path.join(directory, f"vault_cache_{user_id}.bin")
+        self.rows = []
+        self.tags = {}
+        self.version = 0
+        # The order the rows are shown in, and the server's ids in each order
+        # that has been asked for (vault_sort.ordered_ids); not saved to the file
+        self.sort = DEFAULT_SORT
+        self.orders = {}
+        self.pending = []
+        self.saved_at = None
+        # Encrypted descriptions are reused so unchanged rows are not re-encrypted on save
+        self._description_tokens = {}
+        # Writes being uploaded are not folded into; later writes to a row
+        # added by them are renumbered to its server id once it has one
+        self._in_flight = set()
+        self._id_map = {}
+        # Set when a commit's outcome is unknown; re-sent adds then check for
+        # themselves first so they are not inserted twice
+        self._uncertain = False
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _mac_key(fernet):
+        """A key of its own derived from the vault's signing key; None when that cannot be read"""
+        from encryption import fernet_keys
+
+        keys = fernet_keys(fernet)
+        if keys is None:
+            return None
+        return hmac.new(keys[0], b"vault offline cache", hashlib.sha256).digest()
+
+    # Reading
+
+    def load(self, fernet):
+        """Read the snapshot file; returns False when there is no usable snapshot"""
+        from cryptography.fernet import InvalidToken
+
+        with telemetry.span("cache.load") as span, self._lock:
+            try:
+                with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    rows, tags, version, pending, saved_at = self._parse(mm, fernet)
+            except (OSError, ValueError, struct.error, InvalidToken) as e:
+                span.record_error(e)
+                return False
+            self.rows, self.tags, self.version, self.pending, self.saved_at = rows, tags, version, pending, saved_at
+            span.set_attribute("vault.rows", len(rows))
+            return True
+
+    def _parse(self, mm, fernet):
+        from encryption import batch_decrypt
+
+        if len(mm) < _HEADER.size + _MAC_SIZE:
+            raise ValueError("truncated cache file")
+        mac_key = self._mac_key(fernet)
+        if mac_key is None:
+            raise ValueError("no key to authenticate the cache file with")
+        mac = hmac.new(mac_key, digestmod=hashlib.sha256)
+        with memoryview(mm) as view, view[:-_MAC_SIZE] as body:
+            mac.update(body)
+        if not hmac.compare_digest(mac.digest(), mm[-_MAC_SIZE:]):
+            raise ValueError("cache file failed authentication")
+
+        magic = mm[:len(MAGIC)]
+        if magic not in _PENDING:
+            raise ValueError("not a cache file")
+        header = _HEADER if magic == MAGIC else _OLD_HEADER
+        _, user_id, version, row_count, pending_count, saved_at, *tag_count = header.unpack_from(mm, 0)
+        tag_count = tag_count[0] if tag_count else 0
+        if user_id != self.user_id:
+            raise ValueError("not a cache file for this user")
+
+        offset = header.size
+        records = []
+        sections = (((_ROW, 1), row_count), (_PENDING[magic], pending_count), ((_TAGS, 0), tag_count))
+        for (layout, tokens), count in sections:
+            for _ in range(count):
+                fields = layout.unpack_from(mm, offset)
+                offset += layout.size
+                lengths = fields[-tokens - 1:]
+                description_token = mm[offset:offset + lengths[0]]
+                offset += lengths[0]
+                values = []
+                for length in lengths[1:]:
+                    values.append(mm[offset:offset + length].decode())
+                    offset += length
+                records.append((fields[:-tokens - 1], description_token, values))
+
+        # Descriptions of the whole file are decrypted in one batch
+        encrypted = [d for _, d, _ in records if d]
+        plain = iter(batch_decrypt(encrypted, fernet))
+        descriptions = [next(plain) if d else None for _, d, _ in records]
+        self._description_tokens = {text: d.decode() for (_, d, _), text in zip(records, descriptions) if d}
+
+        rows = [(fields[0], description, values[0])
+                for (fields, _, values), description in zip(records[:row_count], descriptions)]
+        tags_at = row_count + pending_count
+        pending = [[fields[0], fields[1], description, values[0] or None, (values[1:] or [None])[0] or None]
+                   for (fields, _, values), description in zip(records[row_count:tags_at], descriptions[row_count:tags_at])]
+        tags = {fields[0]: frozenset(names.split("\n"))
+                for (fields, _, _), names in zip(records[tags_at:], descriptions[tags_at:])}
+        return rows, tags, version, pending, saved_at
+
+    def current_rows(self):
+        """Server rows with the pending writes applied"""
+        with self._lock:
+            rows = {row[0]: row for row in self.rows}
+            for op, row_id, description, token, _ in self.pending:
+                if op == OP_DELETE:
+                    rows.pop(row_id, None)
+                elif op == OP_ADD:
+                    rows[row_id] = (row_id, description, token)
+                elif op == OP_UPDATE and row_id in rows:
+                    old = rows[row_id]
+                    rows[row_id] = (row_id, description or old[1], token or old[2])
+            return list(rows.values())
+
+    def sorted_rows(self):
+        """current_rows() in the order of self.sort"""
+        with self._lock:
+            return arrange(self.current_rows(), self.sort, self.orders.get(self.sort))
+
+    def needs_order(self, sort, changes):
+        """Whether the server's order of sort has to be read again after a sync bringing changes"""
+        return sort != DEFAULT_SORT and (bool(changes) or sort not in self.orders)
+
+    def set_order(self, sort, ids):
+        with self._lock:
+            self.orders[sort] = ids
+
+    def current_tags(self):
+        """Tag names by row id with the pending tag changes applied"""
+        with self._lock:
+            tags = dict(self.tags)
+            for op, row_id, name, _, _ in self.pending:
+                if op == OP_TAG:
+                    tags[row_id] = tags.get(row_id, frozenset()) | {name}
+                elif op == OP_UNTAG and name in tags.get(row_id, ()):
+                    tags[row_id] = tags[row_id] - {name}
+            return {row_id: names for row_id, names in tags.items() if names}
+
+    def server_id(self, row_id):
+        """The id a row has on the server; differs from the queued one for uploaded adds"""
+        return self._id_map.get(row_id, row_id)
+
+    def token_for(self, row_id):
+        row_id = self.server_id(row_id)
+        for current_id, _, token in self.current_rows():
+            if current_id == row_id:
+                return token
+        return None
+
+    # Writing
+
+    def save(self, fernet):
+        """Write the snapshot atomically (readable by the owner only)"""
+        from encryption import batch_encrypt
+
+        with telemetry.span("cache.save") as span, self._lock:
+            mac_key = self._mac_key(fernet)
+            if mac_key is None:
+                # Nothing to sign it with; the next start syncs from the server instead
+                span.set_attribute("cache.skipped", True)
+                return
+            tag_lines = {row_id: "\n".join(sorted(names)) for row_id, names in self.tags.items()}
+            descriptions = {row[1] for row in self.rows}
+            descriptions.update(op[2] for op in self.pending if op[2])
+            descriptions.update(tag_lines.values())
+            missing = [d for d in descriptions if d not in self._description_tokens]
+            if missing:
+                self._description_tokens.update(zip(missing, batch_encrypt(missing, fernet)))
+            # Drop tokens of descriptions that no longer exist
+            tokens = {d: self._description_tokens[d] for d in descriptions}
+            self._description_tokens = tokens
+
+            saved_at = time.time()
+            parts = [_HEADER.pack(MAGIC, self.user_id, self.version, len(self.rows), len(self.pending),
+                                  saved_at, len(tag_lines))]
+            for row_id, description, token in self.rows:
+                d, t = tokens[description].encode(), token.encode()
+                parts += [_ROW.pack(row_id, len(d), len(t)), d, t]
+            layout, _ = _PENDING[MAGIC]
+            for op, row_id, description, token, base in self.pending:
+                d = tokens[description].encode() if description else b""
+                t = token.encode() if token else b""
+                b = base.encode() if base else b""
+                parts += [layout.pack(op, row_id, len(d), len(t), len(b)), d, t, b]
+            for row_id, line in tag_lines.items():
+                d = tokens[line].encode()
+                parts += [_TAGS.pack(row_id, len(d)), d]
+            body = b"".join(parts)
+            mac = hmac.new(mac_key, body, hashlib.sha256).digest()
+
+            tmp_path = self.path + ".tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "wb") as f:
+                f.write(body)
+                f.write(mac)
+            os.replace(tmp_path, self.path)
+            self.saved_at = saved_at
+            span.set_attribute("cache.bytes", len(body) + len(mac))
+
+    def apply_changes(self, changes, fernet):
+        """Bring the snapshot up to date with a vault_sync.ChangeSet"""
+        with self._lock:
+            if changes.full:
+                rows = [tuple(row) for row in changes.upserts]
+                tags = dict(changes.tags)
+            elif changes:
+                by_id = {row[0]: row for row in self.rows}
+                tags = dict(self.tags)
+                for row_id in changes.deletes:
+                    by_id.pop(row_id, None)
+                    tags.pop(row_id, None)
+                for row in changes.upserts:
+                    by_id[row[0]] = tuple(row)
+                    # An upserted row comes with all of its tags
+                    if row[0] in changes.tags:
+                        tags[row[0]] = changes.tags[row[0]]
+                    else:
+                        tags.pop(row[0], None)
+                rows = sorted(by_id.values())
+            else:
+                rows, tags = self.rows, self.tags
+            if (rows == self.rows and tags == self.tags and changes.version == self.version
+                    and self.saved_at is not None):
+                return
+            if rows != self.rows:
+                # Orders read before the change may have moved
+                self.orders = {}
+            self.rows = rows
+            self.tags = tags
+            self.version = changes.version
+            self.save(fernet)
+
+    def _can_fold(self, op, row_id):
+        return op[1] == row_id and id(op) not in self._in_flight
+
+    def queue_add(self, description, token, fernet):
+        """Queue a new row; returns its temporary (negative) id"""
+        with self._lock:
+            row_id = min([0] + [row[0] for row in self.rows] + [op[1] for op in self.pending]
+                         + list(self._id_map)) - 1
+            self.pending.append([OP_ADD, row_id, description, token, None])
+            self.save(fernet)
+            return row_id
+
+    def queue_update(self, row_id, token, fernet, description=None):
+        with self._lock:
+            row_id = self._id_map.get(row_id, row_id)
+            for op in self.pending:
+                # Fold into a queued add or update of the same row
+                if self._can_fold(op, row_id) and op[0] in (OP_ADD, OP_UPDATE):
+                    op[2] = description or op[2]
+                    op[3] = token
+                    break
+            else:
+                # The ciphertext being replaced; the upload only goes through if
+                # the server still has it
+                base = next((row[2] for row in self.current_rows() if row[0] == row_id), None)
+                self.pending.append([OP_UPDATE, row_id, description, token, base])
+            self.save(fernet)
+
+    def queue_delete(self, row_id, fernet):
+        self.queue_delete_many([row_id], fernet)
+
+    def queue_delete_many(self, row_ids, fernet):
+        """Queue deleting several rows; they are uploaded together and the snapshot is saved once"""
+        with self._lock:
+            row_ids = list(dict.fromkeys(self._id_map.get(row_id, row_id) for row_id in row_ids))
+            targets = set(row_ids)
+            folded = [op for op in self.pending if op[1] in targets and id(op) not in self._in_flight]
+            queued_adds = {op[1] for op in folded if op[0] == OP_ADD}
+            folded = {id(op) for op in folded}
+            self.pending = [op for op in self.pending if id(op) not in folded]
+            # Rows that never reached the server just disappear
+            self.pending.extend([OP_DELETE, row_id, None, None, None] for row_id in row_ids if row_id not in queued_adds)
+            self.save(fernet)
+
+    def queue_tags(self, row_ids, name, fernet, remove=False):
+        """Queue tagging several rows with name (or untagging them); uploaded as one statement"""
+        op = OP_UNTAG if remove else OP_TAG
+        with self._lock:
+            row_ids = list(dict.fromkeys(self._id_map.get(row_id, row_id) for row_id in row_ids))
+            targets = set(row_ids)
+            # A later change of the same tag on a row replaces a queued one
+            self.pending = [queued for queued in self.pending
+                            if not (queued[0] in (OP_TAG, OP_UNTAG) and queued[2] == name and queued[1] in targets
+                                    and id(queued) not in self._in_flight)]
+            self.pending.extend([op, row_id, name, None, None] for row_id in row_ids)
+            self.save(fernet)
+
+    def flush_pending(self, conn, fernet):
+        """
+        Upload the queued writes in one transaction; returns a FlushResult.
+
+        Updates only replace the ciphertext they were based on. When another
+        device changed or deleted the row meanwhile, the edit is saved as a
+        separate entry instead of overwriting or resurrecting it. Writes the
+        server rejects are dropped and reported; connection errors propagate
+        with everything still queued.
+        """
+        with self._lock:
+            batch = list(self.pending)
+            if not batch:
+                return FlushResult()
+            self._in_flight = {id(op) for op in batch}
+            descriptions = {row[0]: row[1] for row in self.rows}
+        # Uploaded without holding the lock so the GUI can keep queueing
+        try:
+            try:
+                result, effects, tag_effects, id_map = self._upload(conn, batch, dict(descriptions), isolate=False)
+            except mysql.connector.Error as e:
+                if is_connection_error(e):
+                    raise
+                # One write was rejected: redo the batch with each write in
+                # a savepoint so the rest still goes through
+                result, effects, tag_effects, id_map = self._upload(conn, batch, descriptions, isolate=True)
+        except Exception:
+            with self._lock:
+                self._in_flight = set()
+            raise
+
+        with self._lock:
+            self._in_flight = set()
+            # The server's state is known now; the next sync confirms it
+            by_id = {row[0]: row for row in self.rows}
+            for row_id, row in effects:
+                if row is None:
+                    by_id.pop(row_id, None)
+                    self.tags.pop(row_id, None)
+                else:
+                    by_id[row_id] = row
+            self.rows = sorted(by_id.values())
+            for row_id, name, add in tag_effects:
+                names = self.tags.get(row_id, frozenset())
+                names = names | {name} if add else names - {name}
+                if names and row_id in by_id:
+                    self.tags[row_id] = names
+                else:
+                    self.tags.pop(row_id, None)
+            self._id_map.update(id_map)
+            flushed = {id(op) for op in batch}
+            self.pending = [op for op in self.pending if id(op) not in flushed]
+            for op in self.pending:
+                op[1] = id_map.get(op[1], op[1])
+            # Saved straight away so a restart cannot upload the same writes twice
+            self.save(fernet)
+        telemetry.count("cache.flushed_writes", result.applied)
+        telemetry.count("cache.write_conflicts", len(result.conflicts))
+        return result
+
+    def _upload(self, conn, batch, descriptions, isolate):
+        result = FlushResult()
+        effects = []
+        tag_effects = []
+        id_map = {}
+        # Consecutive deletes, or consecutive changes of one tag, go out as
+        # one set-based statement
+        run = []
+        run_key = None
+
+        def flush_run():
+            op, name = run_key
+            self._apply_many(conn, op, run, name)
+            if op == OP_DELETE:
+                effects.extend((row_id, None) for row_id in run)
+            else:
+                tag_effects.extend((row_id, name, op == OP_TAG) for row_id in run)
+            result.applied += len(run)
+            run.clear()
+
+        cursor = conn.cursor()
+        try:
+            for op, row_id, description, token, base in batch:
+                row_id = id_map.get(row_id, row_id)
+                if op in (OP_DELETE, OP_TAG, OP_UNTAG) and not isolate:
+                    if run and run_key != (op, description):
+                        flush_run()
+                    run_key = (op, description)
+                    run.append(row_id)
+                    continue
+                if run:
+                    flush_run()
+                description = description or descriptions.get(row_id)
+                if isolate:
+                    cursor.execute("SAVEPOINT queued_write")
+                try:
+                    if op == OP_ADD:
+                        new_id = self._insert(conn, description, token, self._uncertain)
+                        id_map[row_id] = new_id
+                        descriptions[new_id] = description
+                        effects.append((new_id, (new_id, description, token)))
+                    elif op == OP_UPDATE:
+                        if self._update(conn, row_id, description, token, base):
+                            effects.append((row_id, (row_id, description, token)))
+                        else:
+                            copy = (description or "Untitled") + CONFLICT_SUFFIX
+                            new_id = self._insert(conn, copy, token, self._uncertain)
+                            effects.append((new_id, (new_id, copy, token)))
+                            result.conflicts.append(copy)
+                            continue
+                    elif op == OP_DELETE:
+                        conn.execute("DELETE FROM passwords WHERE id = %s AND user_id = %s", (row_id, self.user_id))
+                        effects.append((row_id, None))
+                    else:
+                        self._apply_many(conn, op, [row_id], description)
+                        tag_effects.append((row_id, description, op == OP_TAG))
+                except mysql.connector.Error as e:
+                    if not isolate or is_connection_error(e):
+                        raise
+                    cursor.execute("ROLLBACK TO SAVEPOINT queued_write")
+                    result.failed.append((description or f"#{row_id}", str(e)))
+                    continue
+                result.applied += 1
+            if run:
+                flush_run()
+            try:
+                conn.commit()
+            except mysql.connector.Error as e:
+                # The commit may or may not have happened on the server
+                self._uncertain = is_connection_error(e)
+                raise
+            self._uncertain = False
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            cursor.close()
+        return result, effects, tag_effects, id_map
+
+    def _insert(self, conn, description, token, check_existing):
+        if check_existing:
+            # Ciphertexts are unique, so a row with this one is this write
+            existing = conn.execute("SELECT id FROM passwords WHERE user_id = %s AND encrypted_password = %s",
+                                    (self.user_id, token)).fetchone()
+            if existing:
+                return existing[0]
+        return conn.execute("INSERT INTO passwords (user_id, description, encrypted_password, sort_key) "
+                            "VALUES (%s, %s, %s, %s)",
+                            (self.user_id, description, token, natural_key(description))).lastrowid
+
+    def _apply_many(self, conn, op, row_ids, name):
+        if op == OP_TAG:
+            tag_entries(conn, self.user_id, row_ids, name)
+        elif op == OP_UNTAG:
+            untag_entries(conn, self.user_id, row_ids, name)
+        else:
+            for start in range(0, len(row_ids), DELETE_CHUNK):
+                chunk = row_ids[start:start + DELETE_CHUNK]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                conn.execute_unprepared(f"DELETE FROM passwords WHERE user_id = %s AND id IN ({placeholders})",
+                                        (self.user_id, *chunk))
+
+    def _update(self, conn, row_id, description, token, base):
+        """Compare-and-swap of the row's ciphertext; False when the row changed elsewhere"""
+        sort_key = natural_key(description) if description else None
+        if base is None:
+            statement = conn.execute("UPDATE passwords SET encrypted_password = %s, description = COALESCE(%s, description), "
+                                     "sort_key = COALESCE(%s, sort_key) WHERE id = %s AND user_id = %s",
+                                     (token, description, sort_key, row_id, self.user_id))
+        else:
+            statement = conn.execute("UPDATE passwords SET encrypted_password = %s, description = COALESCE(%s, description), "
+                                     "sort_key = COALESCE(%s, sort_key) WHERE id = %s AND user_id = %s "
+                                     "AND encrypted_password = %s",
+                                     (token, description, sort_key, row_id, self.user_id, base))
+        if statement.rowcount:
+            return True
+        # Nothing matched: gone, changed elsewhere, or this very write sent
+        # again after a commit whose outcome was unknown
+        current = conn.execute("SELECT encrypted_password FROM passwords WHERE id = %s AND user_id = %s",
+                               (row_id, self.user_id)).fetchone()
+        return current is not None and current[0] == token
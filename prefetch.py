@@ -0,0 +1,99 @@
+"""
+Login prefetch
+
+Logging in used to do everything after the password was verified, one step
+after another: import the dashboard, connect, read the key file, query the
+vault, decrypt it and build the window. Most of it does not depend on the
+password, so it now starts while the user is still typing:
+
+    prefetch = get_prefetch()
+    prefetch.warm()            # username entered: imports, spare
+                               # connections (db_config) with the sync's
+                               # statements prepared, and the vault cipher
+    ...
+    fernet = prefetch.take_cipher()
+    future = write_queue.fetch_vault(cache, fernet)   # after verification,
+    Dashboard(..., prefetched=future)                 # while the window builds
+
+The connection and the cipher are only ever handed to one login; a warm-up
+that fails, or has not finished when the password is verified, is not an
+error, the login then does the work itself.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+
+
+class Prefetch:
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vault-prefetch")
+        self._lock = threading.Lock()
+        self._warming = None
+
+    def warm(self):
+        """Start preparing for a login in the background; calling it again is free"""
+        with self._lock:
+            if self._warming is None:
+                telemetry.count("prefetch.started")
+                self._warming = self._executor.submit(self._warm)
+            return self._warming
+
+    @staticmethod
+    def _warm():
+        with telemetry.span("prefetch.warm") as span:
+            # The windows and modules needed right after login
+            import dashboard  # noqa: F401
+            from db_config import prewarm_connection
+            from session_manager import Session
+            from vault_sync import prepare_sync
+
+            fernet = Session._load_fernet()
+            try:
+                # One for the login's user lookup, one for the vault fetch;
+                # the login may hand either to the fetch
+                prewarm_connection(2, setup=prepare_sync)
+            except Exception as e:
+                # The login connects (and reports the failure) itself
+                span.record_error(e)
+            return fernet
+
+    def take_cipher(self):
+        """
+        The vault cipher loaded by warm(), or None, without waiting for a
+        warm-up still running (its connect can take DB_CONNECT_TIMEOUT); each
+        warm-up's cipher is handed out once
+        """
+        with self._lock:
+            warming, self._warming = self._warming, None
+        if warming is None:
+            return None
+        if not warming.done():
+            telemetry.count("prefetch.unfinished")
+            # Nobody will take this cipher; its key is zeroed once it exists
+            warming.add_done_callback(_wipe_unused)
+            return None
+        try:
+            fernet = warming.result()
+        except Exception:
+            return None
+        telemetry.count("prefetch.used")
+        return fernet
+
+
+def _wipe_unused(warming):
+    from encryption import wipe_fernet
+
+    if not warming.cancelled() and warming.exception() is None:
+        wipe_fernet(warming.result())
+
+
+_prefetch = None
+
+
+def get_prefetch():
+    global _prefetch
+    if _prefetch is None:
+        _prefetch = Prefetch()
+    return _prefetch
@@ -0,0 +1,374 @@
+"""
+Query execution wrapper: slow-query log and per-statement latency statistics
+
+Every connection handed out by db_config.get_connection runs its statements
+through LoggedCursor, which times them, aggregates latency per statement
+fingerprint and logs any statement slower than the threshold with its
+parameters redacted.
+
+The fixed statements the app runs over and over (login lookup, vault reads,
+single-row fetches, inserts, updates, deletes) go through
+LoggedConnection.prepared instead: each is prepared on the server once per
+connection and only its parameters travel after that. db_config keeps
+closed connections for reuse, so their prepared statements outlive a single
+sync. Statements whose text is built per call (IN lists as long as the batch)
+go through LoggedConnection.execute_unprepared: prepared, each length would
+stay on the server as one more statement per pooled connection, up to
+max_prepared_stmt_count. Large reads are streamed in batches (PreparedStatement.stream) rather
+than buffered whole on the client. QueryStats counts prepares and reuses.
+
+Settings (environment):
+
+    VAULT_SLOW_QUERY_MS=100        slow-query threshold in milliseconds
+    VAULT_SLOW_QUERY_LOG=path      write the slow-query log to a file (default: stderr)
+    VAULT_EXPLAIN_SLOW=1           capture EXPLAIN output for each slow statement once
+    VAULT_QUERY_STATS=path         dump the statistics to this file at exit
+
+Statistics can be dumped at any time with dump_stats(); main.py also dumps them
+on SIGUSR1.
+"""
+
+import atexit
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+import telemetry
+
+SLOW_QUERY_MS = float(os.environ.get("VAULT_SLOW_QUERY_MS", "100"))
+EXPLAIN_SLOW = os.environ.get("VAULT_EXPLAIN_SLOW") == "1"
+
+# Latest samples kept per fingerprint for percentiles
+SAMPLES_PER_STATEMENT = 512
+
+# Rows read from the server at a time by PreparedStatement.stream
+STREAM_BATCH = 500
+
+logger = logging.getLogger("vault.slow_query")
+if os.environ.get("VAULT_SLOW_QUERY_LOG"):
+    _handler = logging.FileHandler(os.environ["VAULT_SLOW_QUERY_LOG"])
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalise a statement so calls differing only in values group together"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def redact(params):
+    """Describe parameters by type and size only; values may be secrets"""
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {_describe(v)}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(_describe(v) for v in params) + ")"
+
+
+def _describe(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, (str, bytes, bytearray)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+class StatementStats:
+    __slots__ = ("count", "total_ms", "max_ms", "slow", "samples", "plan")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow = 0
+        self.samples = deque(maxlen=SAMPLES_PER_STATEMENT)
+        self.plan = None
+
+
+class QueryStats:
+    """Latency aggregation per statement fingerprint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements = {}
+        self.prepared = 0
+        self.prepared_reused = 0
+
+    def record_prepared(self, reused):
+        """Count one execution of a prepared statement, and whether it skipped the prepare"""
+        with self._lock:
+            if reused:
+                self.prepared_reused += 1
+            else:
+                self.prepared += 1
+        telemetry.count("db.prepared_reused" if reused else "db.prepared")
+
+    @property
+    def prepared_hit_rate(self):
+        """Share of prepared-statement executions that reused an earlier prepare"""
+        total = self.prepared + self.prepared_reused
+        return self.prepared_reused / total if total else 0.0
+
+    def record(self, key, elapsed_ms, slow):
+        """Record one execution; returns True the first time a statement is slow"""
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats()
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.samples.append(elapsed_ms)
+            if slow:
+                stats.slow += 1
+                return stats.slow == 1
+            return False
+
+    def set_plan(self, key, plan):
+        with self._lock:
+            if key in self._statements:
+                self._statements[key].plan = plan
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self.prepared = 0
+            self.prepared_reused = 0
+
+    def summary(self):
+        """Per-fingerprint statistics, most total time first"""
+        with self._lock:
+            items = [(key, s.count, s.total_ms, s.max_ms, s.slow, sorted(s.samples), s.plan)
+                     for key, s in self._statements.items()]
+
+        def percentile(samples, p):
+            return samples[min(len(samples) - 1, int(p / 100 * len(samples)))] if samples else 0.0
+
+        rows = [{
+            "statement": key,
+            "count": count,
+            "total_ms": round(total, 3),
+            "mean_ms": round(total / count, 3),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "p99_ms": round(percentile(samples, 99), 3),
+            "max_ms": round(max_ms, 3),
+            "slow": slow,
+            "plan": plan,
+        } for key, count, total, max_ms, slow, samples, plan in items]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+
+stats = QueryStats()
+
+
+def dump_stats(out=None):
+    """Write the per-statement table to out (a path or file object; default stdout)"""
+    rows = stats.summary()
+    own_file = isinstance(out, str)
+    stream = open(out, "w", encoding="utf-8") if own_file else (out or sys.stdout)
+    try:
+        stream.write(f"{'count':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'slow':>5}  statement\n")
+        for row in rows:
+            stream.write(f"{row['count']:>7} {row['total_ms']:>10.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                         f"{row['p99_ms']:>8.2f} {row['max_ms']:>8.2f} {row['slow']:>5}  {row['statement']}\n")
+            if row["plan"]:
+                for line in row["plan"]:
+                    stream.write(f"{'':>55}  plan: {line}\n")
+        stream.write(f"prepared statements: {stats.prepared} prepared, {stats.prepared_reused} reused "
+                     f"({stats.prepared_hit_rate:.0%})\n")
+    finally:
+        if own_file:
+            stream.close()
+    return rows
+
+
+def _capture_plan(key, sql, params):
+    """Run EXPLAIN on a separate connection so the caller's results are untouched"""
+    from db_config import get_raw_connection
+
+    try:
+        conn = get_raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("EXPLAIN " + sql, params)
+            columns = [d[0] for d in cursor.description]
+            plan = [", ".join(f"{c}={v}" for c, v in zip(columns, row)) for row in cursor.fetchall()]
+            cursor.close()
+        finally:
+            conn.close()
+    except Exception as e:
+        plan = [f"EXPLAIN failed: {e}"]
+    stats.set_plan(key, plan)
+    logger.warning("plan for %s: %s", key, " | ".join(plan))
+
+
+def record_statement(sql, params, elapsed_ms):
+    """Add one execution to the statistics and the slow-query log (for statements run outside LoggedCursor)"""
+    key = fingerprint(sql)
+    slow = elapsed_ms >= SLOW_QUERY_MS
+    first_slow = stats.record(key, elapsed_ms, slow)
+    if slow:
+        logger.warning("slow query %.1f ms: %s params=%s", elapsed_ms, key, redact(params))
+        if EXPLAIN_SLOW and first_slow:
+            threading.Thread(target=_capture_plan, args=(key, sql, params), daemon=True).start()
+
+
+class LoggedCursor:
+    """Cursor proxy that times every statement it executes"""
+
+    __slots__ = ("_cursor",)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        # Only the statement text goes into spans; parameters may hold secrets
+        with telemetry.span("db.execute", {"db.statement": operation}):
+            start = time.perf_counter()
+            try:
+                return self._cursor.execute(operation, params, *args, **kwargs)
+            finally:
+                record_statement(operation, params, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        with telemetry.span("db.executemany", {"db.statement": operation}):
+            start = time.perf_counter()
+            try:
+                return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+            finally:
+                record_statement(operation, None, (time.perf_counter() - start) * 1000)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class PreparedStatement:
+    """
+    One statement prepared on the server for one connection (see
+    LoggedConnection.prepared). Rows come back as tuples and every result is
+    read to the end, so the statement is ready to run again; it is never
+    closed by callers.
+    """
+
+    __slots__ = ("sql", "_cursor", "_ready")
+
+    def __init__(self, conn, sql):
+        self.sql = sql
+        self._cursor = conn.cursor(prepared=True)
+        self._ready = False
+
+    def execute(self, params=()):
+        with telemetry.span("db.execute", {"db.statement": self.sql, "db.prepared": True}):
+            start = time.perf_counter()
+            try:
+                # The driver prepares again unless it gets the same string object
+                self._cursor.execute(self.sql, params)
+            finally:
+                record_statement(self.sql, params, (time.perf_counter() - start) * 1000)
+        stats.record_prepared(self._ready)
+        self._ready = True
+        return self
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchone(self):
+        """The first row, or None; any others are read and dropped"""
+        rows = self._cursor.fetchall()
+        return rows[0] if rows else None
+
+    def stream(self, batch=STREAM_BATCH):
+        """Yield the rows as they arrive, batch at a time, instead of buffering the whole result"""
+        while True:
+            rows = self._cursor.fetchmany(batch)
+            if not rows:
+                return
+            yield from rows
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+
+class LoggedConnection:
+    """Connection proxy whose cursors go through the query log"""
+
+    __slots__ = ("_conn", "_prepared")
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._prepared = {}
+
+    def cursor(self, *args, **kwargs):
+        return LoggedCursor(self._conn.cursor(*args, **kwargs))
+
+    def prepared(self, sql):
+        """sql prepared on this connection, prepared on first use and kept for the next ones"""
+        statement = self._prepared.get(sql)
+        if statement is None:
+            statement = self._prepared[sql] = PreparedStatement(self._conn, sql)
+        return statement
+
+    def execute(self, sql, params=()):
+        """Run sql as a prepared statement; returns it for fetching the result"""
+        return self.prepared(sql).execute(params)
+
+    def execute_unprepared(self, sql, params=()):
+        """Run sql on a plain buffered cursor, for statements whose text varies; returns the cursor"""
+        cursor = self.cursor(buffered=True)
+        cursor.execute(sql, params)
+        return cursor
+
+    def commit(self):
+        with telemetry.span("db.commit"):
+            start = time.perf_counter()
+            try:
+                self._conn.commit()
+            finally:
+                record_statement("COMMIT", None, (time.perf_counter() - start) * 1000)
+
+    def close(self):
+        """Give the connection back to db_config for reuse; closed for real if it cannot be"""
+        from db_config import release_connection
+
+        if not release_connection(self):
+            self.discard()
+
+    def discard(self):
+        """Close the connection for good, prepared statements and all"""
+        self._prepared.clear()
+        self._conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def wrap_connection(conn):
+    return LoggedConnection(conn)
+
+
+if os.environ.get("VAULT_QUERY_STATS"):
+    atexit.register(dump_stats, os.environ["VAULT_QUERY_STATS"])
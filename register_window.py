@@ -6,6 +6,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 from db_config import get_connection
 from password_validator import PasswordValidator
+from theme import apply_theme
+import telemetry
 
 import re
 
@@ -13,13 +15,13 @@ import re
 class RegisterWindow(QDialog):
     def __init__(self):
         super().__init__()
+        apply_theme()
         self.setWindowTitle("Register - Password Vault")
         self.setFixedSize(450, 900)  # Increased height for validation feedback
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowMaximizeButtonHint)
         self.setModal(True)
         self.center_window()
         self.setup_ui()
-        self.apply_styles()
         
     @staticmethod
     def is_valid_email(email):
@@ -241,184 +243,23 @@ class RegisterWindow(QDialog):
             self.validation_text.setStyleSheet("color: #e17055; background-color: #fdf2f2;")
             self.register_btn.setEnabled(False)
 
-    def apply_styles(self):
-        self.setStyleSheet("""
-            /* Main Window */
-            QWidget {
-                background-color: #ffffff;
-                color: #2c3e50;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            
-            /* Header Section */
-            #headerFrame {
-                background-color: #00cec9;
-                border: none;
-            }
-            
-            #titleLabel {
-                font-size: 28px;
-                font-weight: bold;
-                color: #000000;
-                margin-bottom: 2px;
-            }
-            
-            #subtitleLabel {
-                font-size: 14px;
-                color: #00cec9;
-                font-weight: 500;
-            }
-            
-            /* Content Section */
-            #contentFrame {
-                background-color: #ffffff;
-                border-top-left-radius: 0px;
-                border-top-right-radius: 0px;
-            }
-            
-            #formTitle {
-                font-size: 22px;
-                font-weight: 600;
-                color: #000000;
-                margin-bottom: 10px;
-            }
-            
-            /* Input Containers */
-            #inputContainer {
-                background-color: #f8f9fa;
-                border-radius: 12px;
-                border: 2px solid #e9ecef;
-            }
-            
-            #inputContainer:hover {
-                border-color: #00cec9;
-            }
-            
-            #inputLabel {
-                font-size: 12px;
-                font-weight: 600;
-                color: #000000;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-            }
-            
-            /* Modern Input Fields */
-            #modernInput {
-                background-color: transparent;
-                border: none;
-                font-size: 16px;
-                color: #2c3e50;
-                padding: 8px 5px;
-                outline: none;
-                min-height: 21px;
-            }
-            
-            #modernInput:focus {
-                color: #2c3e50;
-            }
-            
-            #modernInput::placeholder {
-                color: #adb5bd;
-            }
-            
-            /* Strength Label */
-            #strengthLabel {
-                margin: 5px 0;
-                padding: 5px;
-                border-radius: 4px;
-                background-color: #f8f9fa;
-            }
-            
-            /* Validation Text */
-            #validationText {
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 10px;
-                font-size: 12px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                line-height: 1.4;
-                background-color: #f8f9fa;
-                color: #495057;
-            }
-            
-            /* Toggle Button */
-            #toggleButton {
-                background-color: #e9ecef;
-                border: none;
-                border-radius: 6px;
-                padding: 8px 12px;
-                font-size: 14px;
-                color: #000000;
-                min-width: 40px;
-            }
-            
-            #toggleButton:hover {
-                color: #00cec9;
-            }
-            
-            /* Primary Button */
-            #primaryButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00cec9, stop: 1 #00b894);
-                border: none;
-                border-radius: 8px;
-                padding: 12px 15px;
-                font-size: 16px;
-                font-weight: 600;
-                color: #ffffff;
-                margin-top: 10px;
-                min-height: 21px;
-            }
-            
-            #primaryButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #1dd1cc, stop: 1 #00d2a4);
-            }
-            
-            #primaryButton:pressed {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00a085, stop: 1 #009688);
-            }
-            
-            #primaryButton:disabled {
-                background-color: #dee2e6;
-                color: #6c757d;
-            }
-            
-            /* Text Button */
-            #textButton {
-                background-color: transparent;
-                border: none;
-                padding: 10px;
-                font-size: 14px;
-                color: #000000;
-                text-decoration: underline;
-            }
-            
-            #textButton:hover {
-                color: #00cec9;
-            }
-            
-            /* Message Boxes */
-            QMessageBox {
-                background-color: #ffffff;
-                color: #2c3e50;
-            }
-            
-            QMessageBox QPushButton {
-                background-color: #00cec9;
-                border: none;
-                border-radius: 4px;
-                padding: 8px 16px;
-                color: #ffffff;
-                font-weight: 500;
-                min-width: 80px;
-            }
-            
-            QMessageBox QPushButton:hover {
-                background-color: #1dd1cc;
-            }
-        """)
+    def reset(self):
+        """Empty the form so the dialog can be shown again"""
+        for field in (self.email_input, self.username_input, self.password_input, self.confirm_input):
+            field.clear()
+        self.password_input.setEchoMode(QLineEdit.Password)
+        self.pw_toggle.setText("show")
+        self.confirm_input.setEchoMode(QLineEdit.Password)
+        self.confirm_toggle.setText("show")
+        self.strength_label.setStyleSheet("")
+        self.validation_text.setStyleSheet("")
+        self.on_password_changed()
+        self.email_input.setFocus()
+
+    def done(self, result):
+        # Closed either way: don't keep the typed master password around
+        self.reset()
+        super().done(result)
 
     def toggle_password(self):
         if self.password_input.echoMode() == QLineEdit.Password:
@@ -465,7 +306,8 @@ class RegisterWindow(QDialog):
             )
             return
 
-        hashed_pw = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+        with telemetry.span("bcrypt.hashpw", {"auth.purpose": "register"}):
+            hashed_pw = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
 
         try:
             conn = get_connection()
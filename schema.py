@@ -0,0 +1,215 @@
+from db_config import get_connection
+
+# Tables used by the application, in creation order
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        username VARCHAR(100) NOT NULL UNIQUE,
+        master_password_hash VARCHAR(255) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS passwords (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        description VARCHAR(255) NOT NULL,
+        encrypted_password TEXT NOT NULL,
+        INDEX idx_passwords_user (user_id),
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def _fill_sort_keys(cursor):
+    """sort_key of the existing rows; computed in Python like every writer does"""
+    from vault_sort import natural_key
+
+    cursor.execute("SELECT id, description FROM passwords")
+    rows = cursor.fetchall()
+    cursor.executemany("UPDATE passwords SET sort_key = %s WHERE id = %s",
+                       [(natural_key(description), row_id) for row_id, description in rows])
+
+
+# Changes on top of TABLES, applied in order once each; schema_migrations
+# records how many have been applied. A step is a statement or a function
+# taking the cursor
+MIGRATIONS = [
+    # 1: row versions and a change log, for incremental sync (vault_sync.py).
+    # A row's version is the id of the change-log entry its last write made.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS password_changes (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            password_id INT NULL,
+            op ENUM('upsert', 'delete') NOT NULL,
+            changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            INDEX idx_changes_user (user_id, id),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        ALTER TABLE passwords
+            ADD COLUMN version BIGINT NOT NULL DEFAULT 0,
+            ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+            ADD INDEX idx_passwords_user_version (user_id, version)
+        """,
+        # Existing rows get their first version before the triggers exist
+        "INSERT INTO password_changes (user_id, password_id, op) SELECT user_id, id, 'upsert' FROM passwords ORDER BY id",
+        "UPDATE passwords p JOIN password_changes c ON c.password_id = p.id SET p.version = c.id",
+        # Triggers keep versions and the log right for every writer (GUI, CLI,
+        # offline cache uploads) without each having to remember
+        "DROP TRIGGER IF EXISTS passwords_version_insert",
+        """
+        CREATE TRIGGER passwords_version_insert BEFORE INSERT ON passwords FOR EACH ROW
+        BEGIN
+            INSERT INTO password_changes (user_id, op) VALUES (NEW.user_id, 'upsert');
+            SET NEW.version = LAST_INSERT_ID();
+        END
+        """,
+        "DROP TRIGGER IF EXISTS passwords_version_inserted",
+        """
+        CREATE TRIGGER passwords_version_inserted AFTER INSERT ON passwords FOR EACH ROW
+            UPDATE password_changes SET password_id = NEW.id WHERE id = NEW.version
+        """,
+        "DROP TRIGGER IF EXISTS passwords_version_update",
+        """
+        CREATE TRIGGER passwords_version_update BEFORE UPDATE ON passwords FOR EACH ROW
+        BEGIN
+            IF NOT (NEW.description <=> OLD.description AND NEW.encrypted_password <=> OLD.encrypted_password) THEN
+                INSERT INTO password_changes (user_id, password_id, op) VALUES (NEW.user_id, NEW.id, 'upsert');
+                SET NEW.version = LAST_INSERT_ID();
+            END IF;
+        END
+        """,
+        "DROP TRIGGER IF EXISTS passwords_version_delete",
+        """
+        CREATE TRIGGER passwords_version_delete AFTER DELETE ON passwords FOR EACH ROW
+            INSERT INTO password_changes (user_id, password_id, op) VALUES (OLD.user_id, OLD.id, 'delete')
+        """,
+    ],
+    # 2: tags (folders), many per entry (vault_tags.py). Names are stored
+    # once per user; the (user_id, tag_id) index serves filtering by tag
+    [
+        """
+        CREATE TABLE IF NOT EXISTS tags (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            UNIQUE INDEX idx_tags_user_name (user_id, name),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS password_tags (
+            password_id INT NOT NULL,
+            tag_id INT NOT NULL,
+            user_id INT NOT NULL,
+            PRIMARY KEY (password_id, tag_id),
+            INDEX idx_password_tags_user_tag (user_id, tag_id, password_id),
+            FOREIGN KEY (password_id) REFERENCES passwords(id) ON DELETE CASCADE,
+            FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+        )
+        """,
+        # Tagging gives the entry a new version, so incremental sync carries
+        # its tags along with it. Since these update passwords, a statement
+        # changing password_tags must not read passwords (MySQL error 1442)
+        "DROP TRIGGER IF EXISTS password_tags_insert",
+        """
+        CREATE TRIGGER password_tags_insert AFTER INSERT ON password_tags FOR EACH ROW
+        BEGIN
+            INSERT INTO password_changes (user_id, password_id, op) VALUES (NEW.user_id, NEW.password_id, 'upsert');
+            UPDATE passwords SET version = LAST_INSERT_ID() WHERE id = NEW.password_id;
+        END
+        """,
+        "DROP TRIGGER IF EXISTS password_tags_delete",
+        """
+        CREATE TRIGGER password_tags_delete AFTER DELETE ON password_tags FOR EACH ROW
+        BEGIN
+            INSERT INTO password_changes (user_id, password_id, op) VALUES (OLD.user_id, OLD.password_id, 'upsert');
+            UPDATE passwords SET version = LAST_INSERT_ID() WHERE id = OLD.password_id;
+        END
+        """,
+    ],
+    # 3: indexed sort orders (vault_sort.py). sort_key compares like Python
+    # strings (binary collation); updated_at now only moves when the
+    # description or password changes, not on every version bump
+    [
+        """
+        ALTER TABLE passwords
+            ADD COLUMN sort_key VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL DEFAULT '',
+            MODIFY updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            ADD INDEX idx_passwords_user_sort (user_id, sort_key, id),
+            ADD INDEX idx_passwords_user_updated (user_id, updated_at, id)
+        """,
+        _fill_sort_keys,
+        "DROP TRIGGER IF EXISTS passwords_version_update",
+        """
+        CREATE TRIGGER passwords_version_update BEFORE UPDATE ON passwords FOR EACH ROW
+        BEGIN
+            IF NOT (NEW.description <=> OLD.description AND NEW.encrypted_password <=> OLD.encrypted_password) THEN
+                INSERT INTO password_changes (user_id, password_id, op) VALUES (NEW.user_id, NEW.id, 'upsert');
+                SET NEW.version = LAST_INSERT_ID();
+                SET NEW.updated_at = NOW(6);
+            END IF;
+        END
+        """,
+    ],
+    # 4: usage counts for quick access and the "most used" order
+    # (vault_usage.py). Written in batches; they leave the version alone
+    [
+        """
+        ALTER TABLE passwords
+            ADD COLUMN reveal_count INT NOT NULL DEFAULT 0,
+            ADD COLUMN edit_count INT NOT NULL DEFAULT 0,
+            ADD COLUMN use_count INT AS (reveal_count + edit_count) STORED,
+            ADD COLUMN last_used_at TIMESTAMP(6) NULL,
+            ADD INDEX idx_passwords_user_used (user_id, use_count, id),
+            ADD INDEX idx_passwords_user_last_used (user_id, last_used_at)
+        """,
+    ],
+    # 5: sort_key puts each number's length before it instead of padding it
+    # to ten digits, so longer numbers sort by value too
+    [
+        _fill_sort_keys,
+    ],
+]
+
+def create_schema(conn=None):
+    """Create any missing tables and apply pending migrations"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for statement in TABLES:
+            cursor.execute(statement)
+        conn.commit()
+
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        (applied,) = cursor.fetchone()
+        for number, statements in enumerate(MIGRATIONS[applied:], start=applied + 1):
+            for statement in statements:
+                if callable(statement):
+                    statement(cursor)
+                else:
+                    cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (number,))
+            conn.commit()
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+
+if __name__ == "__main__":
+    create_schema()
+    print("✅ Database schema is up to date!")
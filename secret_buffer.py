@@ -0,0 +1,251 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+
+
+def _load_libc():
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    except (OSError, TypeError):
+        return None
+
+
+_libc = _load_libc()
+
+
+def _buffer_address(buf):
+    return ctypes.addressof((ctypes.c_char * len(buf)).from_buffer(buf))
+
+
+def _mlock(buf):
+    """Try to keep the buffer out of swap; not fatal if the OS refuses"""
+    if _libc is None or not hasattr(_libc, "mlock") or not buf:
+        return False
+    return _libc.mlock(ctypes.c_void_p(_buffer_address(buf)), ctypes.c_size_t(len(buf))) == 0
+
+
+def _munlock(buf):
+    if _libc is not None and hasattr(_libc, "munlock") and buf:
+        _libc.munlock(ctypes.c_void_p(_buffer_address(buf)), ctypes.c_size_t(len(buf)))
+
+
+# Size of a compact non-ASCII str object without its character data
+_COMPACT_HEADER = sys.getsizeof(chr(0x100) * 2) - 3 * 2
+
+
+def wipe_str(text):
+    """
+    Overwrite the character data of a temporary str in place.
+
+    Only use this on strings you created and still own (e.g. the one handed to
+    QLabel.setText). Single characters are shared interpreter singletons and
+    are never touched. Does nothing outside CPython.
+    """
+    if len(text) < 2 or sys.implementation.name != "cpython":
+        return
+    if text.isascii():
+        kind = 1
+    else:
+        max_char = ord(max(text))
+        kind = 1 if max_char < 0x100 else 2 if max_char < 0x10000 else 4
+        # A cached UTF-8 copy would shift the layout; leave such strings alone
+        if sys.getsizeof(text) != _COMPACT_HEADER + (len(text) + 1) * kind:
+            return
+    size = len(text) * kind
+    offset = sys.getsizeof(text) - size - kind
+    ctypes.memset(id(text) + offset, 0, size)
+
+
+class SecretBuffer:
+    """
+    Mutable, zeroizable storage for a decrypted secret.
+
+    The bytes live in a single bytearray that is locked in memory where the OS
+    allows it and overwritten with zeros by wipe(), on context exit and when
+    the object is garbage collected. A wiped buffer can be decrypted into again.
+    """
+
+    __slots__ = ("_buf", "_length", "_locked")
+
+    def __init__(self, capacity):
+        self._buf = bytearray(capacity)
+        self._length = 0
+        self._locked = _mlock(self._buf)
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __repr__(self):
+        return f"<SecretBuffer len={self._length}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wipe()
+
+    def __del__(self):
+        self.wipe()
+        if getattr(self, "_locked", False):
+            _munlock(self._buf)
+            self._locked = False
+
+    @property
+    def buffer(self):
+        """Writable backing storage, for decrypting directly into the buffer"""
+        return self._buf
+
+    def set_length(self, length):
+        if not 0 <= length <= len(self._buf):
+            raise ValueError("length exceeds buffer capacity")
+        self._length = length
+
+    def view(self):
+        """Read-only view of the secret bytes; no copy is made"""
+        return memoryview(self._buf)[:self._length].toreadonly()
+
+    def text(self):
+        """Decode the secret to a str (the one unavoidable copy for display)"""
+        with self.view() as view:
+            return str(view, "utf-8")
+
+    def show_in(self, setter):
+        """
+        Hand the secret as text to a setter such as QLabel.setText, then wipe
+        the temporary str so the only plaintext left is in this buffer.
+        """
+        text = self.text()
+        try:
+            setter(text)
+        finally:
+            wipe_str(text)
+
+    def wipe(self):
+        buf = getattr(self, "_buf", None)
+        if buf is None:
+            return
+        if buf:
+            # The pages stay locked so the buffer can be refilled in place
+            ctypes.memset(_buffer_address(buf), 0, len(buf))
+        self._length = 0
+
+    @property
+    def wiped(self):
+        return self._length == 0
+
+
+def wipe_bytes(data):
+    """
+    Overwrite the contents of a bytes object in place (CPython only).
+
+    Same caveats as wipe_str: only for objects nothing else refers to, such as
+    key material held privately by a cipher instance.
+    """
+    if len(data) < 2 or sys.implementation.name != "cpython":
+        return
+    ctypes.memset(id(data) + sys.getsizeof(data) - len(data) - 1, 0, len(data))
+
+
+def wipe_all(secrets):
+    """Wipe every SecretBuffer in an iterable"""
+    for secret in secrets:
+        secret.wipe()
+
+
+def _scan_process_memory(needle, skip_ranges):
+    """
+    Return addresses of needle in this process's writable memory (Linux only),
+    ignoring matches that fall inside skip_ranges.
+    """
+    matches = []
+    # Reuse one buffer for every read so the scan leaves no copies behind
+    chunk = bytearray(1 << 20)
+    chunk_start = _buffer_address(chunk)
+    skip_ranges = list(skip_ranges) + [(chunk_start, chunk_start + len(chunk))]
+
+    with open("/proc/self/maps") as maps:
+        regions = maps.read().splitlines()
+
+    fd = os.open("/proc/self/mem", os.O_RDONLY)
+    try:
+        for region in regions:
+            fields = region.split()
+            if "rw" not in fields[1]:
+                continue
+            start, end = (int(x, 16) for x in fields[0].split("-"))
+            addr = start
+            while addr < end:
+                size = min(len(chunk), end - addr)
+                try:
+                    os.lseek(fd, addr, os.SEEK_SET)
+                    read = os.readv(fd, [memoryview(chunk)[:size]])
+                except OSError:
+                    break
+                pos = chunk.find(needle, 0, read)
+                while pos != -1:
+                    found = addr + pos
+                    if not any(lo <= found < hi for lo, hi in skip_ranges):
+                        matches.append(found)
+                    pos = chunk.find(needle, pos + 1, read)
+                # Overlap reads so a match across a chunk boundary is not missed
+                addr += max(read - len(needle) + 1, 1)
+    finally:
+        os.close(fd)
+        ctypes.memset(chunk_start, 0, len(chunk))
+    return matches
+
+
+# Memory-scan self test: plaintext must not linger after display and wipe
+if __name__ == "__main__":
+    import subprocess
+    from cryptography.fernet import Fernet
+    from encryption import decrypt_secret
+
+    print("Testing secret buffers...")
+    key = Fernet.generate_key()
+
+    # A child process invents the plaintext and encrypts it, so the only
+    # copies in this process are the ones we read straight into buffers
+    child = subprocess.Popen(
+        [sys.executable, "-c",
+         "import os, sys, secrets\n"
+         "from cryptography.fernet import Fernet\n"
+         "pw = secrets.token_hex(16).encode()\n"
+         "token = Fernet(os.environ['VAULT_TEST_KEY'].encode()).encrypt(pw)\n"
+         "sys.stdout.buffer.write(pw + token)\n"],
+        stdout=subprocess.PIPE, env=dict(os.environ, VAULT_TEST_KEY=key.decode())
+    )
+    expected = SecretBuffer(32)
+    token = bytearray(4096)
+    fd = child.stdout.fileno()
+    got = 0
+    while got < 32:
+        got += os.readv(fd, [memoryview(expected.buffer)[got:]])
+    expected.set_length(32)
+    token_len = 0
+    while True:
+        n = os.readv(fd, [memoryview(token)[token_len:]])
+        if not n:
+            break
+        token_len += n
+    child.wait()
+
+    secret = decrypt_secret(memoryview(token)[:token_len], Fernet(key))
+    shown = []
+    secret.show_in(shown.append)
+    assert secret.view() == expected.view(), "decrypted secret does not match"
+    shown.clear()
+    secret.wipe()
+
+    exp_addr = _buffer_address(expected.buffer)
+    leftovers = _scan_process_memory(expected.view(), [(exp_addr, exp_addr + len(expected.buffer))])
+    expected.wipe()
+
+    if leftovers:
+        print(f"❌ Plaintext still in memory at {len(leftovers)} location(s)")
+        sys.exit(1)
+    print("✅ No plaintext left in memory after wipe")
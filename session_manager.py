@@ -0,0 +1,162 @@
+from PyQt5.QtCore import QObject, QTimer, QEvent, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+from cryptography.fernet import Fernet
+from encryption import get_fernet, load_key, wipe_fernet
+from db_config import get_connection
+from secret_buffer import wipe_bytes
+import telemetry
+
+# Lock the vault after this much time without keyboard or mouse input
+AUTO_LOCK_MS = 5 * 60 * 1000
+
+# Events that count as user activity and restart the idle timer
+_ACTIVITY_EVENTS = frozenset({
+    QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.MouseMove, QEvent.Wheel
+})
+
+
+class SessionLocked(Exception):
+    """Raised when key material is requested while the session is locked"""
+
+
+class Session(QObject):
+    """
+    Unlocked state of the logged-in user.
+
+    Holds the vault cipher while unlocked and drops it (wiping the key bytes)
+    on lock. Unlocking checks the master password against the hash cached at
+    login, so it costs one bcrypt verification and no database round trip;
+    the check runs on the auth worker and unlocked or unlock_failed follows.
+    """
+
+    locked = pyqtSignal()
+    unlocked = pyqtSignal()
+    # The error that stopped the check, or None for a wrong password
+    unlock_failed = pyqtSignal(object)
+    # Carries the finished check from the auth worker back to this thread
+    _checked = pyqtSignal(object)
+
+    def __init__(self, user_id, password_hash=None, idle_timeout_ms=AUTO_LOCK_MS, fernet=None):
+        super().__init__()
+        self.user_id = user_id
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode()
+        self._password_hash = password_hash
+        self._unlocking = None
+        self._checked.connect(self._on_checked)
+        # The login may have loaded the cipher already (prefetch.py)
+        self._fernet = fernet or self._load_fernet()
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(idle_timeout_ms)
+        self.idle_timer.timeout.connect(self.lock)
+        self.idle_timer.start()
+
+        # Watch input application-wide so any window counts as activity
+        QApplication.instance().installEventFilter(self)
+
+    @staticmethod
+    def _load_fernet():
+        get_fernet()  # creates secret.key on first run
+        key = load_key()
+        fernet = Fernet(key)
+        wipe_bytes(key)
+        return fernet
+
+    def eventFilter(self, obj, event):
+        if event.type() in _ACTIVITY_EVENTS and self._fernet is not None:
+            self.idle_timer.start()
+        return False
+
+    @property
+    def is_locked(self):
+        return self._fernet is None
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            raise SessionLocked("The vault is locked.")
+        return self._fernet
+
+    def lock(self):
+        if self._fernet is None:
+            return
+        self.idle_timer.stop()
+        telemetry.count("session.locks")
+        # Zero the key before dropping it; a sync still running has its own
+        # copy (WriteQueue.sync), wiped when it ends
+        wipe_fernet(self._fernet)
+        self._fernet = None
+        self.locked.emit()
+
+    @property
+    def is_unlocking(self):
+        return self._unlocking is not None
+
+    def unlock(self, master_password):
+        """
+        Start verifying the master password (stripped, as at login) off the
+        GUI thread; the key is restored and unlocked emitted if it matches
+        """
+        if self._fernet is not None:
+            self.unlocked.emit()
+            return
+        if self._unlocking is not None:
+            return
+        from auth_service import get_auth_service
+
+        future = self._unlocking = get_auth_service().submit(self._check, master_password.strip())
+        future.add_done_callback(self._checked.emit)
+
+    def _check(self, master_password):
+        # On the auth worker, like the hash lookup when the login did not pass it
+        password_hash = self._password_hash or self._fetch_password_hash()
+        if not password_hash:
+            return None
+        from auth_service import AuthService
+
+        return password_hash if AuthService.verify(master_password, password_hash) else None
+
+    def _on_checked(self, future):
+        if future is not self._unlocking:
+            # Ended meanwhile
+            return
+        self._unlocking = None
+        try:
+            password_hash = future.result()
+        except Exception as e:
+            self.unlock_failed.emit(e)
+            return
+        if password_hash is None:
+            self.unlock_failed.emit(None)
+            return
+        self._password_hash = password_hash
+        self._fernet = self._load_fernet()
+        self.idle_timer.start()
+        self.unlocked.emit()
+
+    def end(self):
+        """Lock for good on logout or close; no signal is emitted"""
+        QApplication.instance().removeEventFilter(self)
+        self.blockSignals(True)
+        self.lock()
+        self._password_hash = None
+        self._unlocking = None
+
+    async def load_password_hash_async(self):
+        """Fetch the hash unlock() checks against now, over async_db, unless the login passed it"""
+        if self._password_hash is not None:
+            return
+        import async_db
+
+        user = await async_db.fetchone("SELECT master_password_hash FROM users WHERE id = %s", (self.user_id,))
+        self._password_hash = user[0].encode() if user else None
+
+    def _fetch_password_hash(self):
+        conn = get_connection()
+        try:
+            user = conn.execute("SELECT master_password_hash FROM users WHERE id = %s", (self.user_id,)).fetchone()
+        finally:
+            conn.close()
+        return user[0].encode() if user else None
@@ -0,0 +1,142 @@
+"""
+Event-loop stall detector
+
+A heartbeat timer on the GUI thread records when the Qt event loop last ran;
+a watchdog thread notices when the heartbeat stops for longer than the
+threshold and samples the GUI thread's Python stack while it is stuck. Each
+stall is appended to a JSON-lines report, and at exit a summary ranks the
+blocking call sites by total time frozen.
+
+Settings (environment):
+
+    VAULT_STALL_MS=200                 stall threshold in milliseconds (0 disables)
+    VAULT_STALL_REPORT=path            where stalls are recorded (default: stall_report.jsonl)
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+from PyQt5.QtCore import QTimer
+
+import telemetry
+
+STALL_MS = float(os.environ.get("VAULT_STALL_MS", "200"))
+REPORT_PATH = os.environ.get("VAULT_STALL_REPORT", "stall_report.jsonl")
+
+# How often the event loop is pinged
+HEARTBEAT_MS = 50
+
+# Stack frames kept per sample, innermost last
+STACK_DEPTH = 30
+
+
+class StallDetector:
+    def __init__(self, threshold_ms=STALL_MS, report_path=REPORT_PATH, heartbeat_ms=HEARTBEAT_MS):
+        self.threshold = threshold_ms / 1000
+        self.report_path = report_path
+        self.stalls = []
+        self._main_thread_id = threading.main_thread().ident
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        # Must be created on the GUI thread so it fires from the Qt event loop
+        self._timer = QTimer()
+        self._timer.timeout.connect(self._beat)
+        self._timer.start(heartbeat_ms)
+        self._poll = heartbeat_ms / 1000
+        self._thread = threading.Thread(target=self._watch, name="vault-stall-watchdog", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.write_summary)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._timer.stop()
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+
+    def _main_stack(self):
+        frame = sys._current_frames().get(self._main_thread_id)
+        if frame is None:
+            return []
+        return [f"{fs.filename}:{fs.lineno} in {fs.name}"
+                for fs in traceback.extract_stack(frame, limit=STACK_DEPTH)]
+
+    def _watch(self):
+        while not self._stop.wait(self._poll):
+            beat = self._last_beat
+            if time.monotonic() - beat < self.threshold:
+                continue
+
+            # Stuck: sample the GUI thread now, while it is still blocked
+            stack = self._main_stack()
+            started = beat
+            while not self._stop.wait(self._poll) and self._last_beat == beat:
+                pass
+            self._record(started, (time.monotonic() - started) * 1000, stack)
+
+    def _record(self, started, duration_ms, stack):
+        stall = {
+            "time": time.time() - (time.monotonic() - started),
+            "duration_ms": round(duration_ms, 1),
+            "site": _blocking_site(stack),
+            "stack": stack,
+        }
+        with self._lock:
+            self.stalls.append(stall)
+            try:
+                with open(self.report_path, "a", encoding="utf-8") as report:
+                    report.write(json.dumps(stall) + "\n")
+            except OSError:
+                pass
+        telemetry.count("ui.stalls")
+        telemetry.observe("ui.stall_ms", duration_ms)
+
+    def summary(self):
+        """Call sites ordered by total time the UI spent frozen in them"""
+        with self._lock:
+            stalls = list(self.stalls)
+        sites = {}
+        for stall in stalls:
+            entry = sites.setdefault(stall["site"], {"site": stall["site"], "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += stall["duration_ms"]
+            entry["max_ms"] = max(entry["max_ms"], stall["duration_ms"])
+        return sorted(sites.values(), key=lambda entry: entry["total_ms"], reverse=True)
+
+    def write_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        try:
+            with open(self.report_path + ".summary.txt", "w", encoding="utf-8") as out:
+                out.write(f"{'count':>6} {'total ms':>10} {'max ms':>9}  blocking call site\n")
+                for row in rows:
+                    out.write(f"{row['count']:>6} {row['total_ms']:>10.1f} {row['max_ms']:>9.1f}  {row['site']}\n")
+        except OSError:
+            pass
+
+
+def _blocking_site(stack):
+    """The innermost frame in application code, which is what to fix"""
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    for line in reversed(stack):
+        if line.startswith(app_dir):
+            return os.path.relpath(line, app_dir)
+    return stack[-1] if stack else "unknown"
+
+
+def start_stall_detector():
+    """Start the watchdog unless disabled; call on the GUI thread after QApplication exists"""
+    if STALL_MS <= 0:
+        return None
+    return StallDetector().start()
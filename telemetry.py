@@ -0,0 +1,407 @@
+"""
+Tracing and metrics for the password vault
+
+Tracing is off unless one of these environment variables is set:
+
+    VAULT_TRACE_FILE=traces.jsonl          write spans and metrics as JSON lines
+    VAULT_TRACE_ENDPOINT=http://host:4318  send OTLP/JSON to a collector
+
+When off, span() hands back a shared no-op object and wrapped calls go
+straight through, so instrumented code pays one global lookup per call.
+
+Run `python telemetry.py collector` for a local stand-in OTLP collector that
+appends everything it receives to a JSON-lines file.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+
+# Upper bounds (ms) of histogram buckets; the last bucket is open ended
+HISTOGRAM_BOUNDS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Spans are sent to a collector in batches of this size, or every second
+EXPORT_BATCH = 256
+
+SERVICE_NAME = "password-vault"
+
+_exporter = None
+# The innermost open span; a context variable rather than a thread local so
+# coroutines interleaved on one thread (async_db.py) each see their own
+_current = contextvars.ContextVar("telemetry_span", default=None)
+
+
+def _new_id(nbytes):
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    """A timed operation with attributes; use as a context manager"""
+
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id",
+                 "start_ns", "end_ns", "_perf_start", "duration_ms", "error", "_token")
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = dict(attributes) if attributes else {}
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc):
+        """Mark the span failed for an error that is handled (e.g. shown to the user)"""
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def __enter__(self):
+        parent = _current.get()
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = _new_id(8)
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        self._perf_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._perf_start) * 1000
+        self.end_ns = self.start_ns + int(self.duration_ms * 1e6)
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        exporter = _exporter
+        if exporter is not None:
+            observe(f"{self.name}.duration_ms", self.duration_ms)
+            exporter.export_span(self)
+        return False
+
+    def to_dict(self):
+        return {
+            "type": "span",
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned by span() while tracing is disabled"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_error(self, exc):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def enabled():
+    return _exporter is not None
+
+
+def span(name, attributes=None):
+    """Start a span, or return a no-op when tracing is disabled"""
+    if _exporter is None:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def traced(name=None):
+    """Decorator that runs the function inside a span"""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Metrics:
+    """In-process counters and histograms, flushed to the exporter"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def add(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = {
+                    "count": 0, "sum": 0.0, "min": value, "max": value,
+                    "buckets": [0] * (len(HISTOGRAM_BOUNDS) + 1),
+                }
+            hist["count"] += 1
+            hist["sum"] += value
+            hist["min"] = min(hist["min"], value)
+            hist["max"] = max(hist["max"], value)
+            for i, bound in enumerate(HISTOGRAM_BOUNDS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+                    break
+            else:
+                hist["buckets"][-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "type": "metrics",
+                "time": time.time(),
+                "counters": dict(self.counters),
+                "histograms": {name: dict(hist, buckets=list(hist["buckets"]))
+                               for name, hist in self.histograms.items()},
+            }
+
+
+metrics = Metrics()
+
+
+def count(name, value=1):
+    """Increment a counter (no-op while tracing is disabled)"""
+    if _exporter is not None:
+        metrics.add(name, value)
+
+
+def observe(name, value):
+    """Record a histogram sample (no-op while tracing is disabled)"""
+    if _exporter is not None:
+        metrics.observe(name, value)
+
+
+def flush():
+    """Write the current metrics snapshot out through the exporter"""
+    if _exporter is not None:
+        _exporter.export_metrics(metrics.snapshot())
+        _exporter.flush()
+
+
+class JsonLinesExporter:
+    """Appends spans and metric snapshots to a local JSON-lines file"""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def export_span(self, span):
+        self._write(span.to_dict())
+
+    def export_metrics(self, snapshot):
+        self._write(snapshot)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OtlpExporter:
+    """
+    Sends spans and metrics to an OpenTelemetry collector as OTLP/JSON over
+    HTTP. Export runs on a background thread; failures are counted, never raised.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint.rstrip("/")
+        self.failed_exports = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="vault-telemetry", daemon=True)
+        self._worker.start()
+
+    def export_span(self, span):
+        self._queue.put(span)
+
+    def export_metrics(self, snapshot):
+        self._queue.put(snapshot)
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+
+    def _resource(self):
+        return {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})}
+
+    def _post(self, path, payload):
+        import urllib.request
+
+        request = urllib.request.Request(self.endpoint + path, data=json.dumps(payload).encode(),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except OSError:
+            self.failed_exports += 1
+
+    def _send_spans(self, spans):
+        self._post("/v1/traces", {"resourceSpans": [{
+            "resource": self._resource(),
+            "scopeSpans": [{"scope": {"name": "vault"}, "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": _otlp_attributes(s.attributes),
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            } for s in spans]}],
+        }]})
+
+    def _send_metrics(self, snapshot):
+        now = str(int(snapshot["time"] * 1e9))
+        points = [{
+            "name": name,
+            "sum": {"aggregationTemporality": 2, "isMonotonic": True,
+                    "dataPoints": [{"asDouble": value, "timeUnixNano": now}]},
+        } for name, value in snapshot["counters"].items()]
+        points += [{
+            "name": name,
+            "histogram": {"aggregationTemporality": 2, "dataPoints": [{
+                "timeUnixNano": now, "count": str(hist["count"]), "sum": hist["sum"],
+                "min": hist["min"], "max": hist["max"],
+                "bucketCounts": [str(c) for c in hist["buckets"]],
+                "explicitBounds": list(HISTOGRAM_BOUNDS),
+            }]},
+        } for name, hist in snapshot["histograms"].items()]
+        self._post("/v1/metrics", {"resourceMetrics": [{
+            "resource": self._resource(),
+            "scopeMetrics": [{"scope": {"name": "vault"}, "metrics": points}],
+        }]})
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + 1.0
+            while len(batch) < EXPORT_BATCH:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            spans = [item for item in batch if isinstance(item, Span)]
+            if spans:
+                self._send_spans(spans)
+            for item in batch:
+                if not isinstance(item, Span):
+                    self._send_metrics(item)
+            for _ in batch:
+                self._queue.task_done()
+
+
+def configure(exporter):
+    """Install an exporter (None disables tracing); returns the previous one"""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    return previous
+
+
+def configure_from_env():
+    if os.environ.get("VAULT_TRACE_FILE"):
+        configure(JsonLinesExporter(os.environ["VAULT_TRACE_FILE"]))
+    elif os.environ.get("VAULT_TRACE_ENDPOINT"):
+        configure(OtlpExporter(os.environ["VAULT_TRACE_ENDPOINT"]))
+
+
+def _shutdown():
+    if _exporter is not None:
+        flush()
+        _exporter.close()
+
+
+configure_from_env()
+atexit.register(_shutdown)
+
+
+def run_collector(port, out_path):
+    """Minimal OTLP/JSON collector stand-in: append every payload to a file"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            with lock, open(out_path, "a", encoding="utf-8") as out:
+                out.write(json.dumps({"path": self.path, "received": time.time(), "payload": payload}) + "\n")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"Collecting OTLP/JSON on http://127.0.0.1:{port} into {out_path}")
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Password vault telemetry tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    collector = sub.add_parser("collector", help="run a local stand-in OTLP collector")
+    collector.add_argument("--port", type=int, default=4318)
+    collector.add_argument("--out", default="collector.jsonl")
+    args = parser.parse_args()
+
+    if args.command == "collector":
+        run_collector(args.port, args.out)
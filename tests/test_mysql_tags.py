@@ -0,0 +1,129 @@
+"""
+vault_tags against a real MySQL server: the password_tags triggers give
+tagged and untagged entries new versions, and tag_entries does not trip
+error 1442 (a statement changing password_tags may not read passwords, which
+the triggers update).
+
+MySQL only: set VAULT_TEST_DB_NAME to a scratch database on the server of
+db_config (VAULT_DB_HOST/USER/PASSWORD). Its tables are dropped and created
+again by schema.create_schema, so never point it at a real vault.
+"""
+
+import os
+import unittest
+
+import mysql.connector
+
+import query_log
+from db_config import CONNECTION_ERRNOS, DB_HOST, DB_PASSWORD, DB_USER
+from schema import create_schema
+from vault_sync import changes_since
+from vault_tags import tag_entries, untag_entries
+
+TEST_DB_NAME = os.environ.get("VAULT_TEST_DB_NAME")
+
+_TABLES = ("password_tags", "tags", "password_changes", "passwords", "users", "schema_migrations")
+
+
+def _connect():
+    return query_log.wrap_connection(mysql.connector.connect(
+        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=TEST_DB_NAME))
+
+
+@unittest.skipUnless(TEST_DB_NAME, "set VAULT_TEST_DB_NAME to a scratch MySQL database")
+class MySQLTagsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            conn = _connect()
+        except mysql.connector.Error as e:
+            if e.errno in CONNECTION_ERRNOS:
+                raise unittest.SkipTest(f"no MySQL server: {e}")
+            raise
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+            for table in _TABLES:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+            cursor.close()
+            create_schema(conn)
+        finally:
+            conn.discard()
+
+    def setUp(self):
+        self.conn = _connect()
+        self.addCleanup(self.conn.discard)
+        cursor = self.conn.cursor()
+        self.users = []
+        for name in ("alice", "bob"):
+            cursor.execute("INSERT INTO users (email, username, master_password_hash) VALUES (%s, %s, 'x')",
+                           (f"{name}-{self._testMethodName}@example.com", f"{name}-{self._testMethodName}"))
+            self.users.append(cursor.lastrowid)
+        self.ids = []
+        for user_id, description in ((self.users[0], "a"), (self.users[0], "b"), (self.users[1], "c")):
+            cursor.execute("INSERT INTO passwords (user_id, description, encrypted_password) VALUES (%s, %s, 't')",
+                           (user_id, description))
+            self.ids.append(cursor.lastrowid)
+        cursor.close()
+        self.conn.commit()
+
+    def versions(self):
+        rows = self.conn.execute_unprepared("SELECT id, version FROM passwords WHERE id IN (%s, %s, %s)",
+                                            self.ids).fetchall()
+        return dict(rows)
+
+    def links(self):
+        return sorted(self.conn.execute_unprepared(
+            "SELECT password_id FROM password_tags WHERE password_id IN (%s, %s, %s)", self.ids).fetchall())
+
+    def test_reading_passwords_while_inserting_links_is_error_1442(self):
+        # What tag_entries avoids by reading the owned ids first
+        tag_entries(self.conn, self.users[0], [], "work")
+        (tag_id,) = self.conn.execute("SELECT id FROM tags WHERE user_id = %s", (self.users[0],)).fetchone()
+        with self.assertRaises(mysql.connector.Error) as caught:
+            self.conn.execute_unprepared("INSERT IGNORE INTO password_tags (password_id, tag_id, user_id) "
+                                         "SELECT id, %s, user_id FROM passwords WHERE user_id = %s",
+                                         (tag_id, self.users[0]))
+        self.assertEqual(caught.exception.errno, 1442)
+        self.conn.rollback()
+
+    def test_tagging_links_only_owned_entries_and_bumps_their_versions(self):
+        alice = self.users[0]
+        before = self.versions()
+        missing = max(self.ids) + 1000
+        tag_entries(self.conn, alice, [*self.ids, missing], "work")
+        self.conn.commit()
+        self.assertEqual(self.links(), [(self.ids[0],), (self.ids[1],)])
+        after = self.versions()
+        self.assertGreater(after[self.ids[0]], before[self.ids[0]])
+        self.assertGreater(after[self.ids[1]], before[self.ids[1]])
+        # Bob's entry was neither linked nor touched
+        self.assertEqual(after[self.ids[2]], before[self.ids[2]])
+
+        # Tagging again is a no-op, not a duplicate key error
+        tag_entries(self.conn, alice, self.ids[:2], "work")
+        self.conn.commit()
+        self.assertEqual(self.versions(), after)
+
+    def test_sync_brings_tag_changes_along(self):
+        alice = self.users[0]
+        since = changes_since(self.conn, alice).version
+        tag_entries(self.conn, alice, self.ids[:1], "work")
+        self.conn.commit()
+        changes = changes_since(self.conn, alice, since)
+        # Entries written within the settle window come along again; only the tagged one has tags
+        self.assertIn(self.ids[0], [row[0] for row in changes.upserts])
+        self.assertEqual(changes.tags, {self.ids[0]: frozenset({"work"})})
+
+        since = changes.version
+        untag_entries(self.conn, alice, self.ids[:1], "work")
+        self.conn.commit()
+        changes = changes_since(self.conn, alice, since)
+        self.assertIn(self.ids[0], [row[0] for row in changes.upserts])
+        self.assertEqual(changes.tags, {})
+        self.assertEqual(self.links(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Memory scan of a whole dashboard session: a password revealed, hidden and
+logged out of must leave no plaintext behind in the process. Like the
+secret_buffer self test, the password is invented by a child process so the
+only copies here are the ones the vault makes. Linux only (/proc/self/mem);
+run with python -m unittest from the repository root.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from cryptography.fernet import Fernet
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+from secret_buffer import SecretBuffer, _buffer_address, _scan_process_memory
+
+PASSWORD_LENGTH = 32
+
+
+def _child_secret(key):
+    """A fresh password read straight into a SecretBuffer, and its token"""
+    child = subprocess.Popen(
+        [sys.executable, "-c",
+         "import os, sys, secrets\n"
+         "from cryptography.fernet import Fernet\n"
+         "pw = secrets.token_hex(16).encode()\n"
+         "token = Fernet(os.environ['VAULT_TEST_KEY'].encode()).encrypt(pw)\n"
+         "sys.stdout.buffer.write(pw + token)\n"],
+        stdout=subprocess.PIPE, env=dict(os.environ, VAULT_TEST_KEY=key.decode())
+    )
+    expected = SecretBuffer(PASSWORD_LENGTH)
+    fd = child.stdout.fileno()
+    got = 0
+    while got < PASSWORD_LENGTH:
+        got += os.readv(fd, [memoryview(expected.buffer)[got:]])
+    expected.set_length(PASSWORD_LENGTH)
+    token = child.communicate()[0].decode()
+    return expected, token
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "scans /proc/self/mem")
+class SecretMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_reveal_hide_logout_leaves_no_plaintext(self):
+        from dashboard import Dashboard
+        from offline_cache import FlushResult, VaultCache
+        from session_manager import Session
+
+        key = Fernet.generate_key()
+        expected, token = _child_secret(key)
+        # The form Qt keeps label text in
+        expected_utf16 = SecretBuffer(2 * PASSWORD_LENGTH)
+        expected_utf16.buffer[::2] = expected.view()
+        expected_utf16.set_length(2 * PASSWORD_LENGTH)
+        self.addCleanup(expected.wipe)
+        self.addCleanup(expected_utf16.wipe)
+
+        cache = VaultCache(1, directory=self.directory.name)
+        cache.rows = [(1, "entry", token)]
+        # As if the login had fetched it, so nothing is read from a server
+        prefetched = Future()
+        prefetched.set_result(FlushResult())
+        # The cipher is the session's; logging out wipes its key
+        session = Session(1, b"unused", fernet=Fernet(key))
+        window = Dashboard(1, session, cache=cache, prefetched=prefetched)
+        with mock.patch.object(window.writes, "sync"):
+            card = window.card_pool.widgets[0]
+            window.toggle_card_password(card.password_label, card.toggle_btn, card.entry)
+            self.app.processEvents()
+            # Not compared as text: that would leave copies of its own
+            self.assertEqual(card.toggle_btn.text(), "Hide")
+            window.toggle_card_password(card.password_label, card.toggle_btn, card.entry)
+            with mock.patch.object(QMessageBox, "question", return_value=QMessageBox.Yes):
+                window.handle_logout()
+            self.app.processEvents()
+        window.login_window.close()
+
+        skip = [(_buffer_address(b.buffer), _buffer_address(b.buffer) + len(b.buffer))
+                for b in (expected, expected_utf16)]
+        for needle in (expected, expected_utf16):
+            with needle.view() as view:
+                leftovers = _scan_process_memory(view, skip)
+            self.assertEqual(leftovers, [], "plaintext still in memory")
+
+
+if __name__ == "__main__":
+    unittest.main()
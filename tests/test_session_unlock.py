@@ -0,0 +1,73 @@
+"""Session.unlock: checked off the GUI thread, with the password stripped as at login"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import bcrypt
+from cryptography.fernet import Fernet
+from PyQt5.QtWidgets import QApplication
+
+from session_manager import Session
+
+PASSWORD = "Secret#Password1"
+
+
+class SessionUnlockTest(unittest.TestCase):
+    def setUp(self):
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        # Unlocking reloads the key from secret.key in the working directory
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        with open("secret.key", "wb") as f:
+            f.write(Fernet.generate_key())
+        password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=4))
+        self.session = Session(1, password_hash)
+        self.addCleanup(self.session.end)
+        self.outcomes = []
+        self.session.unlocked.connect(lambda: self.outcomes.append("unlocked"))
+        self.session.unlock_failed.connect(lambda error: self.outcomes.append(error or "invalid"))
+        self.session.lock()
+
+    def wait(self):
+        deadline = time.monotonic() + 10
+        while not self.outcomes and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+        return self.outcomes
+
+    def test_unlock_returns_before_the_check(self):
+        self.session.unlock(PASSWORD)
+        # Still locked on return: bcrypt runs on the auth worker
+        self.assertTrue(self.session.is_locked)
+        self.assertTrue(self.session.is_unlocking)
+        self.assertEqual(self.wait(), ["unlocked"])
+        self.assertFalse(self.session.is_locked)
+
+    def test_password_is_stripped_like_at_login(self):
+        self.session.unlock(f"  {PASSWORD}\t")
+        self.assertEqual(self.wait(), ["unlocked"])
+
+    def test_wrong_password_stays_locked(self):
+        self.session.unlock(PASSWORD + "x")
+        self.assertEqual(self.wait(), ["invalid"])
+        self.assertTrue(self.session.is_locked)
+        self.assertFalse(self.session.is_unlocking)
+
+    def test_check_finishing_after_end_is_ignored(self):
+        self.session.unlock(PASSWORD)
+        self.session.end()
+        time.sleep(0.5)
+        self.app.processEvents()
+        self.assertEqual(self.outcomes, [])
+        self.assertTrue(self.session.is_locked)
+
+
+if __name__ == "__main__":
+    unittest.main()
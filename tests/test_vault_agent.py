@@ -0,0 +1,90 @@
+"""vault_agent's socket: a live agent is never displaced, a stale socket is replaced"""
+
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from cryptography.fernet import Fernet
+
+from vault_agent import AgentError, VaultAgent, request
+
+
+class _Running:
+    """An agent serving path on a thread of its own"""
+
+    def __init__(self, path):
+        self.agent = VaultAgent(1, Fernet(Fernet.generate_key()))
+        self.error = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, args=(path,), daemon=True)
+        self.thread.start()
+
+    def _run(self, path):
+        try:
+            self.loop.run_until_complete(self.agent.serve(path))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.agent.lock)
+        self.thread.join(5)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix domain sockets")
+class AgentSocketTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "agent.sock")
+
+    def start(self):
+        running = _Running(self.path)
+        self.addCleanup(running.stop)
+        deadline = time.monotonic() + 5
+        while running.thread.is_alive() and time.monotonic() < deadline:
+            try:
+                request({"op": "ping"}, self.path)
+                break
+            except OSError:
+                time.sleep(0.01)
+        return running
+
+    def test_second_agent_refuses_a_live_socket(self):
+        first = self.start()
+        self.assertEqual(request({"op": "ping"}, self.path)["ok"], True)
+
+        second = _Running(self.path)
+        second.thread.join(5)
+        self.assertIsInstance(second.error, AgentError)
+        # The first one is still reachable at the same path
+        self.assertEqual(request({"op": "ping"}, self.path)["ok"], True)
+
+        first.stop()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_stale_socket_is_replaced(self):
+        # Bound but never listened on: what an agent that died leaves behind
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(self.path)
+        running = self.start()
+        self.assertIsNone(running.error)
+        self.assertEqual(request({"op": "ping"}, self.path)["ok"], True)
+
+    def test_exit_leaves_a_socket_that_is_not_its_own(self):
+        running = self.start()
+        os.unlink(self.path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(self.path)
+        running.stop()
+        self.assertTrue(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Keyset paging of vault_sort.page, against a connection that records its statements"""
+
+import unittest
+
+from vault_sort import page
+
+
+class _Rows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Connection:
+    """Answers every statement with the given rows, like LoggedConnection.execute"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, list(params)))
+        return _Rows(self.rows)
+
+
+class PageTest(unittest.TestCase):
+    def test_limit_below_one_is_rejected_before_querying(self):
+        for limit in (0, -1):
+            conn = _Connection()
+            with self.subTest(limit=limit), self.assertRaisesRegex(ValueError, "at least 1"):
+                page(conn, 1, limit=limit)
+            self.assertEqual(conn.statements, [])
+
+    def test_full_page_has_a_cursor_and_short_page_has_none(self):
+        conn = _Connection([(1, "a", 1), (2, "b", 2)])
+        rows, after = page(conn, 1, limit=2)
+        self.assertEqual(rows, [(1, "a"), (2, "b")])
+        self.assertIsNotNone(after)
+        self.assertEqual(page(conn, 1, limit=3)[1], None)
+
+    def test_no_limit_reads_everything(self):
+        conn = _Connection([(1, "a", 1)])
+        rows, after = page(conn, 1, limit=None)
+        self.assertEqual((rows, after), ([(1, "a")], None))
+        self.assertNotIn("LIMIT", conn.statements[0][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,606 @@
+"""
+Application theme
+
+Every window shares one stylesheet, set on the QApplication the first time a
+window asks for it (apply_theme), instead of each window embedding its own
+copy and having it parsed again on every construction. Where the windows
+style the same object name differently, the rule is scoped by window class
+("Dashboard #primaryButton"), so each window looks as it did with its own
+sheet. Dialogs therefore stay top-level (no parent window): a dialog inside
+another window would match that window's scoped rules too.
+"""
+
+from PyQt5.QtWidgets import QApplication
+
+STYLESHEET = """
+    /* Shared */
+    QWidget {
+        background-color: #ffffff;
+        color: #2c3e50;
+        font-family: 'Segoe UI', Arial, sans-serif;
+    }
+
+    #headerFrame {
+        background-color: #00cec9;
+        border: none;
+    }
+
+    #formTitle {
+        font-size: 22px;
+        font-weight: 600;
+        color: #000000;
+        margin-bottom: 10px;
+    }
+
+    #inputContainer:hover {
+        border-color: #00cec9;
+    }
+
+    #modernInput {
+        background-color: transparent;
+        border: none;
+        font-size: 16px;
+        color: #2c3e50;
+        padding: 8px 5px;
+        outline: none;
+        min-height: 21px;
+    }
+
+    #modernInput::placeholder {
+        color: #adb5bd;
+    }
+
+    #primaryButton:hover {
+        background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+            stop: 0 #1dd1cc, stop: 1 #00d2a4);
+    }
+
+    QMessageBox {
+        background-color: #ffffff;
+        color: #2c3e50;
+    }
+
+    QMessageBox QPushButton {
+        background-color: #00cec9;
+        border: none;
+        border-radius: 4px;
+        padding: 8px 16px;
+        color: #ffffff;
+        font-weight: 500;
+        min-width: 80px;
+    }
+
+    QMessageBox QPushButton:hover {
+        background-color: #1dd1cc;
+    }
+
+    /* App title header */
+    LoginRegisterWindow #titleLabel, RegisterWindow #titleLabel, ForgotPasswordWindow #titleLabel, Dashboard #titleLabel {
+        font-size: 28px;
+        font-weight: bold;
+        color: #000000;
+        margin-bottom: 2px;
+    }
+
+    LoginRegisterWindow #subtitleLabel, RegisterWindow #subtitleLabel, ForgotPasswordWindow #subtitleLabel, Dashboard #subtitleLabel {
+        font-size: 14px;
+        color: #00cec9;
+        font-weight: 500;
+    }
+
+    /* Sign-in, registration and password reset forms */
+    LoginRegisterWindow #contentFrame, RegisterWindow #contentFrame, ForgotPasswordWindow #contentFrame {
+        background-color: #ffffff;
+        border-top-left-radius: 0px;
+        border-top-right-radius: 0px;
+    }
+
+    LoginRegisterWindow #inputContainer, RegisterWindow #inputContainer, ForgotPasswordWindow #inputContainer {
+        background-color: #f8f9fa;
+        border-radius: 12px;
+        border: 2px solid #e9ecef;
+    }
+
+    LoginRegisterWindow #inputLabel, RegisterWindow #inputLabel, ForgotPasswordWindow #inputLabel {
+        font-size: 12px;
+        font-weight: 600;
+        color: #000000;
+        text-transform: uppercase;
+        letter-spacing: 0.5px;
+    }
+
+    LoginRegisterWindow #modernInput:focus, RegisterWindow #modernInput:focus, ForgotPasswordWindow #modernInput:focus {
+        color: #2c3e50;
+    }
+
+    LoginRegisterWindow #toggleButton, RegisterWindow #toggleButton, ForgotPasswordWindow #toggleButton {
+        background-color: #e9ecef;
+        border: none;
+        border-radius: 6px;
+        padding: 8px 12px;
+        font-size: 14px;
+        color: #000000;
+        min-width: 40px;
+    }
+
+    LoginRegisterWindow #primaryButton, RegisterWindow #primaryButton, ForgotPasswordWindow #primaryButton {
+        background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+            stop: 0 #00cec9, stop: 1 #00b894);
+        border: none;
+        border-radius: 8px;
+        padding: 12px 15px;
+        font-size: 16px;
+        font-weight: 600;
+        color: #ffffff;
+        margin-top: 10px;
+        min-height: 21px;
+    }
+
+    LoginRegisterWindow #primaryButton:pressed, RegisterWindow #primaryButton:pressed, ForgotPasswordWindow #primaryButton:pressed {
+        background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+            stop: 0 #00a085, stop: 1 #009688);
+    }
+
+    LoginRegisterWindow #textButton, RegisterWindow #textButton, ForgotPasswordWindow #textButton {
+        background-color: transparent;
+        border: none;
+        padding: 10px;
+        font-size: 14px;
+        color: #000000;
+        text-decoration: underline;
+    }
+
+    LoginRegisterWindow #textButton:hover, RegisterWindow #textButton:hover, ForgotPasswordWindow #textButton:hover {
+        color: #00cec9;
+    }
+
+    /* Secondary buttons on the sign-in and password reset forms */
+    LoginRegisterWindow #secondaryButton, ForgotPasswordWindow #secondaryButton {
+        background-color: transparent;
+        border: 2px solid #00cec9;
+        border-radius: 8px;
+        padding: 10px 15px;
+        font-size: 16px;
+        font-weight: 500;
+        color: #00cec9;
+        min-height: 21px;
+    }
+
+    LoginRegisterWindow #secondaryButton:hover, ForgotPasswordWindow #secondaryButton:hover {
+        background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+            stop: 0 #00cec9, stop: 1 #00b894);
+        color: #ffffff;
+    }
+
+    /* Choosing a master password */
+    RegisterWindow #toggleButton:hover, ForgotPasswordWindow #toggleButton:hover {
+        color: #00cec9;
+    }
+
+    #strengthLabel {
+        margin: 5px 0;
+        padding: 5px;
+        border-radius: 4px;
+        background-color: #f8f9fa;
+    }
+
+    #validationText {
+        border: 1px solid #dee2e6;
+        border-radius: 8px;
+        padding: 10px;
+        font-size: 12px;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        line-height: 1.4;
+        background-color: #f8f9fa;
+        color: #495057;
+    }
+
+    RegisterWindow #primaryButton:disabled, ForgotPasswordWindow #primaryButton:disabled {
+        background-color: #dee2e6;
+        color: #6c757d;
+    }
+
+    /* Dashboard and update dialog */
+    UpdatePasswordWindow #inputContainer, Dashboard #inputContainer {
+        background-color: #ffffff;
+        border-radius: 12px;
+        border: 2px solid #dee2e6;
+    }
+
+    UpdatePasswordWindow #inputLabel, Dashboard #inputLabel {
+        font-size: 12px;
+        font-weight: 600;
+        color: #2c3e50;
+        text-transform: uppercase;
+        letter-spacing: 0.5px;
+        margin-bottom: 5px;
+        background-color: transparent;
+    }
+
+    UpdatePasswordWindow #toggleButton, Dashboard #toggleButton {
+        background-color: #e9ecef;
+        border: none;
+        border-radius: 6px;
+        padding: 6px 12px;
+        font-size: 12px;
+        font-weight: 500;
+        color: #000000;
+        min-width: 50px;
+    }
+
+    UpdatePasswordWindow #toggleButton:hover, Dashboard #toggleButton:hover {
+        background-color: #00cec9;
+        color: #ffffff;
+    }
+
+    UpdatePasswordWindow #secondaryButton, Dashboard #secondaryButton {
+        background-color: transparent;
+        border: 2px solid #00cec9;
+        border-radius: 8px;
+        padding: 10px 20px;
+        font-size: 14px;
+        font-weight: 500;
+        color: #00cec9;
+        min-width: 100px;
+    }
+
+    UpdatePasswordWindow #secondaryButton:hover, Dashboard #secondaryButton:hover {
+        background-color: #00cec9;
+        color: #ffffff;
+    }
+
+    /* Sign-in window */
+    LoginRegisterWindow #toggleButton:hover {
+        background-color: #00cec9;
+    }
+
+    /* Password reset */
+    ForgotPasswordWindow #inputContainer:disabled {
+        background-color: #e9ecef;
+        border-color: #dee2e6;
+    }
+
+    ForgotPasswordWindow #modernInput:disabled {
+        color: #6c757d;
+    }
+
+    #checkmarkLabel {
+        font-size: 16px;
+        color: #00b894;
+        font-weight: bold;
+        background-color: transparent;
+    }
+
+    /* Update dialog */
+    UpdatePasswordWindow #titleLabel {
+        font-size: 24px;
+        font-weight: bold;
+        color: #000000;
+        margin-bottom: 2px;
+        background-color: #ffffff;
+        padding: 5px;
+        border-radius: 4px;
+    }
+
+    UpdatePasswordWindow #subtitleLabel {
+        font-size: 14px;
+        color: #00cec9;
+        font-weight: 500;
+        background-color: #ffffff;
+        padding: 5px;
+        border-radius: 4px;
+    }
+
+    UpdatePasswordWindow #contentFrame {
+        background-color: #f8f9fa;
+    }
+
+    UpdatePasswordWindow #primaryButton {
+        background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+            stop: 0 #00cec9, stop: 1 #00b894);
+        border: none;
+        border-radius: 8px;
+        padding: 12px 24px;
+        font-size: 16px;
+        font-weight: 600;
+        color: #ffffff;
+        min-width: 140px;
+    }
+
+    #readOnlyContainer {
+        background-color: #e9ecef;
+        border-radius: 12px;
+        border: 2px solid #dee2e6;
+    }
+
+    #readOnlyInput {
+        background-color: transparent;
+        border: none;
+        font-size: 16px;
+        color: #495057;
+        padding: 8px 5px;
+        outline: none;
+        min-height: 21px;
+        font-weight: 500;
+    }
+
+    /* Dashboard */
+    Dashboard #primaryButton {
+        background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+            stop: 0 #00cec9, stop: 1 #00b894);
+        border: none;
+        border-radius: 8px;
+        padding: 12px 24px;
+        font-size: 16px;
+        font-weight: 600;
+        color: #ffffff;
+        min-width: 120px;
+    }
+
+    Dashboard #textButton {
+        background-color: transparent;
+        border: none;
+        padding: 8px 16px;
+        font-size: 14px;
+        color: #6c757d;
+        text-decoration: none;
+    }
+
+    Dashboard #textButton:hover {
+        color: #00cec9;
+        text-decoration: none;
+    }
+
+    #logoutButton {
+        background-color: rgba(255, 255, 255, 0.2);
+        border: 1px solid rgba(255, 255, 255, 0.3);
+        border-radius: 6px;
+        padding: 6px 12px;
+        font-size: 12px;
+        font-weight: 500;
+        color: #ffffff;
+        min-width: 70px;
+    }
+
+    #logoutButton:hover {
+        background-color: rgba(255, 255, 255, 0.3);
+        border-color: rgba(255, 255, 255, 0.5);
+    }
+
+    #logoutButton:disabled {
+        background-color: rgba(255, 255, 255, 0.1);
+        border-color: rgba(255, 255, 255, 0.2);
+        color: rgba(255, 255, 255, 0.5);
+    }
+
+    #navFrame {
+        background-color: #f8f9fa;
+        border-bottom: 1px solid #e9ecef;
+    }
+
+    #tabButton {
+        background-color: #f8f9fa;
+        border: none;
+        border-bottom: 4px solid #dee2e6;
+        padding: 16px 20px;
+        font-size: 15px;
+        font-weight: 600;
+        color: #6c757d;
+        text-align: center;
+    }
+
+    #tabButton:hover {
+        background-color: #e9ecef;
+        color: #000000;
+        border-bottom: 4px solid #adb5bd;
+    }
+
+    #tabButtonActive {
+        background-color: #ffffff;
+        border: none;
+        border-bottom: 4px solid #000000;
+        padding: 16px 20px;
+        font-size: 15px;
+        font-weight: 600;
+        color: #000000;
+        text-align: center;
+    }
+
+    #pageFrame {
+        background-color: #ffffff;
+    }
+
+    #pageTitle {
+        font-size: 24px;
+        font-weight: 600;
+        color: #000000;
+        margin-bottom: 5px;
+    }
+
+    #statsLabel {
+        font-size: 14px;
+        color: #000000;
+        font-weight: 500;
+    }
+
+    #sortBox {
+        border: 2px solid #e9ecef;
+        border-radius: 8px;
+        background-color: #f8f9fa;
+        font-size: 14px;
+        color: #000000;
+        padding: 4px 10px;
+        min-width: 130px;
+    }
+
+    #quickLabel {
+        font-size: 14px;
+        font-weight: 600;
+        color: #000000;
+    }
+
+    #quickButton {
+        background-color: #f8f9fa;
+        border: 2px solid #e9ecef;
+        border-radius: 14px;
+        padding: 5px 12px;
+        font-size: 13px;
+        color: #000000;
+    }
+
+    #quickButton:hover {
+        border-color: #00cec9;
+        color: #00cec9;
+    }
+
+    #tagSidebar {
+        border: 2px solid #e9ecef;
+        border-radius: 12px;
+        background-color: #f8f9fa;
+        font-size: 14px;
+        color: #000000;
+        padding: 5px;
+    }
+
+    #tagSidebar::item {
+        padding: 8px 10px;
+        border-radius: 6px;
+    }
+
+    #tagSidebar::item:selected {
+        background-color: #00cec9;
+        color: #ffffff;
+    }
+
+    #scrollArea {
+        border: none;
+        background-color: transparent;
+    }
+
+    #scrollArea QScrollBar:vertical {
+        background-color: #f8f9fa;
+        width: 8px;
+        border-radius: 4px;
+    }
+
+    #scrollArea QScrollBar::handle:vertical {
+        background-color: #00cec9;
+        border-radius: 4px;
+        min-height: 30px;
+    }
+
+    #scrollArea QScrollBar::handle:vertical:hover {
+        background-color: #1dd1cc;
+    }
+
+    #passwordCard {
+        background-color: #ffffff;
+        border: 2px solid #e9ecef;
+        border-radius: 12px;
+        margin-bottom: 5px;
+    }
+
+    #passwordCard:hover {
+        border-color: #00cec9;
+    }
+
+    #passwordCard[selected="true"] {
+        border-color: #00cec9;
+        background-color: #f0fdfc;
+    }
+
+    #cardDescription {
+        font-size: 16px;
+        font-weight: 600;
+        color: #000000;
+    }
+
+    #cardId {
+        font-size: 12px;
+        font-weight: 500;
+        color: #000000;
+        background-color: #f8f9fa;
+        padding: 4px 8px;
+        border-radius: 12px;
+    }
+
+    #cardPassword {
+        font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
+        font-size: 16px;
+        font-weight: bold;
+        color: #000000;
+        background-color: #ffffff;
+        padding: 12px 16px;
+        border-radius: 8px;
+        border: 1px solid #e9ecef;
+        letter-spacing: 1px;
+    }
+
+    #emptyState {
+        font-size: 16px;
+        color: #6c757d;
+        margin: 60px 0;
+        line-height: 1.6;
+    }
+
+    #formContainer {
+        background-color: #e9ecef;
+        border-radius: 16px;
+        border: 1px solid #dee2e6;
+        max-width: 500px;
+    }
+
+    Dashboard #secondaryButton:disabled {
+        border-color: #dee2e6;
+        color: #6c757d;
+        background-color: transparent;
+    }
+
+    #dangerButton {
+        background-color: #495057;
+        border: none;
+        border-radius: 8px;
+        padding: 10px 20px;
+        font-size: 14px;
+        font-weight: 500;
+        color: #ffffff;
+        min-width: 100px;
+    }
+
+    #dangerButton:hover {
+        background-color: #343a40;
+    }
+
+    #dangerButton:disabled {
+        background-color: #6c757d;
+    }
+
+    Dashboard #textButton:disabled {
+        color: #adb5bd;
+        text-decoration: none;
+    }
+
+    #actionFrame {
+        border-top: 1px solid #e9ecef;
+        padding-top: 15px;
+    }
+"""
+
+_themed_app = None
+
+
+def apply_theme():
+    """Set the stylesheet on the running QApplication; later calls do nothing"""
+    global _themed_app
+    app = QApplication.instance()
+    if app is not _themed_app:
+        app.setStyleSheet(STYLESHEET)
+        _themed_app = app
+
+
+def repolish(*widgets):
+    """Restyle widgets whose object name or a styled property changed"""
+    for widget in widgets:
+        style = widget.style()
+        style.unpolish(widget)
+        style.polish(widget)
@@ -1,29 +1,47 @@
-import bcrypt
 from PyQt5.QtWidgets import (
     QDialog, QLabel, QLineEdit, QPushButton, QVBoxLayout,
     QHBoxLayout, QMessageBox, QToolButton, QFrame
 )
 from PyQt5.QtCore import Qt
-from encryption import get_fernet
+from encryption import get_fernet, decrypt_secret
 from db_config import get_connection
+from theme import apply_theme
 
 
 class UpdatePasswordWindow(QDialog):
-    def __init__(self, user_id, password_id, description, encrypted_password, refresh_callback):
+    def __init__(self, user_id, password_id, description, encrypted_password, refresh_callback, fernet=None,
+                 write_queue=None):
         super().__init__()
+        apply_theme()
         self.setModal(True)
 
         self.user_id = user_id
-        self.password_id = password_id
-        self.description = description
-        self.encrypted_password = encrypted_password
         self.refresh_callback = refresh_callback
+        # The dashboard's write queue; without one the change is written directly
+        self.write_queue = write_queue
 
         self.setWindowTitle("Update Password")
         self.setFixedSize(500, 790)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowMaximizeButtonHint)
         self.setup_ui()
-        self.apply_styles()
+        self.load(password_id, description, encrypted_password, fernet)
+
+    def load(self, password_id, description, encrypted_password, fernet=None):
+        """Show the dialog for an entry; the dashboard reuses one dialog for every edit"""
+        self.password_id = password_id
+        self.description = description
+        self.encrypted_password = encrypted_password
+        self.fernet = fernet or get_fernet()
+        self.desc_input.setText(description)
+        # Kept in a wipeable buffer; only put into the field while shown
+        self.old_secret = decrypt_secret(encrypted_password, self.fernet)
+        self.old_pw_input.setText("••••••••")
+        self.old_pw_input.setEchoMode(QLineEdit.Password)
+        self.old_pw_toggle.setText("Show")
+        for field, toggle in ((self.new_pw_input, self.new_pw_toggle), (self.confirm_input, self.confirm_toggle)):
+            field.clear()
+            field.setEchoMode(QLineEdit.Password)
+            toggle.setText("Show")
 
     def setup_ui(self):
         # Main layout
@@ -66,7 +84,6 @@ class UpdatePasswordWindow(QDialog):
         desc_inner_layout.setContentsMargins(20, 12, 20, 12)
         
         self.desc_input = QLineEdit()
-        self.desc_input.setText(self.description)
         self.desc_input.setObjectName("readOnlyInput")
         self.desc_input.setReadOnly(True)
         
@@ -83,11 +100,7 @@ class UpdatePasswordWindow(QDialog):
         current_inner_layout.setContentsMargins(20, 12, 20, 12)
         current_inner_layout.setSpacing(10)
         
-        fernet = get_fernet()
-        decrypted = fernet.decrypt(self.encrypted_password.encode()).decode()
-        
         self.old_pw_input = QLineEdit()
-        self.old_pw_input.setText(decrypted)
         self.old_pw_input.setObjectName("readOnlyInput")
         self.old_pw_input.setEchoMode(QLineEdit.Password)
         self.old_pw_input.setReadOnly(True)
@@ -181,12 +194,22 @@ class UpdatePasswordWindow(QDialog):
 
     def toggle_old_pw(self):
         if self.old_pw_input.echoMode() == QLineEdit.Password:
+            self.old_secret.show_in(self.old_pw_input.setText)
             self.old_pw_input.setEchoMode(QLineEdit.Normal)
             self.old_pw_toggle.setText("Hide")
         else:
+            self.old_pw_input.setText("••••••••")
             self.old_pw_input.setEchoMode(QLineEdit.Password)
             self.old_pw_toggle.setText("Show")
 
+    def done(self, result):
+        # Dialog is going away (accept, cancel or close): drop the old and new passwords
+        self.old_pw_input.setText("")
+        self.old_secret.wipe()
+        self.new_pw_input.clear()
+        self.confirm_input.clear()
+        super().done(result)
+
     def toggle_new_pw(self):
         if self.new_pw_input.echoMode() == QLineEdit.Password:
             self.new_pw_input.setEchoMode(QLineEdit.Normal)
@@ -217,12 +240,22 @@ class UpdatePasswordWindow(QDialog):
 
         # Password validation removed - no more restrictions!
 
+        encrypted = self.fernet.encrypt(new_pw.encode()).decode()
+        if self.write_queue is not None:
+            self.write_queue.update(self.password_id, encrypted)
+            if self.write_queue.offline:
+                message = "Password updated. The server is unreachable, so the change will be saved on the next sync."
+            else:
+                message = "Password updated successfully."
+            QMessageBox.information(self, "Success", message)
+            self.refresh_callback()
+            self.accept()
+            return
+
+        conn = None
         try:
             conn = get_connection()
-            cursor = conn.cursor()
-            fernet = get_fernet()
-            encrypted = fernet.encrypt(new_pw.encode()).decode()
-            cursor.execute(
+            conn.execute(
                 "UPDATE passwords SET encrypted_password = %s WHERE id = %s AND user_id = %s",
                 (encrypted, self.password_id, self.user_id)
             )
@@ -233,179 +266,5 @@ class UpdatePasswordWindow(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to update password:\n{str(e)}")
         finally:
-            cursor.close()
-            conn.close()
-
-    def apply_styles(self):
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #ffffff;
-                color: #2c3e50;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            
-            /* Header Section */
-            /*#headerFrame {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1,
-                    stop: 0 #f8f9fa, stop: 1 #e9ecef);
-                border: none;
-                border-bottom: 3px solid #00cec9;
-            }*/
-                           
-            #headerFrame {
-                background-color: #00cec9;
-                border: none;
-            }
-            
-            #titleLabel {
-                font-size: 24px;
-                font-weight: bold;
-                color: #000000;
-                margin-bottom: 2px;
-                background-color: #ffffff;
-                padding: 5px;
-                border-radius: 4px;
-            }
-            
-            #subtitleLabel {
-                font-size: 14px;
-                color: #00cec9; 
-                font-weight: 500;
-                background-color: #ffffff;
-                padding: 5px;
-                border-radius: 4px;
-            }
-            
-            /* Content Frame */
-            #contentFrame {
-                background-color: #f8f9fa;
-            }
-            
-            /* Input Labels */
-            #inputLabel {
-                font-size: 12px;
-                font-weight: 600;
-                color: #2c3e50;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-                margin-bottom: 5px;
-                background-color: transparent;
-            }
-            
-            /* Input Containers */
-            #inputContainer {
-                background-color: #ffffff;
-                border-radius: 12px;
-                border: 2px solid #dee2e6;
-            }
-            
-            #inputContainer:hover {
-                border-color: #00cec9;
-            }
-            
-            /* Read-only Containers */
-            #readOnlyContainer {
-                background-color: #e9ecef;
-                border-radius: 12px;
-                border: 2px solid #dee2e6;
-            }
-            
-            /* Modern Input Fields */
-            #modernInput {
-                background-color: transparent;
-                border: none;
-                font-size: 16px;
-                color: #2c3e50;
-                padding: 8px 5px;
-                outline: none;
-                min-height: 21px;
-            }
-            
-            #modernInput::placeholder {
-                color: #adb5bd;
-            }
-            
-            /* Read-only Input Fields */
-            #readOnlyInput {
-                background-color: transparent;
-                border: none;
-                font-size: 16px;
-                color: #495057;
-                padding: 8px 5px;
-                outline: none;
-                min-height: 21px;
-                font-weight: 500;
-            }
-            
-            /* Toggle Button */
-            #toggleButton {
-                background-color: #e9ecef;
-                border: none;
-                border-radius: 6px;
-                padding: 6px 12px;
-                font-size: 12px;
-                font-weight: 500;
-                color: #000000;
-                min-width: 50px;
-            }
-            
-            #toggleButton:hover {
-                background-color: #00cec9;
-                color: #ffffff;
-            }
-            
-            /* Primary Button */
-            #primaryButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #00cec9, stop: 1 #00b894);
-                border: none;
-                border-radius: 8px;
-                padding: 12px 24px;
-                font-size: 16px;
-                font-weight: 600;
-                color: #ffffff;
-                min-width: 140px;
-            }
-            
-            #primaryButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #1dd1cc, stop: 1 #00d2a4);
-            }
-            
-            /* Secondary Button */
-            #secondaryButton {
-                background-color: transparent;
-                border: 2px solid #00cec9;
-                border-radius: 8px;
-                padding: 10px 20px;
-                font-size: 14px;
-                font-weight: 500;
-                color: #00cec9;
-                min-width: 100px;
-            }
-            
-            #secondaryButton:hover {
-                background-color: #00cec9;
-                color: #ffffff;
-            }
-            
-            /* Message Boxes */
-            QMessageBox {
-                background-color: #ffffff;
-                color: #2c3e50;
-            }
-            
-            QMessageBox QPushButton {
-                background-color: #00cec9;
-                border: none;
-                border-radius: 4px;
-                padding: 8px 16px;
-                color: #ffffff;
-                font-weight: 500;
-                min-width: 80px;
-            }
-            
-            QMessageBox QPushButton:hover {
-                background-color: #1dd1cc;
-            }
-        """)
+            if conn is not None:
+                conn.close()
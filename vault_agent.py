@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Vault agent: answers credential lookups over a Unix domain socket
+
+Like ssh-agent, the agent is unlocked once with the master password and then
+serves other local tools (scripts, a browser helper) without a GUI. It keeps
+the vault's encrypted rows in memory, refreshed incrementally from the
+database in the background (vault_sync.py), so a lookup costs one Fernet decryption and no database round
+trip. Passwords are decrypted per request and never cached in plaintext.
+
+Protocol: newline-delimited JSON. Each line is a request object, or a JSON
+list of request objects answered by a list of responses. Pipelined lines that
+arrive together are answered together in one write.
+
+    {"op": "ping"}
+    {"op": "list"}                          -> {"ok": true, "entries": [{"id", "description"}]}
+    {"op": "get", "id": 12}                 -> {"ok": true, "id", "description", "password"}
+    {"op": "get", "description": "Gmail"}
+    {"op": "get", "ids": [12, 13]}          -> {"ok": true, "entries": [...]}
+    {"op": "refresh"}                       reload rows from the database
+    {"op": "stats"}                         request counts and latency percentiles
+    {"op": "lock"}                          wipe the key and shut down
+
+Errors are answered as {"ok": false, "error": "..."}.
+
+Usage:
+    python vault_agent.py start --user alice [--socket PATH]
+    python vault_agent.py get 12 | --description Gmail
+    python vault_agent.py list | stats | stop
+
+The master password comes from VAULT_MASTER_PASSWORD or a prompt, and the
+socket path from VAULT_AGENT_SOCKET. The socket is created readable by the
+owner only, and on Linux connections from other users are refused.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import time
+from collections import deque
+
+import telemetry
+
+SOCKET_PATH = os.environ.get(
+    "VAULT_AGENT_SOCKET",
+    os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"vault-agent-{os.getuid()}.sock"),
+)
+
+# Requests slower than this (in microseconds) are counted as over budget
+LATENCY_BUDGET_US = float(os.environ.get("VAULT_AGENT_BUDGET_US", "300"))
+
+# Rows are reloaded from the database this often (seconds)
+REFRESH_INTERVAL = 60
+
+# Bytes read from a client at once; every complete request in it is answered together
+READ_CHUNK = 64 * 1024
+
+# Number of recent latencies kept for percentile reporting
+LATENCY_WINDOW = 4096
+
+
+class AgentError(Exception):
+    """A request the agent cannot answer; reported to the client"""
+
+
+class VaultAgent:
+    def __init__(self, user_id, fernet, budget_us=LATENCY_BUDGET_US):
+        self.user_id = user_id
+        self.fernet = fernet
+        self.budget_us = budget_us
+        self.entries = {}
+        self.by_description = {}
+        self.requests = 0
+        self.over_budget = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.loaded_at = None
+        # Sync version of the index; refreshes fetch only what changed since
+        self.version = 0
+        self._server = None
+        self._refreshing = None
+
+    def set_rows(self, rows):
+        """Replace the in-memory index with (id, description, token) rows"""
+        entries = {}
+        by_description = {}
+        for row_id, description, token in rows:
+            entries[row_id] = (description, token)
+            by_description.setdefault(description.lower(), row_id)
+        # Swapped in whole, so requests never see a half-built index
+        self.entries, self.by_description = entries, by_description
+        self.loaded_at = time.time()
+
+    def fetch_changes(self):
+        from db_config import get_connection
+        from vault_sync import changes_since
+
+        conn = get_connection()
+        try:
+            return changes_since(conn, self.user_id, self.version)
+        finally:
+            conn.close()
+
+    def apply_changes(self, changes):
+        """Apply a vault_sync.ChangeSet to the index"""
+        if changes.full:
+            self.set_rows(changes.upserts)
+        elif changes:
+            entries = dict(self.entries)
+            by_description = dict(self.by_description)
+            for row_id in changes.deletes:
+                old = entries.pop(row_id, None)
+                if old and by_description.get(old[0].lower()) == row_id:
+                    del by_description[old[0].lower()]
+            for row_id, description, token in changes.upserts:
+                old = entries.get(row_id)
+                if old and old[0] != description and by_description.get(old[0].lower()) == row_id:
+                    del by_description[old[0].lower()]
+                entries[row_id] = (description, token)
+                by_description.setdefault(description.lower(), row_id)
+            self.entries, self.by_description = entries, by_description
+            self.loaded_at = time.time()
+        self.version = changes.version
+
+    async def refresh(self):
+        """Fetch changes on a worker thread so lookups keep being served meanwhile"""
+        changes = await asyncio.get_running_loop().run_in_executor(None, self.fetch_changes)
+        self.apply_changes(changes)
+
+    def _schedule_refresh(self):
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self.refresh())
+
+    async def _refresh_periodically(self):
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving the rows we have; the database may be back next time
+                print(json.dumps({"refresh_error": str(e)}), file=sys.stderr)
+
+    # Request handling
+
+    def _entry(self, row_id):
+        if self.fernet is None:
+            raise AgentError("agent is locked")
+        try:
+            description, token = self.entries[row_id]
+        except KeyError:
+            raise AgentError(f"no entry with id {row_id}")
+        password = self.fernet.decrypt(token.encode()).decode()
+        return {"id": row_id, "description": description, "password": password}
+
+    def handle(self, request):
+        """Answer one request object"""
+        if not isinstance(request, dict):
+            raise AgentError("request must be an object")
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op == "list":
+            return {"ok": True, "entries": [{"id": row_id, "description": description}
+                                            for row_id, (description, _) in self.entries.items()]}
+        if op == "get":
+            if "ids" in request:
+                return {"ok": True, "entries": [self._entry(row_id) for row_id in request["ids"]]}
+            if "description" in request:
+                row_id = self.by_description.get(str(request["description"]).lower())
+                if row_id is None:
+                    raise AgentError(f"no entry named {request['description']!r}")
+            else:
+                row_id = request.get("id")
+            return dict(self._entry(row_id), ok=True)
+        if op == "refresh":
+            self._schedule_refresh()
+            return {"ok": True, "entries": len(self.entries)}
+        if op == "stats":
+            return dict(self.stats(), ok=True)
+        if op == "lock":
+            self.lock()
+            return {"ok": True}
+        raise AgentError(f"unknown op {op!r}")
+
+    def respond(self, line):
+        """Answer one protocol line (a request or a list of them) with a JSON line"""
+        start = time.perf_counter()
+        try:
+            payload = json.loads(line)
+            if isinstance(payload, list):
+                response = [self._respond_one(request) for request in payload]
+            else:
+                response = self._respond_one(payload)
+        except ValueError:
+            self.errors += 1
+            response = {"ok": False, "error": "invalid JSON"}
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        self.requests += 1
+        self.latencies.append(elapsed_us)
+        if elapsed_us > self.budget_us:
+            self.over_budget += 1
+        telemetry.observe("agent.request_ms", elapsed_us / 1000)
+        return json.dumps(response).encode() + b"\n"
+
+    def _respond_one(self, request):
+        try:
+            return self.handle(request)
+        except AgentError as e:
+            self.errors += 1
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            self.errors += 1
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0.0
+
+        return {
+            "entries": len(self.entries),
+            "loaded_at": self.loaded_at,
+            "requests": self.requests,
+            "errors": self.errors,
+            "over_budget": self.over_budget,
+            "budget_us": self.budget_us,
+            "latency_p50_us": round(percentile(50), 1),
+            "latency_p99_us": round(percentile(99), 1),
+        }
+
+    def lock(self):
+        """Wipe the key and stop serving"""
+        from encryption import wipe_fernet
+
+        if self.fernet is not None:
+            wipe_fernet(self.fernet)
+            self.fernet = None
+        self.entries, self.by_description = {}, {}
+        if self._server is not None:
+            self._server.close()
+
+    # Server
+
+    async def _client(self, reader, writer):
+        if not _same_user(writer.get_extra_info("socket")):
+            writer.close()
+            return
+        pending = b""
+        try:
+            while True:
+                chunk = await reader.read(READ_CHUNK)
+                if not chunk:
+                    break
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                # Everything that arrived together is answered in one write
+                writer.write(b"".join(self.respond(line) for line in lines if line.strip()))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Client went away, or the agent is shutting down
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path=SOCKET_PATH):
+        _remove_stale_socket(path)
+        old_umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._client, path=path)
+        finally:
+            os.umask(old_umask)
+        # Removed on exit only if it is still this agent's
+        inode = os.stat(path).st_ino
+        refresher = asyncio.ensure_future(self._refresh_periodically())
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            refresher.cancel()
+            try:
+                if os.stat(path).st_ino == inode:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def _remove_stale_socket(path):
+    """Delete a socket left behind by an agent that died; refuse to take over one that answers"""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1.0)
+        try:
+            sock.connect(path)
+        except ConnectionRefusedError:
+            # Nothing listens on it any more
+            os.unlink(path)
+            return
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            # A timeout means a busy agent, anything else a path we must not delete
+            raise AgentError(f"cannot use {path}: {e}") from e
+    raise AgentError(f"an agent is already running on {path}; stop it first")
+
+
+def _same_user(sock):
+    """Refuse peers running as another user (Linux only; elsewhere the 0600 socket mode applies)"""
+    if sock is None or not hasattr(socket, "SO_PEERCRED"):
+        return True
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid == os.getuid()
+
+
+def request(payload, path=SOCKET_PATH, timeout=2.0):
+    """Send one request (or a list of them) to a running agent and return the response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(READ_CHUNK)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+def start(username, path=SOCKET_PATH):
+    """Unlock with the master password, load the vault and serve until locked"""
+    import getpass
+    from cryptography.fernet import Fernet
+    from auth_service import get_auth_service
+    from encryption import load_key
+
+    if not username:
+        raise AgentError("no username: pass --user or set VAULT_USER")
+    if not os.path.exists("secret.key") or os.path.getsize("secret.key") == 0:
+        raise AgentError("secret.key not found; run from the vault's directory")
+    # Before the password prompt; serve() checks again when it binds
+    _remove_stale_socket(path)
+    password = os.environ.get("VAULT_MASTER_PASSWORD")
+    if password is None:
+        password = getpass.getpass("Master password: ")
+    result = get_auth_service().authenticate(username, password.strip())
+    if not result.ok:
+        raise AgentError("invalid username or password")
+
+    agent = VaultAgent(result.user_id, Fernet(load_key()))
+    agent.apply_changes(agent.fetch_changes())
+    print(json.dumps({"socket": path, "entries": len(agent.entries), "pid": os.getpid()}), flush=True)
+    asyncio.run(agent.serve(path))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Password vault agent")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="socket path (default: $VAULT_AGENT_SOCKET)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    start_parser = sub.add_parser("start", help="unlock and serve lookups in the foreground")
+    start_parser.add_argument("--user", default=os.environ.get("VAULT_USER"), help="vault username (default: $VAULT_USER)")
+    get = sub.add_parser("get", help="look up one entry")
+    get.add_argument("id", type=int, nargs="?")
+    get.add_argument("--description")
+    for command in ("list", "stats", "refresh", "stop"):
+        sub.add_parser(command)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "start":
+            start(args.user, args.socket)
+            return 0
+        if args.command == "get":
+            if args.description:
+                payload = {"op": "get", "description": args.description}
+            else:
+                payload = {"op": "get", "id": args.id}
+        else:
+            payload = {"op": "lock" if args.command == "stop" else args.command}
+        response = request(payload, args.socket)
+    except (AgentError, OSError) as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        return 1
+    print(json.dumps(response, indent=2))
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
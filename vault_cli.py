@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Command-line interface to the password vault
+
+Uses the same database, key file (secret.key in the working directory),
+authentication and batch crypto as the GUI, but never imports PyQt5, and
+loads bcrypt, the MySQL driver and cryptography only once a command needs
+them.
+
+Usage:
+    python vault_cli.py --user alice login
+    python vault_cli.py --user alice list [--tag work] [--sort name] [--limit 50 [--after CURSOR]]
+    python vault_cli.py --user alice get 12
+    python vault_cli.py --user alice add "Gmail" [--password-stdin]
+    python vault_cli.py --user alice update 12 [--description TEXT] [--password-stdin]
+    python vault_cli.py --user alice delete 12
+    python vault_cli.py --user alice tag work 12 13 14 [--remove]
+    python vault_cli.py --user alice import entries.json     # '-' reads stdin
+    python vault_cli.py --user alice export [out.json]
+    python vault_cli.py --user alice audit
+
+The username may also come from VAULT_USER and the master password from
+VAULT_MASTER_PASSWORD; otherwise it is prompted for. Results are printed as
+JSON on stdout. Errors are printed as {"error": ...} on stderr with exit
+status 1, or 3 when authentication fails.
+
+import and export use the same format, a JSON list of
+{"description": ..., "password": ...} objects.
+"""
+
+import argparse
+import getpass
+import json
+import os
+import sys
+
+EXIT_ERROR = 1
+EXIT_AUTH = 3
+
+
+class CliError(Exception):
+    def __init__(self, message, status=EXIT_ERROR):
+        super().__init__(message)
+        self.status = status
+
+
+def _master_password():
+    password = os.environ.get("VAULT_MASTER_PASSWORD")
+    if password is None:
+        password = getpass.getpass("Master password: ")
+    # Stripped like the windows strip it before hashing or checking
+    return password.strip()
+
+
+def _login(args):
+    """Verify the master password; returns the user id"""
+    from auth_service import AuthResult, get_auth_service
+
+    if not args.user:
+        raise CliError("no username: pass --user or set VAULT_USER")
+    result = get_auth_service().authenticate(args.user, _master_password())
+    if result.status == AuthResult.THROTTLED:
+        raise CliError(f"too many attempts, retry in {result.retry_after:.0f} s", EXIT_AUTH)
+    if not result.ok:
+        raise CliError("invalid username or password", EXIT_AUTH)
+    return result.user_id
+
+
+def _fernet():
+    # Never create a key here: a new key could not decrypt the existing vault
+    if not os.path.exists("secret.key") or os.path.getsize("secret.key") == 0:
+        raise CliError("secret.key not found; run from the vault's directory")
+    from cryptography.fernet import Fernet
+    from encryption import load_key
+    return Fernet(load_key())
+
+
+def _read_secret(args, prompt):
+    if args.password_stdin:
+        password = sys.stdin.readline().rstrip("\n")
+    else:
+        password = getpass.getpass(prompt)
+    if not password.strip():
+        raise CliError("password must not be empty")
+    return password.strip()
+
+
+class _Cursor:
+    """Connection and cursor for one command, closed on exit"""
+
+    def __init__(self, dictionary=False):
+        self.dictionary = dictionary
+
+    def __enter__(self):
+        from db_config import get_connection
+
+        self.conn = get_connection()
+        self.cursor = self.conn.cursor(dictionary=self.dictionary)
+        return self.cursor
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cursor.close()
+        if exc_type is None:
+            self.conn.commit()
+        self.conn.close()
+        return False
+
+
+def _fetch_all(user_id):
+    from db_config import get_connection
+
+    conn = get_connection()
+    try:
+        # Streamed from the server in batches rather than buffered whole
+        rows = conn.execute("SELECT id, description, encrypted_password FROM passwords WHERE user_id = %s ORDER BY id",
+                            (user_id,)).stream()
+        return [{"id": row_id, "description": description, "encrypted_password": token}
+                for row_id, description, token in rows]
+    finally:
+        conn.close()
+
+
+def cmd_login(args):
+    return {"user_id": _login(args)}
+
+
+def cmd_list(args):
+    from db_config import get_connection
+    from vault_sort import page
+
+    user_id = _login(args)
+    conn = get_connection()
+    try:
+        # Sorted and filtered by tag in the database, through their indexes
+        rows, after = page(conn, user_id, args.sort, args.after, args.limit, args.tag)
+    except ValueError as e:
+        raise CliError(str(e))
+    finally:
+        conn.close()
+    entries = [{"id": row_id, "description": description} for row_id, description in rows]
+    if args.limit is None:
+        return entries
+    # Pass "next" as --after for the following page
+    return {"entries": entries, "next": after}
+
+
+def cmd_get(args):
+    user_id = _login(args)
+    with _Cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT id, description, encrypted_password FROM passwords WHERE id = %s AND user_id = %s",
+                       (args.id, user_id))
+        row = cursor.fetchone()
+        if row is not None:
+            # Counts as a use, like a reveal in the dashboard (vault_usage.py)
+            cursor.execute("UPDATE passwords SET reveal_count = reveal_count + 1, last_used_at = NOW(6) "
+                           "WHERE id = %s", (row["id"],))
+    if row is None:
+        raise CliError(f"no entry with id {args.id}")
+    password = _fernet().decrypt(row["encrypted_password"].encode()).decode()
+    return {"id": row["id"], "description": row["description"], "password": password}
+
+
+def cmd_add(args):
+    from vault_sort import natural_key
+
+    user_id = _login(args)
+    description = args.description.strip()
+    if not description:
+        raise CliError("description must not be empty")
+    encrypted = _fernet().encrypt(_read_secret(args, "Password: ").encode()).decode()
+    with _Cursor() as cursor:
+        cursor.execute("INSERT INTO passwords (user_id, description, encrypted_password, sort_key) "
+                       "VALUES (%s, %s, %s, %s)", (user_id, description, encrypted, natural_key(description)))
+        return {"id": cursor.lastrowid, "description": description}
+
+
+def cmd_update(args):
+    from vault_sort import natural_key
+
+    user_id = _login(args)
+    description = None
+    if args.description is not None:
+        description = args.description.strip()
+        if not description:
+            raise CliError("description must not be empty")
+    encrypted = _fernet().encrypt(_read_secret(args, "New password: ").encode()).decode()
+    with _Cursor() as cursor:
+        if description:
+            cursor.execute("UPDATE passwords SET encrypted_password = %s, description = %s, sort_key = %s, "
+                           "edit_count = edit_count + 1, last_used_at = NOW(6) WHERE id = %s AND user_id = %s",
+                           (encrypted, description, natural_key(description), args.id, user_id))
+        else:
+            cursor.execute("UPDATE passwords SET encrypted_password = %s, edit_count = edit_count + 1, "
+                           "last_used_at = NOW(6) WHERE id = %s AND user_id = %s", (encrypted, args.id, user_id))
+        if cursor.rowcount == 0:
+            raise CliError(f"no entry with id {args.id}")
+    return {"id": args.id, "updated": True}
+
+
+def cmd_delete(args):
+    user_id = _login(args)
+    with _Cursor() as cursor:
+        cursor.execute("DELETE FROM passwords WHERE id = %s AND user_id = %s", (args.id, user_id))
+        if cursor.rowcount == 0:
+            raise CliError(f"no entry with id {args.id}")
+    return {"id": args.id, "deleted": True}
+
+
+def cmd_tag(args):
+    from db_config import get_connection
+    from vault_tags import check_name, tag_entries, untag_entries
+
+    user_id = _login(args)
+    try:
+        name = check_name(args.tag)
+    except ValueError as e:
+        raise CliError(str(e))
+    conn = get_connection()
+    try:
+        # One set-based statement for all the ids
+        (untag_entries if args.remove else tag_entries)(conn, user_id, args.ids, name)
+        conn.commit()
+    finally:
+        conn.close()
+    return {"tag": name, "ids": args.ids, "removed" if args.remove else "tagged": True}
+
+
+def cmd_import(args):
+    from encryption import batch_encrypt
+    from vault_sort import natural_key
+
+    try:
+        if args.file == "-":
+            entries = json.load(sys.stdin)
+        else:
+            with open(args.file, encoding="utf-8") as f:
+                entries = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CliError(f"cannot read {args.file}: {e}")
+    if not isinstance(entries, list):
+        raise CliError("import file must hold a JSON list")
+    for i, entry in enumerate(entries):
+        if not (isinstance(entry, dict) and isinstance(entry.get("description"), str)
+                and isinstance(entry.get("password"), str)
+                and entry["description"].strip() and entry["password"].strip()):
+            raise CliError(f"entry {i} needs a non-empty description and password")
+
+    user_id = _login(args)
+    # One batch encryption and one transaction for the whole file
+    tokens = batch_encrypt([entry["password"].strip() for entry in entries], _fernet())
+    with _Cursor() as cursor:
+        cursor.executemany("INSERT INTO passwords (user_id, description, encrypted_password, sort_key) "
+                           "VALUES (%s, %s, %s, %s)",
+                           [(user_id, entry["description"].strip(), token, natural_key(entry["description"].strip()))
+                            for entry, token in zip(entries, tokens)])
+    return {"imported": len(entries)}
+
+
+def cmd_export(args):
+    from encryption import batch_decrypt
+
+    user_id = _login(args)
+    rows = _fetch_all(user_id)
+    passwords = batch_decrypt([row["encrypted_password"] for row in rows], _fernet())
+    entries = [{"id": row["id"], "description": row["description"], "password": password}
+               for row, password in zip(rows, passwords)]
+    if not args.file:
+        return entries
+    # The export holds plaintext passwords, so only the owner may read it
+    fd = os.open(args.file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(fd, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    return {"exported": len(entries), "file": args.file}
+
+
+def _decrypt_each(tokens, fernet):
+    """batch_decrypt, falling back to row by row so one bad token is reported, not fatal"""
+    from cryptography.fernet import InvalidToken
+    from encryption import batch_decrypt
+
+    try:
+        return batch_decrypt(tokens, fernet)
+    except InvalidToken:
+        pass
+    results = []
+    for token in tokens:
+        try:
+            results.append(fernet.decrypt(token.encode()).decode())
+        except InvalidToken:
+            results.append(None)
+    return results
+
+
+def cmd_audit(args):
+    from password_validator import PasswordValidator
+
+    user_id = _login(args)
+    rows = _fetch_all(user_id)
+    passwords = _decrypt_each([row["encrypted_password"] for row in rows], _fernet())
+
+    by_strength = {}
+    weak = []
+    undecryptable = []
+    owners = {}
+    for row, password in zip(rows, passwords):
+        if password is None:
+            undecryptable.append(row["id"])
+            continue
+        owners.setdefault(password, []).append(row["id"])
+        _, missing, strength = PasswordValidator.validate_password(password)
+        by_strength[strength] = by_strength.get(strength, 0) + 1
+        if strength in ("Weak", "Medium"):
+            weak.append({"id": row["id"], "description": row["description"], "strength": strength,
+                         "issues": [issue.lstrip("❌ ") for issue in missing]})
+
+    return {
+        "entries": len(rows),
+        "by_strength": by_strength,
+        "weak": weak,
+        "reused": [ids for ids in owners.values() if len(ids) > 1],
+        "undecryptable": undecryptable,
+    }
+
+
+def build_parser():
+    from vault_sort import DEFAULT_SORT, SORTS
+
+    parser = argparse.ArgumentParser(description="Password vault command-line interface")
+    parser.add_argument("--user", default=os.environ.get("VAULT_USER"), help="vault username (default: $VAULT_USER)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("login", help="check the master password").set_defaults(handler=cmd_login)
+    list_ = sub.add_parser("list", help="list entries without passwords")
+    list_.add_argument("--tag", help="only entries with this tag")
+    list_.add_argument("--sort", choices=SORTS, default=DEFAULT_SORT, help="order (default: %(default)s)")
+    list_.add_argument("--limit", type=int, help="entries per page; prints the cursor of the next one")
+    list_.add_argument("--after", help="cursor of the page to print, from the previous page")
+    list_.set_defaults(handler=cmd_list)
+
+    get = sub.add_parser("get", help="show one entry with its password")
+    get.add_argument("id", type=int)
+    get.set_defaults(handler=cmd_get)
+
+    add = sub.add_parser("add", help="add an entry")
+    add.add_argument("description")
+    add.add_argument("--password-stdin", action="store_true", help="read the password from stdin")
+    add.set_defaults(handler=cmd_add)
+
+    update = sub.add_parser("update", help="change an entry's password")
+    update.add_argument("id", type=int)
+    update.add_argument("--description", help="also rename the entry")
+    update.add_argument("--password-stdin", action="store_true", help="read the password from stdin")
+    update.set_defaults(handler=cmd_update)
+
+    delete = sub.add_parser("delete", help="delete an entry")
+    delete.add_argument("id", type=int)
+    delete.set_defaults(handler=cmd_delete)
+
+    tag = sub.add_parser("tag", help="tag entries (or untag them with --remove)")
+    tag.add_argument("tag")
+    tag.add_argument("ids", type=int, nargs="+")
+    tag.add_argument("--remove", action="store_true", help="take the tag off instead")
+    tag.set_defaults(handler=cmd_tag)
+
+    import_ = sub.add_parser("import", help="add entries from a JSON file")
+    import_.add_argument("file", help="JSON file, or - for stdin")
+    import_.set_defaults(handler=cmd_import)
+
+    export = sub.add_parser("export", help="write all entries with passwords as JSON")
+    export.add_argument("file", nargs="?", help="output file (default: stdout)")
+    export.set_defaults(handler=cmd_export)
+
+    sub.add_parser("audit", help="report weak, reused and undecryptable passwords").set_defaults(handler=cmd_audit)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        result = args.handler(args)
+    except CliError as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        return e.status
+    except Exception as e:
+        print(json.dumps({"error": f"{type(e).__name__}: {e}"}), file=sys.stderr)
+        return EXIT_ERROR
+    print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Vault entries as the dashboard holds them
+
+Each row of the vault becomes one VaultEntry holding the only copy of its
+fields: the cards and the selection keep a reference to the entry rather
+than copies of its id and description, and the ciphertext and decrypted
+password live on it instead of in parallel lists. The cache and the sync
+code keep passing plain (id, description, token) tuples; EntryStore turns
+them into entries in display order with an index by id, and TagIndex
+finds the entries carrying given tags.
+"""
+
+import re
+
+
+class VaultEntry:
+    """One row: id, description, password ciphertext and its SecretBuffer once decrypted"""
+
+    __slots__ = ("id", "description", "token", "secret")
+
+    def __init__(self, id, description, token, secret=None):
+        self.id = id
+        self.description = description
+        self.token = token
+        self.secret = secret
+
+    def row(self):
+        return (self.id, self.description, self.token)
+
+    def __repr__(self):
+        # Never the secret
+        return f"VaultEntry(id={self.id!r}, description={self.description!r})"
+
+
+class EntryStore:
+    """Entries in display order, indexed by id"""
+
+    __slots__ = ("entries", "_by_id")
+
+    def __init__(self, rows=()):
+        self.entries = [VaultEntry(*row) for row in rows]
+        self._by_id = {entry.id: entry for entry in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def get(self, entry_id):
+        return self._by_id.get(entry_id)
+
+    def tokens(self):
+        return [entry.token for entry in self.entries]
+
+    def secrets(self):
+        return [entry.secret for entry in self.entries if entry.secret is not None]
+
+    def matches(self, rows, ignore_ids=False):
+        """True when rows hold the same entries in the same order"""
+        if len(rows) != len(self.entries):
+            return False
+        for entry, (row_id, description, token) in zip(self.entries, rows):
+            if entry.token != token or entry.description != description or (entry.id != row_id and not ignore_ids):
+                return False
+        return True
+
+    def remove(self, ids):
+        """Drop the entries with these ids; returns the position of the first one dropped"""
+        ids = set(ids)
+        first = next((i for i, entry in enumerate(self.entries) if entry.id in ids), len(self.entries))
+        self.entries[first:] = [entry for entry in self.entries[first:] if entry.id not in ids]
+        for entry_id in ids:
+            self._by_id.pop(entry_id, None)
+        return first
+
+    def reorder(self, rows):
+        """Put the entries in the order of rows, keeping their secrets; False if rows hold other entries"""
+        if len(rows) != len(self.entries):
+            return False
+        entries = []
+        for row_id, description, token in rows:
+            entry = self._by_id.get(row_id)
+            if entry is None or entry.token != token or entry.description != description:
+                return False
+            entries.append(entry)
+        self.entries = entries
+        return True
+
+    def merge(self, rows):
+        """
+        Take rows as the contents, keeping the entries (and decrypted passwords)
+        of the rows that did not change. Returns the new entries, which have no
+        secret yet, and the entries dropped, whose secrets are the caller's to wipe.
+        """
+        old = self.entries
+        fresh = []
+        entries = []
+        for row_id, description, token in rows:
+            entry = self._by_id.get(row_id)
+            if entry is None or entry.token != token or entry.description != description:
+                entry = VaultEntry(row_id, description, token)
+                fresh.append(entry)
+            entries.append(entry)
+        self.entries = entries
+        self._by_id = {entry.id: entry for entry in entries}
+        kept = set(map(id, entries))
+        return fresh, [entry for entry in old if id(entry) not in kept]
+
+    def renumber(self, rows):
+        """Take the ids of rows that match() apart from them, e.g. after queued adds got server ids"""
+        for entry, row in zip(self.entries, rows):
+            entry.id = row[0]
+        self._by_id = {entry.id: entry for entry in self.entries}
+
+
+class TagIndex:
+    """
+    Entries by tag, as bitmaps over their positions in an EntryStore.
+
+    Bit i of a tag's bitmap is set when entry i has the tag, so the entries
+    having several tags are one AND away and a tag's size is a popcount;
+    switching the filter never walks the tag assignments again. Positions
+    shift when entries are removed, so the index is rebuilt then.
+    """
+
+    __slots__ = ("tags", "_bitmaps")
+
+    def __init__(self, entries=(), tags=None):
+        # Entry id -> tag names, as VaultCache.current_tags() gives them
+        self.tags = tags or {}
+        positions = {}
+        for position, entry in enumerate(entries):
+            for name in self.tags.get(entry.id, ()):
+                positions.setdefault(name, []).append(position)
+        self._bitmaps = {name: _bitmap(found) for name, found in positions.items()}
+
+    def names(self):
+        return sorted(self._bitmaps, key=str.casefold)
+
+    def count(self, name):
+        return bin(self._bitmaps.get(name, 0)).count("1")
+
+    def filter(self, entries, names):
+        """The entries of an EntryStore that have every tag in names (all of them for none)"""
+        if not names:
+            return list(entries)
+        mask = -1
+        for name in names:
+            mask &= self._bitmaps.get(name, 0)
+        # Reversed binary digits: character i is bit i
+        return [entries[match.start()] for match in re.finditer("1", bin(mask)[:1:-1])]
+
+
+def _bitmap(positions):
+    bits = bytearray(positions[-1] // 8 + 1)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
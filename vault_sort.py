@@ -0,0 +1,150 @@
+"""
+Sort orders of the vault list
+
+Every order is served by an index on the server (schema.py migration 3), so
+neither the database nor the client sorts the whole vault:
+
+    name       sort_key, a folded natural key of the description kept
+               by every writer ("Account 9" before "Account 10"),
+               index (user_id, sort_key, id)
+    created    id, the primary key; oldest first
+    modified   updated_at, newest first, index (user_id, updated_at, id)
+    used       use_count, reveals plus edits (vault_usage.py), most first,
+               index (user_id, use_count, id)
+
+The dashboard keeps the whole vault locally, so it only asks the server for
+the ids in the chosen order (an index-only scan) and rearranges its rows to
+match; see VaultCache.sorted_rows. Other readers fetch keyset pages:
+
+    rows, after = page(conn, user_id, "name", limit=50)
+    more, after = page(conn, user_id, "name", after=after, limit=50)
+
+A page starts right after the last row of the previous one, found through
+the index rather than by skipping OFFSET rows, so every page costs the same.
+"""
+
+import base64
+import json
+import re
+import unicodedata
+
+SORTS = ("name", "created", "modified", "used")
+DEFAULT_SORT = "created"
+
+# Width of the sort_key column, and digits of the length put before each
+# number so numbers compare by value, whatever their length
+SORT_KEY_LENGTH = 255
+NUMBER_LENGTH_DIGITS = 3
+
+PAGE_SIZE = 100
+
+# ORDER BY of each sort, and the keyset condition for rows after (key, id)
+_ORDER = {
+    "name": "p.sort_key, p.id",
+    "created": "p.id",
+    "modified": "p.updated_at DESC, p.id DESC",
+    "used": "p.use_count DESC, p.id DESC",
+}
+_AFTER = {
+    "name": "(p.sort_key > %s OR (p.sort_key = %s AND p.id > %s))",
+    "created": "p.id > %s",
+    "modified": "(p.updated_at < %s OR (p.updated_at = %s AND p.id < %s))",
+    "used": "(p.use_count < %s OR (p.use_count = %s AND p.id < %s))",
+}
+_KEY_COLUMN = {"name": "p.sort_key", "created": None, "modified": "p.updated_at", "used": "p.use_count"}
+
+# Only the entries carrying a tag, through the (user_id, tag_id) index (vault_tags.py)
+_TAGGED = ("JOIN password_tags pt ON pt.password_id = p.id "
+           "JOIN tags t ON t.id = pt.tag_id AND t.user_id = pt.user_id ")
+
+_DIGITS = re.compile(r"\d+")
+
+
+def natural_key(description):
+    """The sort_key of a description: case- and accent-folded, with numbers compared by value"""
+    decomposed = unicodedata.normalize("NFKD", description)
+    text = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    key = _DIGITS.sub(_number_key, text)
+    return key[:SORT_KEY_LENGTH]
+
+
+def _number_key(match):
+    # Length first, then the digits: shorter numbers are smaller ("9" < "10")
+    digits = match.group().lstrip("0") or "0"
+    return f"{len(digits):0{NUMBER_LENGTH_DIGITS}d}{digits}"
+
+
+def order_sql(sort):
+    """Ids of a user's entries in the order of sort, read from its index alone"""
+    return f"SELECT p.id FROM passwords p WHERE p.user_id = %s ORDER BY {_ORDER[sort]}"
+
+
+def ordered_ids(conn, user_id, sort):
+    return [row[0] for row in conn.execute(order_sql(sort), (user_id,)).stream()]
+
+
+def arrange(rows, sort, order=None):
+    """
+    (id, description, token) rows, in id order, put in the order of sort.
+
+    order is the server's ids for sort (ordered_ids); rows it does not know,
+    such as queued adds, come last. Without one (offline, or before the first
+    sync) the rows are sorted here instead.
+    """
+    if sort == "created":
+        return list(rows)
+    if order is None:
+        if sort == "name":
+            return sorted(rows, key=lambda row: (natural_key(row[1]), row[0]))
+        if sort == "used":
+            # Usage counts are only on the server
+            return list(rows)
+        # Modification times are only on the server; newest ids first comes closest
+        return list(reversed(rows))
+    by_id = {row[0]: row for row in rows}
+    arranged = [by_id.pop(row_id) for row_id in order if row_id in by_id]
+    arranged.extend(by_id.values())
+    return arranged
+
+
+def page(conn, user_id, sort=DEFAULT_SORT, after=None, limit=PAGE_SIZE, tag=None):
+    """
+    One page of (id, description) rows in the order of sort, optionally only
+    those tagged tag; returns the rows and the cursor of the next page, or
+    None after the last page. limit=None reads everything after the cursor.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("page limit must be at least 1")
+    joins = ""
+    conditions = ["p.user_id = %s"]
+    params = [user_id]
+    if tag is not None:
+        joins = _TAGGED
+        conditions.append("t.user_id = %s AND t.name = %s")
+        params += [user_id, tag]
+    if after is not None:
+        key, row_id = _decode(after)
+        conditions.append(_AFTER[sort])
+        params += [row_id] if _KEY_COLUMN[sort] is None else [key, key, row_id]
+    sql = (f"SELECT p.id, p.description, {_KEY_COLUMN[sort] or 'p.id'} FROM passwords p {joins}"
+           f"WHERE {' AND '.join(conditions)} ORDER BY {_ORDER[sort]}")
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    rows = conn.execute(sql, params).fetchall()
+    cursor = _encode(rows[-1][2], rows[-1][0]) if limit is not None and len(rows) == limit else None
+    return [(row_id, description) for row_id, description, _ in rows], cursor
+
+
+def _encode(key, row_id):
+    # Opaque to callers; timestamps travel as MySQL's own text form
+    raw = json.dumps([str(key), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor):
+    try:
+        key, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return key, int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid page cursor") from e
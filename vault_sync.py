@@ -0,0 +1,229 @@
+"""
+Incremental sync of a user's vault using row versions
+
+Every write to passwords gets a new version from the triggers added by
+schema.py migration 1: the id of the entry it appends to password_changes.
+A client remembers the highest version it has applied and asks only for what
+changed since, so a refresh costs time proportional to the change set rather
+than the vault size:
+
+    changes = changes_since(conn, user_id, since=client_version)
+    apply changes.deletes and changes.upserts (or replace everything if changes.full)
+    client_version = changes.version
+
+A sync only reaches versions every writer is done with. Change-log ids are
+handed out when a row is written but become visible at commit, so an entry
+can appear below versions a client has already passed. The high-water mark
+therefore stays below the change-log entries of every transaction still
+open (their start time, from information_schema.INNODB_TRX, is no later than
+the entries they wrote) and a little below the present, and whatever lies
+above it is sent again on the next sync. Reading INNODB_TRX needs the
+PROCESS privilege; without it the mark trails the present by
+UNSEEN_WRITERS_SETTLE_SECONDS instead, which covers transactions up to that
+long.
+
+Old change-log entries can be pruned with prune_change_log (or
+`python vault_sync.py prune --days 30`); clients that were last synced before
+the pruned range get a full snapshot instead.
+"""
+
+import mysql.connector
+
+import telemetry
+from db_config import error_code
+from vault_tags import ALL_TAGS_SQL, CHANGED_TAGS_SQL, group_tags
+
+# Change-log entries older than this may be pruned
+CHANGE_LOG_RETENTION_DAYS = 90
+
+# Changes written less than this before the oldest open transaction started
+# (or before now) are sent again on the next sync, for statements that got
+# their change-log id after starting
+SETTLE_SECONDS = 2
+
+# How far the mark trails the present when open transactions cannot be seen
+UNSEEN_WRITERS_SETTLE_SECONDS = 60
+
+# MySQL errors meaning a migration has not been applied to this database
+_UNMIGRATED_ERRORS = {1054, 1146}  # unknown column, unknown table
+
+# Missing the PROCESS privilege for INNODB_TRX
+_ACCESS_DENIED_ERRORS = {1142, 1227}
+
+
+class ChangeSet:
+    """
+    Rows changed since a version.
+
+    upserts are (id, description, encrypted_password) tuples to insert or
+    replace and deletes are ids to drop. When full is set, upserts is the
+    complete vault and replaces whatever the client has. tags maps the ids
+    of upserted rows to their tag names; rows missing from it have none.
+    """
+
+    __slots__ = ("version", "upserts", "deletes", "full", "tags")
+
+    def __init__(self, version, upserts, deletes=(), full=False, tags=None):
+        self.version = version
+        self.upserts = upserts
+        self.deletes = list(deletes)
+        self.full = full
+        self.tags = tags or {}
+
+    def __len__(self):
+        return len(self.upserts) + len(self.deletes)
+
+
+_OLDEST_SQL = "SELECT MIN(id) FROM password_changes"
+# Start of the oldest transaction that has written anything, NULL if none;
+# read before the snapshot so a writer committing meanwhile is still seen
+_WRITERS_SQL = "SELECT MIN(trx_started) FROM information_schema.INNODB_TRX WHERE trx_rows_modified > 0"
+# Versions are global, so any user's settled change is a safe high-water
+# mark; the scan walks back from the newest entry
+_SETTLED_SQL = ("SELECT id FROM password_changes WHERE changed_at < COALESCE(%s, NOW(6)) - INTERVAL %s SECOND "
+                "ORDER BY id DESC LIMIT 1")
+_ALL_ROWS_SQL = "SELECT id, description, encrypted_password FROM passwords WHERE user_id = %s ORDER BY id"
+_CHANGED_ROWS_SQL = ("SELECT id, description, encrypted_password FROM passwords "
+                     "WHERE user_id = %s AND version > %s ORDER BY id")
+_DELETED_SQL = ("SELECT DISTINCT password_id FROM password_changes "
+                "WHERE user_id = %s AND id > %s AND op = 'delete'")
+
+
+def _version_after(since, oldest, settled):
+    """The version a sync from since reaches, and whether it needs a full snapshot"""
+    version = max(settled[0] if settled else 0, since)
+    # Entries between since and the oldest kept one were pruned
+    full = since <= 0 or oldest is None or oldest > since + 1
+    return version, full
+
+
+def _writers_started(conn):
+    """_SETTLED_SQL's parameters: when the oldest open writer started, and the margin"""
+    try:
+        (started,) = conn.execute(_WRITERS_SQL).fetchone()
+    except mysql.connector.Error as e:
+        if e.errno not in _ACCESS_DENIED_ERRORS:
+            raise
+        return None, UNSEEN_WRITERS_SETTLE_SECONDS
+    return started, SETTLE_SECONDS
+
+
+def changes_since(conn, user_id, since=0):
+    """What changed in user_id's vault after version since (0 for everything)"""
+    with telemetry.span("sync.changes_since", {"sync.since": since}) as span:
+        try:
+            conn.rollback()
+            settle = _writers_started(conn)
+            # All reads below see one snapshot of the tables
+            (oldest,) = conn.execute(_OLDEST_SQL).fetchone()
+            version, full = _version_after(since, oldest, conn.execute(_SETTLED_SQL, settle).fetchone())
+
+            if full:
+                # Read from the server in batches rather than buffered whole
+                changes = ChangeSet(version, list(conn.execute(_ALL_ROWS_SQL, (user_id,)).stream()), full=True)
+                changes.tags = _read_tags(conn, ALL_TAGS_SQL, (user_id,))
+            else:
+                upserts = conn.execute(_CHANGED_ROWS_SQL, (user_id, since)).fetchall()
+                deletes = conn.execute(_DELETED_SQL, (user_id, since)).fetchall()
+                changes = ChangeSet(version, upserts, [row[0] for row in deletes])
+                if upserts:
+                    changes.tags = _read_tags(conn, CHANGED_TAGS_SQL, (user_id, since))
+        except mysql.connector.Error as e:
+            if e.errno not in _UNMIGRATED_ERRORS:
+                raise
+            # Database without row versions yet (run schema.py): plain full read
+            changes = ChangeSet(0, list(conn.execute(_ALL_ROWS_SQL, (user_id,)).stream()), full=True)
+        conn.rollback()
+        span.set_attribute("sync.full", changes.full)
+        span.set_attribute("sync.changes", len(changes))
+        return changes
+
+
+def _read_tags(conn, sql, params):
+    try:
+        return group_tags(conn.execute(sql, params).fetchall())
+    except mysql.connector.Error as e:
+        if e.errno not in _UNMIGRATED_ERRORS:
+            raise
+        # No tag tables yet (migration 2)
+        return {}
+
+
+def prepare_sync(conn):
+    """
+    Prepare the statements of a sync on conn before its first one (see
+    prefetch.py), by running each for no user
+    """
+    settle = _writers_started(conn)
+    for sql, params in ((_OLDEST_SQL, ()), (_SETTLED_SQL, settle), (_ALL_ROWS_SQL, (0,)), (ALL_TAGS_SQL, (0,)),
+                        (_CHANGED_ROWS_SQL, (0, 0)), (_DELETED_SQL, (0, 0)), (CHANGED_TAGS_SQL, (0, 0))):
+        conn.execute(sql, params).fetchall()
+    conn.rollback()
+
+
+async def changes_since_async(conn, user_id, since=0):
+    """changes_since over an async_db connection"""
+    with telemetry.span("sync.changes_since", {"sync.since": since, "db.async": True}) as span:
+        try:
+            await conn.rollback()
+            try:
+                (started,) = await conn.fetchone(_WRITERS_SQL)
+                settle = (started, SETTLE_SECONDS)
+            except Exception as e:
+                if error_code(e) not in _ACCESS_DENIED_ERRORS:
+                    raise
+                settle = (None, UNSEEN_WRITERS_SETTLE_SECONDS)
+            (oldest,) = await conn.fetchone(_OLDEST_SQL)
+            version, full = _version_after(since, oldest, await conn.fetchone(_SETTLED_SQL, settle))
+
+            if full:
+                changes = ChangeSet(version, [row async for row in conn.stream(_ALL_ROWS_SQL, (user_id,))], full=True)
+                tags_sql, tags_params = ALL_TAGS_SQL, (user_id,)
+            else:
+                upserts = list(await conn.fetchall(_CHANGED_ROWS_SQL, (user_id, since)))
+                deletes = await conn.fetchall(_DELETED_SQL, (user_id, since))
+                changes = ChangeSet(version, upserts, [row[0] for row in deletes])
+                tags_sql, tags_params = CHANGED_TAGS_SQL, (user_id, since)
+            if changes.upserts:
+                try:
+                    changes.tags = group_tags(await conn.fetchall(tags_sql, tags_params))
+                except Exception as e:
+                    if error_code(e) not in _UNMIGRATED_ERRORS:
+                        raise
+        except Exception as e:
+            if error_code(e) not in _UNMIGRATED_ERRORS:
+                raise
+            changes = ChangeSet(0, [row async for row in conn.stream(_ALL_ROWS_SQL, (user_id,))], full=True)
+        await conn.rollback()
+        span.set_attribute("sync.full", changes.full)
+        span.set_attribute("sync.changes", len(changes))
+        return changes
+
+
+def prune_change_log(conn, keep_days=CHANGE_LOG_RETENTION_DAYS):
+    """Delete change-log entries older than keep_days; returns the number removed"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM password_changes WHERE changed_at < NOW() - INTERVAL %s DAY", (keep_days,))
+        removed = cursor.rowcount
+        conn.commit()
+        return removed
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from db_config import get_connection
+
+    parser = argparse.ArgumentParser(description="Password vault change log maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    prune = sub.add_parser("prune", help="delete old change-log entries")
+    prune.add_argument("--days", type=int, default=CHANGE_LOG_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        print(f"✅ Removed {prune_change_log(conn, args.days)} change-log entries")
+    finally:
+        conn.close()
@@ -0,0 +1,89 @@
+"""
+Tags (folders) on vault entries
+
+Tag names live once per user in tags; password_tags links entries to them
+(schema.py migration 2). An entry can carry any number of tags, so a tag
+doubles as a folder. Assigning or removing a tag on many entries is one
+set-based statement per chunk of ids, and every change gives the entries a
+new row version, so vault_sync.changes_since brings their tags along:
+
+    tag_entries(conn, user_id, [12, 13, 14], "work")
+    untag_entries(conn, user_id, [12], "work")
+    conn.commit()
+
+The dashboard filters by tag in memory (vault_entry.TagIndex); `vault_cli.py
+list --tag` filters in the database through the (user_id, tag_id) index.
+"""
+
+# Ids per statement when many entries are tagged at once
+TAG_CHUNK = 500
+
+# Longest name the tags table takes
+MAX_NAME_LENGTH = 100
+
+# (password_id, tag name) of all the user's entries, or of those changed after a version
+ALL_TAGS_SQL = ("SELECT pt.password_id, t.name FROM password_tags pt JOIN tags t ON t.id = pt.tag_id "
+                "WHERE pt.user_id = %s")
+CHANGED_TAGS_SQL = ("SELECT pt.password_id, t.name FROM passwords p "
+                    "JOIN password_tags pt ON pt.password_id = p.id JOIN tags t ON t.id = pt.tag_id "
+                    "WHERE p.user_id = %s AND p.version > %s")
+
+
+def group_tags(rows):
+    """{password id: frozenset of tag names} from (password_id, name) rows"""
+    tags = {}
+    for password_id, name in rows:
+        tags.setdefault(password_id, set()).add(name)
+    return {password_id: frozenset(names) for password_id, names in tags.items()}
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), TAG_CHUNK):
+        chunk = ids[start:start + TAG_CHUNK]
+        yield chunk, ", ".join(["%s"] * len(chunk))
+
+
+def _tag_id(conn, user_id, name, create):
+    if create:
+        # LAST_INSERT_ID(id) makes lastrowid the existing tag's id on a duplicate
+        return conn.execute("INSERT INTO tags (user_id, name) VALUES (%s, %s) "
+                            "ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)", (user_id, name)).lastrowid
+    row = conn.execute("SELECT id FROM tags WHERE user_id = %s AND name = %s", (user_id, name)).fetchone()
+    return row[0] if row else None
+
+
+def check_name(name):
+    """The tag name stripped; ValueError when it cannot be stored"""
+    name = name.strip()
+    if not name or "\n" in name or len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f"tags must be one line of 1 to {MAX_NAME_LENGTH} characters")
+    return name
+
+
+def tag_entries(conn, user_id, ids, name):
+    """Give the user's entries with these ids the tag name, creating it if needed"""
+    tag_id = _tag_id(conn, user_id, name, create=True)
+    for chunk, placeholders in _chunks(ids):
+        # The user's entries are read first: the password_tags triggers update
+        # passwords, which MySQL refuses while the inserting statement reads it
+        # (error 1442). Entries deleted meanwhile (or not the user's) are left out
+        owned = [row[0] for row in conn.execute_unprepared(
+            f"SELECT id FROM passwords WHERE user_id = %s AND id IN ({placeholders})", (user_id, *chunk)).fetchall()]
+        if owned:
+            # IGNORE also skips an entry deleted since it was read
+            conn.execute_unprepared("INSERT IGNORE INTO password_tags (password_id, tag_id, user_id) VALUES "
+                                    + ", ".join(["(%s, %s, %s)"] * len(owned)),
+                                    [value for row_id in owned for value in (row_id, tag_id, user_id)])
+
+
+def untag_entries(conn, user_id, ids, name):
+    """Take the tag name off the user's entries with these ids"""
+    tag_id = _tag_id(conn, user_id, name, create=False)
+    if tag_id is None:
+        return
+    for chunk, placeholders in _chunks(ids):
+        conn.execute_unprepared("DELETE FROM password_tags "
+                                f"WHERE user_id = %s AND tag_id = %s AND password_id IN ({placeholders})",
+                                (user_id, tag_id, *chunk))
+
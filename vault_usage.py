@@ -0,0 +1,155 @@
+"""
+Usage tracking and quick access to the entries used most
+
+Revealing or editing an entry counts as using it. The counts and the time
+of last use are kept on the row (schema.py migration 4), but not written as
+they happen: UsageTracker collects them in memory and the write queue adds a
+whole batch with one statement per chunk of ids on its next sync, on the
+sync worker (write_queue.py). A use starts a sync within USAGE_FLUSH_MS if
+nothing else does. Usage never changes a row's version, so it costs other
+devices no sync traffic.
+
+The dashboard's quick-access strip (favorites, then the most recently used
+entries) is served from the tracker's in-memory MRU list. It is filled once
+per session from the (user_id, last_used_at) index, on the first sync, and
+kept current locally after that, so showing the strip never queries.
+Favorites are the entries tagged FAVORITES (vault_tags.py), so they sync and
+filter like any other tag.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# The tag marking an entry as a favorite
+FAVORITES = "Favorites"
+
+# Recently used entries remembered, and read from the server at the start
+RECENT_SIZE = 8
+
+# Uses are written at most this long after they happen
+USAGE_FLUSH_MS = 5000
+
+# Ids per statement when a batch is written
+USAGE_CHUNK = 500
+
+RECENT_SQL = ("SELECT id FROM passwords WHERE user_id = %s AND last_used_at IS NOT NULL "
+              "ORDER BY last_used_at DESC LIMIT %s")
+
+
+class UsageTracker:
+    """The ids used most recently, and the uses not written yet; safe across threads"""
+
+    def __init__(self, size=RECENT_SIZE):
+        self.size = size
+        self.loaded = False
+        # Least recent first
+        self._recent = OrderedDict()
+        # id -> [reveals, edits, last used as a Unix time]
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        """True while there are uses to write"""
+        return bool(self._pending)
+
+    def record(self, row_id, edited=False):
+        now = time.time()
+        with self._lock:
+            self._touch(row_id)
+            use = self._pending.setdefault(row_id, [0, 0, now])
+            use[1 if edited else 0] += 1
+            use[2] = now
+
+    def recent(self):
+        """Ids, most recently used first"""
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def load(self, ids):
+        """Fill the list from the server's most recent ids (RECENT_SQL); uses made here stay ahead"""
+        with self._lock:
+            local = list(self._recent)
+            self._recent = OrderedDict.fromkeys(reversed(ids))
+            for row_id in local:
+                self._touch(row_id)
+            self.loaded = True
+
+    def forget(self, ids):
+        """Drop deleted entries"""
+        with self._lock:
+            for row_id in ids:
+                self._recent.pop(row_id, None)
+                self._pending.pop(row_id, None)
+
+    def renumber(self, server_id):
+        """Move uses of entries added here to their server ids (VaultCache.server_id)"""
+        with self._lock:
+            self._recent = OrderedDict((server_id(row_id), None) for row_id in self._recent)
+            self._pending = {server_id(row_id): use for row_id, use in self._pending.items()}
+
+    def take(self):
+        """The uses to write, no longer pending; those of entries not uploaded yet stay"""
+        with self._lock:
+            batch = {row_id: use for row_id, use in self._pending.items() if row_id > 0}
+            for row_id in batch:
+                del self._pending[row_id]
+            return batch
+
+    def put_back(self, batch):
+        """Uses whose write failed, merged with the ones made meanwhile"""
+        with self._lock:
+            for row_id, (reveals, edits, used_at) in batch.items():
+                use = self._pending.setdefault(row_id, [0, 0, used_at])
+                use[0] += reveals
+                use[1] += edits
+                use[2] = max(use[2], used_at)
+
+    def _touch(self, row_id):
+        self._recent[row_id] = None
+        self._recent.move_to_end(row_id)
+        while len(self._recent) > self.size:
+            self._recent.popitem(last=False)
+
+
+def write_usage(conn, user_id, batch):
+    """Add a batch from UsageTracker.take() to the rows"""
+    items = sorted(batch.items())
+    for start in range(0, len(items), USAGE_CHUNK):
+        chunk = items[start:start + USAGE_CHUNK]
+        cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        times = " ".join(["WHEN %s THEN FROM_UNIXTIME(%s)"] * len(chunk))
+        placeholders = ", ".join(["%s"] * len(chunk))
+        params = []
+        for column in range(3):
+            for row_id, use in chunk:
+                params += [row_id, use[column]]
+        # Entries deleted meanwhile simply don't match; the version stays as it is.
+        # A batch held back by a failed write, or sent from a device whose clock
+        # is behind, must not move a later use back (GREATEST is NULL with NULL)
+        conn.execute_unprepared(f"UPDATE passwords SET reveal_count = reveal_count + CASE id {cases} END, "
+                                f"edit_count = edit_count + CASE id {cases} END, "
+                                f"last_used_at = GREATEST(COALESCE(last_used_at, FROM_UNIXTIME(0)), CASE id {times} END) "
+                                f"WHERE user_id = %s AND id IN ({placeholders})",
+                                (*params, user_id, *(row_id for row_id, _ in chunk)))
+
+
+def flush_usage(conn, cache, usage):
+    """
+    Write the tracker's pending uses and, the first time, load its list from
+    the server; returns whether anything was written. Uses stay pending if
+    the write fails.
+    """
+    usage.renumber(cache.server_id)
+    if not usage.loaded:
+        usage.load([row[0] for row in conn.execute(RECENT_SQL, (cache.user_id, usage.size)).fetchall()])
+    batch = usage.take()
+    if not batch:
+        return False
+    try:
+        write_usage(conn, cache.user_id, batch)
+        conn.commit()
+    except Exception:
+        usage.put_back(batch)
+        raise
+    return True
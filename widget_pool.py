@@ -0,0 +1,110 @@
+"""
+Recycling pool for list widgets
+
+Rebuilding a list by destroying every row widget and constructing new ones
+allocates a whole widget tree (and a stylesheet polish) per row on every
+refresh. A WidgetPool keeps its row widgets in the layout instead: a refresh
+binds the data to the widgets it already has, creates only the ones that are
+missing and hides the rest, so they are ready for the next refresh.
+
+    pool = WidgetPool(create_row, bind_row, layout, name="cards")
+    pool.show(items)        # bind(widget, item, index) for each item
+
+Spare widgets are given back with hysteresis: only when more than
+max(min_spare, a quarter of the rows shown) have been idle for shrink_after
+refreshes in a row, so a list that shrinks and grows again does not rebuild.
+The pool's widgets sit at the start of the layout; anything added after
+them (an empty-state label, a stretch) stays below. A pool is tied to one
+row style: widgets are reused as they were polished.
+"""
+
+import telemetry
+
+MIN_SPARE = 8
+SHRINK_AFTER = 3
+
+
+class WidgetPool:
+    def __init__(self, create, bind, layout, name="widgets", min_spare=MIN_SPARE, shrink_after=SHRINK_AFTER):
+        self.create = create
+        self.bind = bind
+        self.layout = layout
+        self.name = name
+        self.min_spare = min_spare
+        self.shrink_after = shrink_after
+        # In layout order; the first `active` are shown
+        self.widgets = []
+        self.active = 0
+        self.reused = 0
+        self.created = 0
+        self.released = 0
+        self._idle_runs = 0
+
+    def __iter__(self):
+        """The widgets currently shown"""
+        return iter(self.widgets[:self.active])
+
+    def show(self, items, start=0):
+        """
+        Show one widget per item, bound to it; returns how many existing
+        widgets were bound again. Widgets before start are taken to show
+        their items already and are not bound again, nor counted.
+        """
+        count = len(items)
+        existing = len(self.widgets)
+        reused = max(0, min(count, existing) - start)
+        created = max(0, count - max(start, existing))
+        for index in range(start, count):
+            item = items[index]
+            if index < len(self.widgets):
+                widget = self.widgets[index]
+            else:
+                widget = self.create()
+                self.layout.insertWidget(index, widget)
+                self.widgets.append(widget)
+            self.bind(widget, item, index)
+            if widget.isHidden():
+                widget.show()
+        for widget in self.widgets[count:self.active]:
+            widget.hide()
+        self.active = count
+
+        self.reused += reused
+        self.created += created
+        telemetry.count(f"{self.name}.reused", reused)
+        telemetry.count(f"{self.name}.created", created)
+        self._shrink()
+        return reused
+
+    def _shrink(self):
+        allowance = max(self.min_spare, self.active // 4)
+        if len(self.widgets) - self.active <= allowance:
+            self._idle_runs = 0
+            return
+        self._idle_runs += 1
+        if self._idle_runs < self.shrink_after:
+            return
+        extra = self.widgets[self.active + allowance:]
+        del self.widgets[self.active + allowance:]
+        for widget in extra:
+            self.layout.removeWidget(widget)
+            widget.deleteLater()
+        self.released += len(extra)
+        telemetry.count(f"{self.name}.released", len(extra))
+        self._idle_runs = 0
+
+    @property
+    def hit_rate(self):
+        """Share of rows shown so far that reused a widget"""
+        total = self.reused + self.created
+        return self.reused / total if total else 0.0
+
+    def stats(self):
+        return {
+            "pooled": len(self.widgets),
+            "active": self.active,
+            "reused": self.reused,
+            "created": self.created,
+            "released": self.released,
+            "hit_rate": self.hit_rate,
+        }
@@ -0,0 +1,259 @@
+"""
+Write-behind queue for vault changes
+
+Adds, edits and deletes used to open a connection, run one statement and
+commit before the dashboard could carry on. They now go into the offline
+cache's pending list, which the view shows at once, and a worker thread
+uploads whatever has piled up a moment later in one transaction, then pulls
+the server's changes (vault_sync.py):
+
+    writes = WriteQueue(cache, session)
+    writes.synced.connect(...)   # FlushResult of the upload
+    writes.failed.connect(...)   # the exception; everything stays queued
+    writes.add(description, token)
+
+A burst of edits costs one commit, and edits to the same row fold into one
+write. The pending list lives in the cache file, so queued writes survive a
+restart. While the server cannot be reached the queue retries with
+exponential backoff; see VaultCache.flush_pending for conflict handling.
+With nothing to upload and an asyncio loop under Qt (async_db.py), a sync
+only fetches, and does so on the event loop instead of the worker. Reveals
+and edits are counted in writes.usage and written with the next upload
+(vault_usage.py).
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+import async_db
+import telemetry
+from db_config import get_connection
+from encryption import copy_fernet, wipe_fernet
+from offline_cache import FlushResult
+from vault_sort import order_sql, ordered_ids
+from vault_sync import changes_since, changes_since_async
+from vault_usage import RECENT_SQL, USAGE_FLUSH_MS, UsageTracker, flush_usage
+
+# Writes arriving within this long of each other are uploaded together
+FLUSH_DELAY_MS = int(os.environ.get("VAULT_WRITE_DELAY_MS", "150"))
+
+# Retry delays while the server is unreachable, doubling from the first to the last
+RETRY_MIN_MS = 1000
+RETRY_MAX_MS = 30000
+
+# Uploads and vault fetches, so a slow server never blocks the window
+_sync_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vault-sync")
+
+
+def sync_cache(cache, fernet, usage=None):
+    """
+    Upload the cache's queued writes, and the uses counted in usage (a
+    vault_usage.UsageTracker), then apply the server's changes; returns the
+    FlushResult
+    """
+    sort = cache.sort
+    order = None
+    conn = get_connection()
+    try:
+        flushed = cache.flush_pending(conn, fernet)
+        used = usage is not None and flush_usage(conn, cache, usage)
+        # Only rows changed since the cached version travel
+        changes = changes_since(conn, cache.user_id, cache.version)
+        # The ids in the shown order, read from its index when anything moved
+        if cache.needs_order(sort, changes) or (used and sort == "used"):
+            order = ordered_ids(conn, cache.user_id, sort)
+    finally:
+        conn.close()
+    cache.apply_changes(changes, fernet)
+    if order is not None:
+        cache.set_order(sort, order)
+    return flushed
+
+
+def fetch_vault(cache, fernet):
+    """
+    Load the cache file on the sync worker, or sync from the server if there
+    is no usable one; returns a Future of the FlushResult, None when the rows
+    came from the file. Nothing else may touch the cache until it is done.
+    """
+    def fetch():
+        with telemetry.span("writes.fetch"):
+            if cache.load(fernet):
+                return None
+            return sync_cache(cache, fernet)
+    return _sync_pool.submit(fetch)
+
+
+class WriteQueue(QObject):
+    # Carries the Future of a background sync back to the GUI thread
+    _finished = pyqtSignal(object)
+    synced = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    def __init__(self, cache, session, delay_ms=FLUSH_DELAY_MS, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.session = session
+        self.delay_ms = delay_ms
+        self.busy = False
+        self.offline = False
+        self._again = False
+        self._retry_ms = RETRY_MIN_MS
+        # Reveals and edits not written yet, and the entries used last
+        self.usage = UsageTracker()
+        # One upload at a time, whether from the worker or sync_now()
+        self._run_lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.sync)
+        self._finished.connect(self._on_finished)
+
+    @property
+    def pending(self):
+        return len(self.cache.pending)
+
+    def add(self, description, token):
+        """Queue a new entry; returns its temporary id"""
+        row_id = self.cache.queue_add(description, token, self.session.fernet)
+        self.schedule()
+        return row_id
+
+    def update(self, row_id, token, description=None):
+        self.cache.queue_update(row_id, token, self.session.fernet, description)
+        self.usage.record(row_id, edited=True)
+        self.schedule()
+
+    def delete(self, row_id):
+        self.cache.queue_delete(row_id, self.session.fernet)
+        self.usage.forget([row_id])
+        self.schedule()
+
+    def delete_many(self, row_ids):
+        self.cache.queue_delete_many(row_ids, self.session.fernet)
+        self.usage.forget(row_ids)
+        self.schedule()
+
+    def use(self, row_id):
+        """Count a reveal; written with the next sync, at the latest USAGE_FLUSH_MS from now"""
+        self.usage.record(row_id)
+        if not self.offline and not self._timer.isActive():
+            self._timer.start(USAGE_FLUSH_MS)
+
+    def tag(self, row_ids, name, remove=False):
+        """Queue adding (or removing) the tag name on several entries"""
+        self.cache.queue_tags(row_ids, name, self.session.fernet, remove)
+        self.schedule()
+
+    def schedule(self):
+        """Sync once the current burst of writes is over"""
+        telemetry.count("writes.queued")
+        # While offline the retry timer is already running
+        if not self.offline:
+            self._timer.start(self.delay_ms)
+
+    def sync(self):
+        """Upload queued writes and fetch the server's changes on the worker"""
+        if self.session.is_locked:
+            return
+        if self.busy:
+            # Picks up whatever was queued meanwhile once the running sync is done
+            self._again = True
+            return
+        self._timer.stop()
+        self.busy = True
+        # The sync gets its own copy of the key: locking or logging out
+        # meanwhile wipes the session's, which would otherwise leave the rest
+        # of the sync encrypting and signing the cache file with zeros
+        fernet = copy_fernet(self.session.fernet)
+        if not self.pending and not self.usage and async_db.available():
+            future = asyncio.ensure_future(self.fetch_async(fernet))
+        else:
+            future = _sync_pool.submit(self.run, fernet)
+        future.add_done_callback(lambda future: wipe_fernet(fernet))
+        future.add_done_callback(self._finished.emit)
+
+    async def sync_async(self):
+        """Like sync_now but awaited on the event loop; only for when nothing is queued"""
+        self._timer.stop()
+        self.busy = True
+        # Own copy of the key, as in sync()
+        fernet = copy_fernet(self.session.fernet)
+        try:
+            result = await self.fetch_async(fernet)
+        except Exception:
+            self._went_offline()
+            raise
+        finally:
+            wipe_fernet(fernet)
+            self.busy = False
+        self._back_online()
+        if self._again or self.pending:
+            self._again = False
+            self._timer.start(self.delay_ms)
+        return result
+
+    def sync_now(self):
+        """Like sync but on the calling thread; errors are raised"""
+        self._timer.stop()
+        try:
+            result = self.run(self.session.fernet)
+        except Exception:
+            self._went_offline()
+            raise
+        self._back_online()
+        return result
+
+    def run(self, fernet):
+        """One upload and fetch; safe off the GUI thread"""
+        with self._run_lock, telemetry.span("writes.sync", {"writes.pending": self.pending}) as span:
+            flushed = sync_cache(self.cache, fernet, self.usage)
+            span.set_attribute("writes.applied", flushed.applied)
+            return flushed
+
+    async def fetch_async(self, fernet):
+        """Apply the server's changes to the cache over async_db; returns an empty FlushResult"""
+        since = self.cache.version
+        sort = self.cache.sort
+        order = None
+        with telemetry.span("writes.fetch_async", {"sync.since": since}):
+            async with async_db.connection() as conn:
+                changes = await changes_since_async(conn, self.cache.user_id, since)
+                if not self.usage.loaded:
+                    self.usage.load([row[0] for row in await conn.fetchall(
+                        RECENT_SQL, (self.cache.user_id, self.usage.size))])
+                if self.cache.needs_order(sort, changes):
+                    order = [row[0] for row in await conn.fetchall(order_sql(sort), (self.cache.user_id,))]
+        # A blocking sync_now() may have got newer changes in meanwhile
+        if self.cache.version == since:
+            self.cache.apply_changes(changes, fernet)
+            if order is not None:
+                self.cache.set_order(sort, order)
+        return FlushResult()
+
+    def _on_finished(self, future):
+        self.busy = False
+        try:
+            result = future.result()
+        except Exception as e:
+            telemetry.count("writes.sync_failures")
+            self._went_offline()
+            self.failed.emit(e)
+            return
+        self._back_online()
+        self.synced.emit(result)
+        if self._again or self.pending:
+            self._again = False
+            self._timer.start(self.delay_ms)
+
+    def _went_offline(self):
+        self.offline = True
+        self._timer.start(self._retry_ms)
+        self._retry_ms = min(self._retry_ms * 2, RETRY_MAX_MS)
+
+    def _back_online(self):
+        self.offline = False
+        self._retry_ms = RETRY_MIN_MS